@@ -0,0 +1,71 @@
+# -*- coding: utf-8  -*-
+"""
+Benchmark of WikibasePage.toJSON(diffto=...) on growing items.
+
+Run as::
+
+    python benchmarks/diff.py
+
+The time per statement should stay roughly constant as the number of
+statements grows, i.e. the claim diff scales linearly.
+"""
+
+#
+# (C) Pywikibot team, 2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import print_function, unicode_literals
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywikibase import ItemPage  # noqa
+
+
+def statement(qid, pid, n):
+    """Return the JSON of a wikibase-item statement with one reference."""
+    snak = {'snaktype': 'value', 'property': pid, 'datatype': 'wikibase-item',
+            'datavalue': {'type': 'wikibase-entityid',
+                          'value': {'entity-type': 'item',
+                                    'numeric-id': 1000 + n}}}
+    ref_snak = {'snaktype': 'value', 'property': 'P248',
+                'datatype': 'wikibase-item',
+                'datavalue': {'type': 'wikibase-entityid',
+                              'value': {'entity-type': 'item',
+                                        'numeric-id': 5412157}}}
+    return {'id': '%s$%08d' % (qid, n), 'type': 'statement',
+            'rank': 'normal', 'mainsnak': snak,
+            'references': [{'hash': 'h%d' % n,
+                            'snaks': {'P248': [ref_snak]},
+                            'snaks-order': ['P248']}]}
+
+
+def make_item(size):
+    """Return a parsed item with size statements on P2860."""
+    content = {'type': 'item', 'id': 'Q1',
+               'claims': {'P2860': [statement('Q1', 'P2860', n)
+                                    for n in range(size)]}}
+    item = ItemPage()
+    item.get(content=content)
+    return item
+
+
+def main():
+    print('statements  total (s)  per statement (us)')
+    for size in (1000, 2000, 4000, 8000, 16000):
+        item = make_item(size)
+        old = item.toJSON()
+        claims = item.claims['P2860']
+        claims[size // 2].setRank('preferred')
+        item.removeClaims(claims[-1])
+        seconds = min(timeit.repeat(lambda: item.toJSON(diffto=old),
+                                    number=1, repeat=5))
+        print('%10d  %9.4f  %18.2f' % (size, seconds, seconds / size * 1e6))
+
+
+if __name__ == '__main__':
+    main()
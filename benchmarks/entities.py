@@ -0,0 +1,107 @@
+# -*- coding: utf-8  -*-
+"""
+Generator of synthetic Wikibase entities for the benchmarks.
+
+The entities are deterministic for a given size, so results of different
+runs and versions can be compared.
+"""
+
+#
+# (C) Pywikibot team, 2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+STATEMENTS_PER_PROPERTY = 20
+QUALIFIERS = 3
+REFERENCES = 2
+REFERENCE_SNAKS = 3
+DATATYPES = ('wikibase-item', 'time', 'quantity', 'globe-coordinate',
+             'string', 'monolingualtext')
+
+
+def datavalue(datatype, n):
+    """Return the datavalue of a datatype, varying with n."""
+    if datatype == 'wikibase-item':
+        return {'type': 'wikibase-entityid',
+                'value': {'entity-type': 'item', 'numeric-id': 1000 + n}}
+    if datatype == 'time':
+        timestr = '+%04d-%02d-%02dT00:00:00Z' % (
+            1000 + n % 1000, 1 + n % 12, 1 + n % 28)
+        return {'type': 'time',
+                'value': {'time': timestr,
+                          'timezone': 0, 'before': 0, 'after': 0,
+                          'precision': 11,
+                          'calendarmodel':
+                              'http://www.wikidata.org/entity/Q1985727'}}
+    if datatype == 'quantity':
+        return {'type': 'quantity',
+                'value': {'amount': '+%d.5' % n,
+                          'upperBound': '+%d.6' % n,
+                          'lowerBound': '+%d.4' % n,
+                          'unit': 'http://www.wikidata.org/entity/Q11573'}}
+    if datatype == 'globe-coordinate':
+        return {'type': 'globecoordinate',
+                'value': {'latitude': (n % 1800) / 10.0 - 90,
+                          'longitude': (n % 3600) / 10.0 - 180,
+                          'altitude': None, 'precision': 0.0001,
+                          'globe': 'http://www.wikidata.org/entity/Q2'}}
+    if datatype == 'monolingualtext':
+        return {'type': 'monolingualtext',
+                'value': {'text': 'text %d' % n, 'language': 'en'}}
+    return {'type': 'string', 'value': 'string %d' % n}
+
+
+def snak(pid, datatype, n):
+    """Return a value snak."""
+    return {'snaktype': 'value', 'property': pid, 'datatype': datatype,
+            'datavalue': datavalue(datatype, n)}
+
+
+def statement(qid, pid, datatype, n):
+    """Return a statement with qualifiers and references."""
+    qualifiers = {}
+    for i in range(QUALIFIERS):
+        qpid = 'P%d' % (9000 + i)
+        qualifiers[qpid] = [dict(snak(qpid, DATATYPES[i % len(DATATYPES)],
+                                      n + i), hash='q%d-%d' % (n, i))]
+    references = []
+    for i in range(REFERENCES):
+        snaks = {}
+        for j in range(REFERENCE_SNAKS):
+            rpid = 'P%d' % (9100 + j)
+            snaks[rpid] = [snak(rpid, DATATYPES[(i + j) % len(DATATYPES)],
+                                n * REFERENCES + i)]
+        references.append({'hash': 'r%d-%d' % (n, i), 'snaks': snaks,
+                           'snaks-order': sorted(snaks)})
+    return {'id': '%s$%08d' % (qid, n), 'type': 'statement',
+            'rank': 'normal', 'mainsnak': snak(pid, datatype, n),
+            'qualifiers': qualifiers,
+            'qualifiers-order': sorted(qualifiers),
+            'references': references}
+
+
+def item(size, qid='Q1'):
+    """
+    Return the JSON of an item with size statements.
+
+    The statements are spread over properties with STATEMENTS_PER_PROPERTY
+    statements each, cycling through DATATYPES.
+
+    @rtype: dict
+    """
+    claims = {}
+    for n in range(size):
+        number = n // STATEMENTS_PER_PROPERTY
+        pid = 'P%d' % (number + 1)
+        datatype = DATATYPES[number % len(DATATYPES)]
+        claims.setdefault(pid, []).append(statement(qid, pid, datatype, n))
+    return {'type': 'item', 'id': qid,
+            'labels': {'en': {'language': 'en', 'value': 'Item %s' % qid}},
+            'descriptions': {'en': {'language': 'en',
+                                    'value': 'synthetic item'}},
+            'aliases': {'en': [{'language': 'en', 'value': 'alias'}]},
+            'sitelinks': {'enwiki': {'site': 'enwiki', 'title': qid,
+                                     'badges': []}},
+            'claims': claims}
@@ -0,0 +1,262 @@
+# -*- coding: utf-8  -*-
+"""
+Benchmarks of the parse, serialize, diff and mutation hot paths.
+
+Run as::
+
+    python benchmarks/suite.py --output before.json
+    # change or upgrade pywikibase
+    python benchmarks/suite.py --compare before.json
+
+Every benchmark runs on synthetic items (see entities.py) with 10, 1000
+and 50000 statements, each having qualifiers and references. The time is
+the best of several runs; the peak memory is measured by tracemalloc in a
+separate run, so that tracing does not distort the time. The preparation
+of a run, like parsing the item to be serialized, is not measured.
+
+The items with 50000 statements take several minutes; use --sizes and
+--benchmark to run a part of the suite.
+"""
+
+#
+# (C) Pywikibot team, 2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import print_function, unicode_literals
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import entities  # noqa
+import pywikibase  # noqa
+from pywikibase import Claim, ItemPage, WbQuantity, WbTime, WikibasePage  # noqa
+
+try:
+    timer = time.perf_counter
+except AttributeError:
+    timer = time.time
+
+SIZES = (10, 1000, 50000)
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    """
+    Register a benchmark.
+
+    The function is called with the item JSON and the size and returns a
+    callable to be measured; it is called again for every run.
+    """
+    BENCHMARKS.append(func)
+    return func
+
+
+def _item(content):
+    item = ItemPage()
+    item.get(content=content)
+    return item
+
+
+def _all_claims(content):
+    return [claim for claims in content['claims'].values()
+            for claim in claims]
+
+
+def _values(content, datatype):
+    return [claim['mainsnak']['datavalue']['value']
+            for claim in _all_claims(content)
+            if claim['mainsnak']['datatype'] == datatype]
+
+
+@benchmark
+def wikibasepage_get(content, size):
+    return lambda: WikibasePage().get(content=content)
+
+
+@benchmark
+def itempage_get(content, size):
+    return lambda: ItemPage().get(content=content)
+
+
+@benchmark
+def itempage_get_lazy(content, size):
+    return lambda: ItemPage().get(content=content, lazy=True)
+
+
+@benchmark
+def claim_fromJSON(content, size):
+    claims = _all_claims(content)
+    return lambda: [Claim.fromJSON(claim) for claim in claims]
+
+
+@benchmark
+def toJSON(content, size):
+    return _item(content).toJSON
+
+
+@benchmark
+def toJSON_diffto(content, size):
+    item = _item(content)
+    old = item.toJSON()
+    claims = [claim for pid in sorted(item.claims)
+              for claim in item.claims[pid]]
+    # change one percent of the statements
+    for claim in claims[::100]:
+        claim.setRank('preferred')
+    return lambda: item.toJSON(diffto=old)
+
+
+@benchmark
+def removeClaims(content, size):
+    item = _item(content)
+    claims = [claim for pid in sorted(item.claims)
+              for claim in item.claims[pid]]
+    # remove one tenth of the statements
+    return lambda: item.removeClaims(claims[::10])
+
+
+@benchmark
+def wbtime_fromTimestr(content, size):
+    timestrs = [value['time'] for value in _values(content, 'time')]
+    return lambda: [WbTime.fromTimestr(timestr) for timestr in timestrs]
+
+
+@benchmark
+def wbquantity_fromWikibase(content, size):
+    values = _values(content, 'quantity')
+    return lambda: [WbQuantity.fromWikibase(value) for value in values]
+
+
+def measure(setup, repeat):
+    """
+    Measure a benchmark.
+
+    @return: best time in seconds and peak memory in bytes
+    @rtype: tuple
+    """
+    times = []
+    for i in range(repeat):
+        func = setup()
+        gc.collect()
+        start = timer()
+        func()
+        times.append(timer() - start)
+    peak = None
+    if tracemalloc:
+        func = setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return min(times), peak
+
+
+def run(sizes=SIZES, repeat=5, names=None, out=sys.stdout):
+    """Run the benchmarks and return the results by 'name[size]'."""
+    results = {}
+    for size in sizes:
+        content = entities.item(size)
+        for func in BENCHMARKS:
+            if names and func.__name__ not in names:
+                continue
+            # fewer runs for the large items
+            runs = max(1, repeat * 1000 // max(size, 1000))
+            seconds, peak = measure(lambda: func(content, size), runs)
+            key = '%s[%d]' % (func.__name__, size)
+            results[key] = {'time': seconds, 'peak': peak}
+            print('%-32s %12.6f s %12s' % (key, seconds, _format_bytes(peak)),
+                  file=out)
+    return results
+
+
+def _format_bytes(size):
+    if size is None:
+        return '-'
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return '%.1f %s' % (size, unit)
+        size /= 1024.0
+    return '%.1f GiB' % size
+
+
+def compare(old, new, threshold=0.1, out=sys.stdout):
+    """
+    Print the ratios of new to old results.
+
+    @param threshold: relative slowdown or growth reported as regression
+    @return: keys of the regressions
+    @rtype: list
+    """
+    regressions = []
+    print('%-32s %8s %8s' % ('benchmark', 'time', 'memory'), file=out)
+    for key in sorted(new):
+        if key not in old:
+            continue
+        ratios = []
+        regression = False
+        for field in ('time', 'peak'):
+            if old[key][field] and new[key][field] is not None:
+                ratio = new[key][field] / float(old[key][field])
+                regression |= ratio > 1 + threshold
+                ratios.append('%7.2fx' % ratio)
+            else:
+                ratios.append('%8s' % '-')
+        if regression:
+            regressions.append(key)
+        print('%-32s %s %s%s' % (key, ratios[0], ratios[1],
+                                 '  REGRESSION' if regression else ''),
+              file=out)
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='numbers of statements')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per benchmark on items with up to 1000 '
+                             'statements')
+    parser.add_argument('--benchmark', action='append', dest='names',
+                        help='run only this benchmark')
+    parser.add_argument('--output', help='write the results to a JSON file')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare with the results of an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change reported as regression')
+    options = parser.parse_args(args)
+
+    results = run(options.sizes, options.repeat, options.names)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump({'version': pywikibase.__version__,
+                       'python': platform.python_version(),
+                       'results': results}, f, indent=4, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as f:
+            old = json.load(f)
+        print('\ncompared with %s (pywikibase %s, Python %s)' % (
+            options.compare, old['version'], old['python']))
+        if compare(old['results'], results, options.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
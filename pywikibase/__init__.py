@@ -3,9 +3,15 @@ from pywikibase.wbtime import WbTime
 from pywikibase.wbquantity import WbQuantity
 from pywikibase.wbproperty import Property
 from pywikibase.claim import Claim
+from pywikibase.claimcollection import ClaimCollection
 from pywikibase.wikibasepage import WikibasePage
 from pywikibase.itempage import ItemPage
 from pywikibase.propertypage import PropertyPage
+from pywikibase.dump import DumpReader
+from pywikibase.dumpindex import DumpIndex
+from pywikibase.entitycache import EntityCache
+from pywikibase.diskcache import DiskEntityCache
+from pywikibase.editbatcher import EditBatcher
 from pywikibase.about import (__name__, __version__, __maintainer__,
                               __maintainer_email__, __description__,
                               __license__, __url__)
@@ -13,5 +19,7 @@ from pywikibase.about import (__name__, __version__, __maintainer__,
 
 # Not to mess with pyflakes
 __all__ = (Coordinate, WbQuantity, WbTime, ItemPage, Property, PropertyPage,
-           WikibasePage, Claim, __name__, __version__, __maintainer__,
-           __maintainer_email__, __description__, __license__, __url__)
+           WikibasePage, Claim, ClaimCollection, DumpReader, DumpIndex,
+           EntityCache, DiskEntityCache, EditBatcher, __name__,
+           __version__, __maintainer__, __maintainer_email__,
+           __description__, __license__, __url__)
@@ -0,0 +1,356 @@
+# -*- coding: utf-8  -*-
+"""
+Compact binary serialization of entities.
+
+Should be used as::
+
+    data = binary.dumps(item, compression='zlib')
+    item = binary.loads(data)
+
+The decoded entity returns the same toJSON() as the encoded one, and
+decoding is much faster than parsing the JSON, as the claims are built
+directly from typed values.
+
+A blob starts with MAGIC, the format VERSION and the compression code,
+followed by the marshal data of a tuple structure. Entity, property and
+item ids are stored as integers, and repeated strings like language
+codes, site ids, datatypes, units and globes are kept once in a string
+table. Times, quantities and coordinates are stored as tuples of their
+fields. As marshal data is specific to the major Python version, blobs
+should be used as a cache rather than as an archive format.
+
+The decoded entity has no _content, so calling get() on it again without
+content fails.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import marshal
+import re
+import zlib
+from binascii import hexlify, unhexlify, Error as BinasciiError
+from collections import OrderedDict
+
+from pywikibase.claim import Claim
+from pywikibase.coordinate import Coordinate
+from pywikibase.itempage import ItemPage
+from pywikibase.propertypage import PropertyPage
+from pywikibase.wbquantity import WbQuantity
+from pywikibase.wbtime import WbTime
+
+MAGIC = b'WBE'
+VERSION = 1
+
+# compression name -> code stored in the header
+COMPRESSION = {None: 0, 'zlib': 1, 'zstd': 2}
+
+_ID_RE = re.compile(r'^[QP][1-9]\d*$')
+
+
+class _Strings(object):
+
+    """Table of the repeated strings of a blob; it may contain None."""
+
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def __call__(self, string):
+        """Return the index of a string."""
+        index = self._index.get(string)
+        if index is None:
+            index = self._index[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+
+def _pack_hash(value):
+    """Store a lowercase hexadecimal hash as bytes."""
+    if isinstance(value, bytes):
+        # A native str on Python 2; keep it apart from packed hashes.
+        value = value.decode('utf-8')
+    if value is not None and len(value) % 2 == 0:
+        try:
+            packed = unhexlify(value.encode('ascii'))
+        except (BinasciiError, TypeError, UnicodeError):
+            return value
+        if hexlify(packed).decode('ascii') == value:
+            return packed
+    return value
+
+
+def _unpack_hash(value):
+    if isinstance(value, bytes):
+        return hexlify(value).decode('ascii')
+    return value
+
+
+def _encode_value(datatype, target, strings):
+    if datatype == 'wikibase-item':
+        return target.getID(numeric=True)
+    if datatype == 'time':
+        return (target.year, target.month, target.day, target.hour,
+                target.minute, target.second, target.precision,
+                target.before, target.after, target.timezone,
+                strings(target.calendarmodel))
+    if datatype == 'quantity':
+        value = target.toWikibase()
+        return (value['amount'], value['upperBound'], value['lowerBound'],
+                strings(value['unit']))
+    if datatype == 'globe-coordinate':
+        value = target.toWikibase()
+        return (value['latitude'], value['longitude'], value['altitude'],
+                value['precision'], strings(value['globe']))
+    if datatype == 'monolingualtext' and isinstance(target, dict) and \
+            sorted(target) == ['language', 'text']:
+        return (target['text'], strings(target['language']))
+    return target
+
+
+def _decode_time(value, strings):
+    time = WbTime.__new__(WbTime)
+    (time.year, time.month, time.day, time.hour, time.minute, time.second,
+     time.precision, time.before, time.after, time.timezone,
+     calendarmodel) = value
+    time.calendarmodel = strings[calendarmodel]
+    return time
+
+
+def _decode_quantity(value, strings):
+    return WbQuantity.fromWikibase({'amount': value[0],
+                                    'upperBound': value[1],
+                                    'lowerBound': value[2],
+                                    'unit': strings[value[3]]})
+
+
+def _decode_coordinate(value, strings):
+    globe = strings[value[4]]
+    # like Coordinate.fromWikibase without site
+    return Coordinate(value[0], value[1], value[2], value[3],
+                      None if globe else 'earth', entity=globe)
+
+
+def _decode_monolingualtext(value, strings):
+    if isinstance(value, tuple):
+        return {'text': value[0], 'language': strings[value[1]]}
+    return value
+
+
+_DECODERS = {
+    'wikibase-item': lambda value, strings: ItemPage.fromNumericID(value),
+    'time': _decode_time,
+    'quantity': _decode_quantity,
+    'globe-coordinate': _decode_coordinate,
+    'monolingualtext': _decode_monolingualtext,
+}
+
+
+def _encode_snak(claim, strings):
+    """Return (snaktype, datatype, value) of a claim."""
+    datatype = getattr(claim, '_type', None)
+    if claim.snaktype == 'value':
+        value = _encode_value(datatype, claim.target, strings)
+    else:
+        value = None
+    return (strings(claim.snaktype), strings(datatype), value)
+
+
+def _encode_statement(claim, prefix, strings):
+    snak = claim.snak
+    if snak is not None:
+        # the id of a statement on the entity is stored without the prefix
+        snak = snak[len(prefix):] if snak.startswith(prefix) else (snak,)
+    qualifiers = tuple((int(prop[1:]),
+                        tuple(_encode_snak(qualifier, strings) +
+                              (_pack_hash(qualifier.hash),)
+                              for qualifier in prop_qualifiers))
+                       for prop, prop_qualifiers in claim.qualifiers.items())
+    references = []
+    for collection in claim.sources:
+        reference_hash = None
+        snaks = []
+        for prop, sources in collection.items():
+            for source in sources:
+                if reference_hash is None:
+                    reference_hash = source.hash
+            snaks.append((int(prop[1:]),
+                          tuple(_encode_snak(source, strings)
+                                for source in sources)))
+        references.append((_pack_hash(reference_hash), tuple(snaks)))
+    return (snak, strings(claim.rank), _encode_snak(claim, strings),
+            qualifiers, tuple(references))
+
+
+def _encode_id(entity_id):
+    if entity_id and _ID_RE.match(entity_id):
+        return int(entity_id[1:])
+    return entity_id
+
+
+def _decode_id(value, prefix):
+    if isinstance(value, int):
+        return '%s%d' % (prefix, value)
+    return value
+
+
+def _terms(terms, strings):
+    return tuple(item for lang, value in terms.items()
+                 for item in (strings(lang), value))
+
+
+def _encode(page):
+    strings = _Strings()
+    if isinstance(page, PropertyPage):
+        entity_type = 'property'
+        datatype = getattr(page, '_type', None)
+    else:
+        entity_type = 'item'
+        datatype = None
+    prefix = '%s$' % page.id
+    claims = tuple((int(pid[1:]),
+                    tuple(_encode_statement(claim, prefix, strings)
+                          for claim in page.claims[pid]))
+                   for pid in page.claims)
+    sitelinks = ()
+    if entity_type == 'item':
+        badges = getattr(page, 'badges', {})
+        sitelinks = tuple(
+            (strings(site), title,
+             tuple(strings(badge) for badge in badges.get(site, ())))
+            for site, title in page.sitelinks.items())
+    aliases = tuple((strings(lang), tuple(values))
+                    for lang, values in page.aliases.items())
+    return (entity_type, _encode_id(page.id), datatype,
+            _terms(page.labels, strings),
+            _terms(page.descriptions, strings),
+            aliases, sitelinks, claims,
+            tuple(strings.strings))
+
+
+def dumps(page, compression=None, level=-1):
+    """
+    Encode an entity.
+
+    @param page: the entity; it must have been loaded by get()
+    @type page: ItemPage or PropertyPage
+    @param compression: None, 'zlib' or 'zstd' (requires zstandard)
+    @type compression: str
+    @param level: compression level, -1 for the default
+    @type level: int
+    @rtype: bytes
+    """
+    if compression not in COMPRESSION:
+        raise ValueError("Unknown compression '%s'" % compression)
+    payload = marshal.dumps(_encode(page))
+    if compression == 'zlib':
+        payload = zlib.compress(payload, level)
+    elif compression == 'zstd':
+        import zstandard
+        payload = zstandard.ZstdCompressor(
+            level=3 if level == -1 else level).compress(payload)
+    return MAGIC + bytearray([VERSION, COMPRESSION[compression]]) + payload
+
+
+def _decode_claim(pid, snak, strings, owner=None, hash=None,
+                  isQualifier=False, isReference=False):
+    """Create a claim from (snaktype, datatype, value) of dumps()."""
+    snaktype, datatype, value = snak[:3]
+    datatype = strings[datatype]
+    claim = Claim._create(pid, datatype, hash=hash, isReference=isReference,
+                          isQualifier=isQualifier)
+    claim._owner = owner
+    claim._snaktype = snaktype = strings[snaktype]
+    if snaktype == 'value':
+        decoder = _DECODERS.get(datatype)
+        claim._target = value if decoder is None else decoder(value, strings)
+    return claim
+
+
+def _decode_statement(pid, data, prefix, strings, page):
+    snak, rank, mainsnak, qualifiers, references = data
+    claim = _decode_claim(pid, mainsnak, strings)
+    if isinstance(snak, tuple):
+        snak = snak[0]
+    elif snak is not None:
+        snak = prefix + snak
+    claim._snak = snak
+    claim._rank = strings[rank]
+    claim.on_item = page
+    for prop, prop_qualifiers in qualifiers:
+        prop = 'P%d' % prop
+        claim.qualifiers[prop] = [
+            _decode_claim(prop, qualifier, strings, claim,
+                          _unpack_hash(qualifier[3]), isQualifier=True)
+            for qualifier in prop_qualifiers]
+    for reference_hash, snaks in references:
+        reference_hash = _unpack_hash(reference_hash)
+        source = OrderedDict()
+        for prop, prop_snaks in snaks:
+            prop = 'P%d' % prop
+            source[prop] = [_decode_claim(prop, src, strings, claim,
+                                          reference_hash, isReference=True)
+                            for src in prop_snaks]
+        claim.sources.append(source)
+    return claim
+
+
+def _decode(record):
+    (entity_type, entity_id, datatype, labels, descriptions, aliases,
+     sitelinks, claims, strings) = record
+    if entity_type == 'property':
+        page = PropertyPage(_decode_id(entity_id, 'P'), datatype)
+    else:
+        page = ItemPage(_decode_id(entity_id, 'Q'))
+    page.labels = dict((strings[labels[i]], labels[i + 1])
+                       for i in range(0, len(labels), 2))
+    page.descriptions = dict((strings[descriptions[i]], descriptions[i + 1])
+                             for i in range(0, len(descriptions), 2))
+    page.aliases = dict((strings[lang], list(values))
+                        for lang, values in aliases)
+    page.claims = {}
+    prefix = '%s$' % page.id
+    for pid, statements in claims:
+        pid = 'P%d' % pid
+        page.claims[pid] = [_decode_statement(pid, statement, prefix,
+                                              strings, page)
+                            for statement in statements]
+    if entity_type == 'item':
+        page.sitelinks = {}
+        page.badges = {}
+        for site, title, badges in sitelinks:
+            site = strings[site]
+            page.sitelinks[site] = title
+            if badges:
+                page.badges[site] = [strings[badge] for badge in badges]
+    return page
+
+
+def loads(data):
+    """
+    Decode an entity encoded by dumps().
+
+    @param data: the blob
+    @type data: bytes
+    @rtype: ItemPage or PropertyPage
+    @raises ValueError: data is not a blob of a supported version
+    """
+    data = bytes(data)
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not an encoded entity')
+    version, compression = bytearray(data[len(MAGIC):len(MAGIC) + 2])
+    if version != VERSION:
+        raise ValueError('Unsupported format version %d' % version)
+    payload = data[len(MAGIC) + 2:]
+    if compression == COMPRESSION['zlib']:
+        payload = zlib.decompress(payload)
+    elif compression == COMPRESSION['zstd']:
+        import zstandard
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif compression != COMPRESSION[None]:
+        raise ValueError('Unknown compression code %d' % compression)
+    return _decode(marshal.loads(payload))
@@ -10,12 +10,14 @@ Handling claims in a Wikibase entity.
 #
 from __future__ import unicode_literals
 from collections import defaultdict, OrderedDict
+from operator import attrgetter
 
 from pywikibase import Coordinate
 from pywikibase import WbTime
 from pywikibase import WbQuantity
 from pywikibase import Property
 import pywikibase.itempage
+from pywikibase.wikibasepage import _copy, _freeze
 
 try:
     unicode = unicode
@@ -23,6 +25,23 @@ except NameError:
     basestring = (str, bytes)
 
 
+def _tracked(name):
+    """
+    Return a property which invalidates the cached JSON of a claim.
+
+    The value is stored in the slot of the same name prefixed with an
+    underscore.
+    """
+    slot = '_' + name
+
+    def fset(self, value):
+        if value is not getattr(self, slot):
+            setattr(self, slot, value)
+            self._invalidate()
+
+    return property(attrgetter(slot), fset)
+
+
 class Claim(Property):
 
     """
@@ -30,9 +49,23 @@ class Claim(Property):
 
     Claims are standard claims as well as references and qualifiers.
     """
+
+    __slots__ = ('_snak', '_hash', '_isReference', '_isQualifier', 'sources',
+                 'qualifiers', '_target', '_snaktype', '_rank', 'on_item',
+                 '_owner', '_json', '_key', '_keyhash')
+
+    # Changing these through attribute access invalidates the cached JSON
+    snak = _tracked('snak')
+    hash = _tracked('hash')
+    isReference = _tracked('isReference')
+    isQualifier = _tracked('isQualifier')
+    target = _tracked('target')
+    snaktype = _tracked('snaktype')
+    rank = _tracked('rank')
+
     TARGET_CONVERTER = {
         'wikibase-item': lambda value:
-            pywikibase.itempage.ItemPage('Q' + str(value['numeric-id'])),
+            pywikibase.itempage.ItemPage.fromNumericID(value['numeric-id']),
         'globe-coordinate': Coordinate.fromWikibase,
         'time': lambda value: WbTime.fromWikibase(value),
         'quantity': lambda value: WbQuantity.fromWikibase(value),
@@ -52,20 +85,46 @@ class Claim(Property):
         @param isQualifier: whether specified claim is a qualifier
         """
         Property.__init__(self, pid, **kwargs)
-        self.snak = snak
-        self.hash = hash
-        self.isReference = isReference
-        self.isQualifier = isQualifier
-        if self.isQualifier and self.isReference:
+        if isQualifier and isReference:
             raise ValueError(
                 u'Claim cannot be both a qualifier and reference.')
+        self._initSlots(snak, hash, isReference, isQualifier)
+
+    def _initSlots(self, snak, hash, isReference, isQualifier):
+        """Set the slots of a new claim to their initial values."""
+        self._json = None
+        self._key = None
+        self._keyhash = None
+        self._owner = None  # The claim a qualifier or source belongs to
+        self._snak = snak
+        self._hash = hash
+        self._isReference = isReference
+        self._isQualifier = isQualifier
         self.sources = []
         self.qualifiers = OrderedDict()
-        self.target = None
-        self.snaktype = 'value'
-        self.rank = 'normal'
+        self._target = None
+        self._snaktype = 'value'
+        self._rank = 'normal'
         self.on_item = None  # The item it's on
 
+    @classmethod
+    def _create(cls, pid, datatype=None, snak=None, hash=None,
+                isReference=False, isQualifier=False):
+        """
+        Create a claim from trusted data, e.g. a decoded cache entry.
+
+        Unlike the constructor, the property id is neither normalized nor
+        checked.
+
+        @rtype: Claim
+        """
+        claim = cls.__new__(cls)
+        claim.id = pid
+        if datatype is not None:
+            claim._type = datatype
+        claim._initSlots(snak, hash, isReference, isQualifier)
+        return claim
+
     @classmethod
     def fromJSON(cls, data):
         """
@@ -84,25 +143,31 @@ class Claim(Property):
         claim = cls(data['mainsnak']['property'],
                     datatype=datatype)
         if 'id' in data:
-            claim.snak = data['id']
+            claim._snak = data['id']
         elif 'hash' in data:
-            claim.hash = data['hash']
-        claim.snaktype = data['mainsnak']['snaktype']
+            claim._hash = data['hash']
+        claim._snaktype = data['mainsnak']['snaktype']
         if claim.getSnakType() == 'value':
             value = data['mainsnak']['datavalue']['value']
             # The default covers string, url types
-            claim.target = Claim.TARGET_CONVERTER.get(
+            claim._target = Claim.TARGET_CONVERTER.get(
                 claim.type, lambda value: value)(value)
         if 'rank' in data:  # References/Qualifiers don't have ranks
-            claim.rank = data['rank']
+            claim._rank = data['rank']
         if 'references' in data:
             for source in data['references']:
-                claim.sources.append(cls.referenceFromJSON(source))
+                source = cls.referenceFromJSON(source)
+                for prop_sources in source.values():
+                    for src in prop_sources:
+                        src._owner = claim
+                claim.sources.append(source)
         if 'qualifiers' in data:
             for prop in data['qualifiers-order']:
-                claim.qualifiers[prop] = [
-                    cls.qualifierFromJSON(qualifier)
-                    for qualifier in data['qualifiers'][prop]]
+                qualifiers = [cls.qualifierFromJSON(qualifier)
+                              for qualifier in data['qualifiers'][prop]]
+                for qualifier in qualifiers:
+                    qualifier._owner = claim
+                claim.qualifiers[prop] = qualifiers
         return claim
 
     @classmethod
@@ -129,7 +194,7 @@ class Claim(Property):
             for claimsnak in data['snaks'][prop]:
                 claim = cls.fromJSON({'mainsnak': claimsnak,
                                       'hash': data['hash']})
-                claim.isReference = True
+                claim._isReference = True
                 if claim.getID() not in source:
                     source[claim.getID()] = []
                 source[claim.getID()].append(claim)
@@ -148,18 +213,97 @@ class Claim(Property):
         """
         claim = cls.fromJSON({'mainsnak': data,
                               'hash': data['hash']})
-        claim.isQualifier = True
+        claim._isQualifier = True
         return claim
 
     def __eq__(self, other):
-        return other.toJSON() == self.toJSON()
+        if not isinstance(other, Claim):
+            return NotImplemented
+        if self is other:
+            return True
+        key = self._canonical()
+        other_key = other._canonical()
+        return (self._keyhash == other._keyhash and key == other_key)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        """
+        Return the hash of the claim's content.
+
+        Changing a claim changes its hash, so a claim must not be changed
+        while it is in a set or used as a dict key.
+        """
+        self._canonical()
+        return self._keyhash
+
+    def _canonical(self):
+        """
+        Return a hashable key which is equal for claims with equal JSON.
+
+        The key is cached like the JSON and built from the cached keys of
+        the qualifiers and sources.
 
-    def toJSON(self):
+        @rtype: tuple
+        """
+        if self._key is None:
+            key = [self.id, self._snaktype, self._isQualifier,
+                   self._isReference]
+            if self._snaktype == 'value':
+                key += [getattr(self, '_type', None),
+                        _freeze(self._target)]
+            if self._isQualifier or self._isReference:
+                key.append(self._hash)
+            else:
+                key += [self._snak, self._rank,
+                        tuple((prop, tuple(qualifier._canonical()
+                                           for qualifier in qualifiers))
+                              for prop, qualifiers
+                              in self.qualifiers.items()),
+                        tuple(tuple((prop, tuple(source._canonical()
+                                                 for source in sources))
+                                    for prop, sources in collection.items())
+                              for collection in self.sources)]
+            self._key = tuple(key)
+            self._keyhash = hash(self._key)
+        return self._key
+
+    def toJSON(self, shared=False):
         """
         Create dict suitable for the MediaWiki API.
 
+        The result is cached until the claim, one of its qualifiers or
+        one of its sources is changed by setting an attribute or through
+        the methods of this class. Changes made in place to the target
+        object, the qualifiers dict or the sources list are not detected;
+        call L{setTarget} or L{invalidate} afterwards.
+
+        @param shared: return the cached dict itself instead of a copy;
+            faster, but the dict must not be modified
+        @type shared: bool
         @rtype: dict
         """
+        if self._json is None:
+            self._json = self._toJSON()
+        if shared:
+            return self._json
+        return _copy(self._json)
+
+    def invalidate(self):
+        """Drop the cached JSON of this claim and the claim it belongs to."""
+        self._invalidate()
+
+    def _invalidate(self):
+        self._json = None
+        self._key = None
+        if self._owner is not None:
+            self._owner._invalidate()
+        elif getattr(self.on_item, '_journal', None) is not None:
+            self.on_item._claimChanged(self)
+
+    def _toJSON(self):
         data = {
             'mainsnak': {
                 'snaktype': self.snaktype,
@@ -185,8 +329,9 @@ class Claim(Property):
                 for prop, qualifiers in self.qualifiers.items():
                     for qualifier in qualifiers:
                         qualifier.isQualifier = True
-                    data['qualifiers'][prop] = [qualifier.toJSON()
-                                                for qualifier in qualifiers]
+                    data['qualifiers'][prop] = [
+                        qualifier.toJSON(shared=True)
+                        for qualifier in qualifiers]
             if len(self.sources) > 0:
                 data['references'] = []
                 for collection in self.sources:
@@ -196,10 +341,11 @@ class Claim(Property):
                         reference['snaks'][prop] = []
                         for source in val:
                             source.isReference = True
-                            src_data = source.toJSON()
+                            src_data = source.toJSON(shared=True)
                             if 'hash' in src_data:
                                 if 'hash' not in reference:
                                     reference['hash'] = src_data['hash']
+                                src_data = dict(src_data)
                                 del src_data['hash']
                             reference['snaks'][prop].append(src_data)
                     data['references'].append(reference)
@@ -219,7 +365,8 @@ class Claim(Property):
         if not isinstance(value, value_class):
             raise ValueError("%s is not type %s."
                              % (value, value_class))
-        self.target = value
+        self._target = value
+        self._invalidate()
 
     def getTarget(self):
         """
@@ -246,7 +393,8 @@ class Claim(Property):
         @type value: str ('value', 'somevalue', or 'novalue')
         """
         if value in ['value', 'somevalue', 'novalue']:
-            self.snaktype = value
+            self._snaktype = value
+            self._invalidate()
         else:
             raise ValueError(
                 "snaktype must be 'value', 'somevalue', or 'novalue'.")
@@ -257,7 +405,8 @@ class Claim(Property):
 
     def setRank(self, rank):
         """Set the rank of the Claim."""
-        self.rank = rank
+        self._rank = rank
+        self._invalidate()
 
     def getSources(self):
         """
@@ -285,8 +434,10 @@ class Claim(Property):
         """
         source = defaultdict(list)
         for claim in claims:
+            claim._owner = self
             source[claim.getID()].append(claim)
         self.sources.append(source)
+        self._invalidate()
 
     def removeSource(self, source, **kwargs):
         """
@@ -308,6 +459,7 @@ class Claim(Property):
             source_dict = defaultdict(list)
             source_dict[source.getID()].append(source)
             self.sources.remove(source_dict)
+        self._invalidate()
 
     def addQualifier(self, qualifier):
         """Add the given qualifier.
@@ -318,10 +470,12 @@ class Claim(Property):
         qualifier.isQualifier = True
         if self.isQualifier is True or self.isReference is True:
             raise ValueError('Qualifiers and Sources can not have qualifier.')
+        qualifier._owner = self
         if qualifier.getID() in self.qualifiers:
             self.qualifiers[qualifier.getID()].append(qualifier)
         else:
             self.qualifiers[qualifier.getID()] = [qualifier]
+        self._invalidate()
 
     def target_equals(self, value):
         """
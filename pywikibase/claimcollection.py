@@ -0,0 +1,113 @@
+# -*- coding: utf-8  -*-
+"""
+Lazily materialized claims of a Wikibase entity.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+
+class ClaimCollection(MutableMapping):
+
+    """
+    Mapping of property ids to lists of Claims, built on first access.
+
+    The raw JSON of every property is kept as given and only turned into
+    Claim objects when the property is read for the first time. Properties
+    which have never been read can still be serialized using L{rawJSON}.
+    """
+
+    def __init__(self, raw=None, on_item=None):
+        """
+        Constructor.
+
+        @param raw: claims JSON, mapping property ids to lists of claims
+        @type raw: dict
+        @param on_item: the entity the claims belong to
+        @type on_item: WikibasePage
+        """
+        self._data = {}
+        self._pending = set()
+        self.on_item = on_item
+        if raw:
+            self._data.update(raw)
+            self._pending.update(raw)
+
+    def __getitem__(self, pid):
+        if pid in self._pending:
+            from pywikibase.claim import Claim
+            claims = []
+            for data in self._data[pid]:
+                claim = Claim.fromJSON(data)
+                claim.on_item = self.on_item
+                claims.append(claim)
+            self._data[pid] = claims
+            self._pending.discard(pid)
+        return self._data[pid]
+
+    def __setitem__(self, pid, claims):
+        self._data[pid] = claims
+        self._pending.discard(pid)
+
+    def __delitem__(self, pid):
+        del self._data[pid]
+        self._pending.discard(pid)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, pid):
+        return pid in self._data
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(self.__class__.__name__,
+                                   sorted(self._data))
+
+    def copy(self):
+        """
+        Return a shallow copy of the collection.
+
+        Properties not materialized yet stay unmaterialized in the copy.
+
+        @rtype: ClaimCollection
+        """
+        other = self.__class__(on_item=self.on_item)
+        other._data = self._data.copy()
+        other._pending = self._pending.copy()
+        return other
+
+    def isMaterialized(self, pid):
+        """
+        Return whether the Claims of the property have been built.
+
+        @param pid: property id, with "P" prefix
+        @type pid: str
+        @rtype: bool
+        """
+        return pid not in self._pending
+
+    def rawJSON(self, pid):
+        """
+        Return the unmodified JSON of a property not materialized yet.
+
+        @param pid: property id, with "P" prefix
+        @type pid: str
+        @return: list of claim JSON, or None if the property's Claims
+            have already been built
+        @rtype: list
+        """
+        if pid in self._pending:
+            return self._data[pid]
+        return None
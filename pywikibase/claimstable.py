@@ -0,0 +1,309 @@
+# -*- coding: utf-8  -*-
+"""
+Columnar export of the claims of many entities.
+
+Every main statement becomes a row, and every column is a typed array, so
+the table can be handed to NumPy or Arrow without per-row objects.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+from array import array
+
+from pywikibase import jsonbackend
+from pywikibase.claim import Claim
+from pywikibase.coordinate import Coordinate
+from pywikibase.exceptions import EntityTypeUnknownException
+from pywikibase.wbproperty import Property
+from pywikibase.wbquantity import WbQuantity
+from pywikibase.wbtime import _INT64, WbTime
+from pywikibase.wikibasepage import WikibasePage
+
+try:
+    unicode = unicode
+except NameError:
+    basestring = (str, bytes)
+
+NAN = float('nan')
+
+
+class ClaimsTable(object):
+
+    """
+    Typed column buffers holding one row per main statement.
+
+    Should be used as::
+
+        table = ClaimsTable()
+        for page in DumpReader('latest-all.json.gz', lazy=True):
+            table.add(page)
+        columns = table.toNumpy()
+
+    Ids are stored without their prefix. Rank, snak type, datatype and
+    calendar model are stored as the integer codes of RANKS, SNAKTYPES,
+    datatypes and WbTime.CALENDARMODEL_CODES. Value columns which do not
+    apply to the datatype of a row hold 0, or NaN for floats. Strings,
+    i.e. string-like targets and the text of monolingual texts, are stored
+    as UTF-8 in string_data, row i being
+    string_data[string_offsets[i]:string_offsets[i + 1]].
+    """
+
+    RANKS = ('deprecated', 'normal', 'preferred')
+    SNAKTYPES = ('value', 'somevalue', 'novalue')
+    ENTITY_TYPES = ('item', 'property', 'lexeme', 'mediainfo')
+
+    COLUMNS = (('subject', _INT64),
+               ('subject_type', 'b'),
+               ('property', _INT64),
+               ('rank', 'b'),
+               ('snaktype', 'b'),
+               ('datatype', 'b'),
+               ('item', _INT64),
+               ('latitude', 'd'),
+               ('longitude', 'd'),
+               ('time_year', _INT64),
+               ('time_month', 'b'),
+               ('time_day', 'b'),
+               ('time_precision', 'b'),
+               ('time_calendarmodel', 'b'),
+               ('amount', 'd'),
+               ('qualifiers', 'i'),
+               ('references', 'i'),
+               )
+
+    def __init__(self):
+        """Constructor."""
+        for name, typecode in self.COLUMNS:
+            setattr(self, name, array(typecode))
+        self.string_offsets = array(_INT64, [0])
+        self.string_data = bytearray()
+        self.datatypes = sorted(set(Property.types) |
+                                set(Claim.TARGET_CONVERTER))
+        self._datatype_codes = dict((datatype, code) for code, datatype
+                                    in enumerate(self.datatypes))
+        self._rank_codes = dict((rank, code) for code, rank
+                                in enumerate(self.RANKS))
+        self._snaktype_codes = dict((snaktype, code) for code, snaktype
+                                    in enumerate(self.SNAKTYPES))
+        self._entity_type_codes = dict((entity_type, code) for code,
+                                       entity_type
+                                       in enumerate(self.ENTITY_TYPES))
+        self._prefix_types = dict((entity_type[0].upper(), entity_type)
+                                  for entity_type in self.ENTITY_TYPES)
+
+    def __len__(self):
+        return len(self.subject)
+
+    def _datatype_code(self, datatype):
+        code = self._datatype_codes.get(datatype)
+        if code is None:
+            code = self._datatype_codes[datatype] = len(self.datatypes)
+            self.datatypes.append(datatype)
+        return code
+
+    def add(self, entity):
+        """
+        Add a row for every main statement of an entity.
+
+        If a statement cannot be added, e.g. because its JSON is invalid,
+        no row of the entity is added.
+
+        @param entity: a parsed entity, or the JSON of one
+        @type entity: WikibasePage, dict, str or bytes
+        """
+        length = len(self)
+        try:
+            if isinstance(entity, WikibasePage):
+                self._add_page(entity)
+            else:
+                if not isinstance(entity, dict):
+                    entity = jsonbackend.loads(entity)
+                self._add_raw(entity)
+        except BaseException:
+            self._truncate(length)
+            raise
+
+    def _truncate(self, length):
+        """Remove the rows from length on."""
+        for name, typecode in self.COLUMNS:
+            del getattr(self, name)[length:]
+        del self.string_data[self.string_offsets[length]:]
+        del self.string_offsets[length + 1:]
+
+    def extend(self, entities):
+        """
+        Add the rows of many entities.
+
+        @param entities: parsed entities or their JSON
+        @type entities: iterable
+        """
+        for entity in entities:
+            self.add(entity)
+
+    def _start_row(self, subject, subject_type, pid, rank, snaktype,
+                   datatype, qualifiers, references):
+        """Return the codes of a row; nothing is appended before _end_row."""
+        code = self._entity_type_codes.get(subject_type)
+        if code is None:
+            raise EntityTypeUnknownException(
+                u"'%s' is not a supported entity type" % subject_type)
+        return (subject, code, int(pid[1:]), self._rank_codes[rank],
+                self._snaktype_codes[snaktype], self._datatype_code(datatype),
+                qualifiers, references)
+
+    def _end_row(self, row, item=0, latitude=NAN, longitude=NAN, time=None,
+                 amount=NAN, string=None):
+        """Append a row of the codes from _start_row and the values."""
+        (subject, subject_type, pid, rank, snaktype, datatype, qualifiers,
+         references) = row
+        self.subject.append(subject)
+        self.subject_type.append(subject_type)
+        self.property.append(pid)
+        self.rank.append(rank)
+        self.snaktype.append(snaktype)
+        self.datatype.append(datatype)
+        self.qualifiers.append(qualifiers)
+        self.references.append(references)
+        self.item.append(item)
+        self.latitude.append(latitude)
+        self.longitude.append(longitude)
+        if time is None:
+            time = (0, 0, 0, 0, 0)
+        self.time_year.append(time[0])
+        self.time_month.append(time[1])
+        self.time_day.append(time[2])
+        self.time_precision.append(time[3])
+        self.time_calendarmodel.append(time[4])
+        self.amount.append(amount)
+        if string is not None:
+            self.string_data += string.encode('utf-8')
+        self.string_offsets.append(len(self.string_data))
+
+    def _add_page(self, page):
+        subject = page.getID(numeric=True)
+        subject_type = self._prefix_types.get(page.getID()[0], 'item')
+        codes = WbTime.CALENDARMODEL_CODES
+        for pid in page.claims:
+            for claim in page.claims[pid]:
+                datatype = getattr(claim, '_type', None)
+                row = self._start_row(subject, subject_type, pid,
+                                      claim.rank, claim.snaktype, datatype,
+                                      sum(len(qualifiers) for qualifiers
+                                          in claim.qualifiers.values()),
+                                      len(claim.sources))
+                target = claim.target
+                if claim.snaktype != 'value':
+                    self._end_row(row)
+                elif isinstance(target, WikibasePage):
+                    self._end_row(row, item=target.getID(numeric=True))
+                elif isinstance(target, Coordinate):
+                    self._end_row(row, latitude=target.lat,
+                                  longitude=target.lon)
+                elif isinstance(target, WbTime):
+                    self._end_row(row, time=(target.year, target.month,
+                                             target.day, target.precision,
+                                             codes.get(target.calendarmodel,
+                                                       0)))
+                elif isinstance(target, WbQuantity):
+                    self._end_row(row, amount=float(target))
+                elif isinstance(target, dict):
+                    self._end_row(row, string=target.get('text'))
+                elif isinstance(target, basestring):
+                    self._end_row(row, string=target)
+                else:
+                    self._end_row(row)
+
+    def _add_raw(self, content):
+        subject = int(content['id'][1:])
+        subject_type = content.get('type', 'item')
+        codes = WbTime.CALENDARMODEL_CODES
+        for pid, claims in content.get('claims', {}).items():
+            for data in claims:
+                snak = data['mainsnak']
+                datatype = snak.get('datatype')
+                if not datatype:
+                    datatype = Claim._format_datatype(
+                        snak.get('datavalue', {}).get('type'))
+                row = self._start_row(
+                    subject, subject_type, pid, data.get('rank', 'normal'),
+                    snak['snaktype'], datatype,
+                    sum(len(qualifiers) for qualifiers
+                        in data.get('qualifiers', {}).values()),
+                    len(data.get('references', ())))
+                if snak['snaktype'] != 'value':
+                    self._end_row(row)
+                    continue
+                value = snak['datavalue']['value']
+                if datatype == 'wikibase-item':
+                    self._end_row(row, item=value['numeric-id'])
+                elif datatype == 'globe-coordinate':
+                    self._end_row(row, latitude=value['latitude'],
+                                  longitude=value['longitude'])
+                elif datatype == 'time':
+                    year, month, day = WbTime._splitDate(value['time'])
+                    self._end_row(row, time=(year, month, day,
+                                             value['precision'],
+                                             codes.get(value['calendarmodel'],
+                                                       0)))
+                elif datatype == 'quantity':
+                    self._end_row(row, amount=float(value['amount']))
+                elif isinstance(value, dict):
+                    self._end_row(row, string=value.get('text'))
+                elif isinstance(value, basestring):
+                    self._end_row(row, string=value)
+                else:
+                    self._end_row(row)
+
+    def getString(self, row):
+        """
+        Return the string of a row.
+
+        @param row: index of the row
+        @type row: int
+        @rtype: str
+        """
+        return self.string_data[self.string_offsets[row]:
+                                self.string_offsets[row + 1]].decode('utf-8')
+
+    def toNumpy(self):
+        """
+        Return the columns as NumPy arrays.
+
+        The strings are returned as 'string_offsets' (int64) and
+        'string_data' (uint8). The arrays are copies, as the buffers of
+        the table cannot grow while NumPy arrays share them, so rows can
+        still be added afterwards.
+
+        @rtype: dict
+        """
+        import numpy
+        columns = dict((name, numpy.frombuffer(getattr(self, name),
+                                               dtype=typecode).copy())
+                       for name, typecode in self.COLUMNS +
+                       (('string_offsets', _INT64),))
+        columns['string_data'] = numpy.frombuffer(self.string_data,
+                                                  dtype='uint8').copy()
+        return columns
+
+    def toArrow(self):
+        """
+        Return the columns as a pyarrow Table.
+
+        The strings become one large_string column named 'string'.
+
+        @rtype: pyarrow.Table
+        """
+        import pyarrow
+        columns = self.toNumpy()
+        names = [name for name, typecode in self.COLUMNS]
+        arrays = [pyarrow.array(columns[name]) for name in names]
+        arrays.append(pyarrow.LargeStringArray.from_buffers(
+            len(self), pyarrow.py_buffer(self.string_offsets),
+            pyarrow.py_buffer(bytes(self.string_data))))
+        names.append('string')
+        return pyarrow.Table.from_arrays(arrays, names=names)
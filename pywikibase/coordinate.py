@@ -8,12 +8,79 @@ Wikibase coordinate.
 #
 # Distributed under the terms of the MIT license.
 #
-from __future__ import unicode_literals
+from __future__ import division, unicode_literals
 
 import math
 
 from pywikibase.exceptions import CoordinateGlobeUnknownException
 
+# Entity URLs of the globes supported by Wikidata
+GLOBES = dict((globe, 'http://www.wikidata.org/entity/Q%d' % number)
+              for globe, number in (
+                  ('ariel', 3343), ('callisto', 3134), ('ceres', 596),
+                  ('deimos', 7548), ('dione', 15040), ('earth', 2),
+                  ('enceladus', 3303), ('eros', 16711), ('europa', 3143),
+                  ('ganymede', 3169), ('gaspra', 158244),
+                  ('hyperion', 15037), ('iapetus', 17958), ('io', 3123),
+                  ('jupiter', 319), ('lutetia', 107556), ('mars', 111),
+                  ('mercury', 308), ('miranda', 3352), ('moon', 405),
+                  ('oberon', 3332), ('phobos', 7547), ('phoebe', 17975),
+                  ('pluto', 339), ('rhea', 15050), ('steins', 150249),
+                  ('tethys', 15047), ('titan', 2565), ('titania', 3322),
+                  ('triton', 3359), ('umbriel', 3338), ('venus', 313),
+                  ('vesta', 3030)))
+
+EARTH = GLOBES['earth']
+
+# Equatorial radii in meters of the globes, used for distances and for
+# converting dimensions into precisions
+RADII = {EARTH: 6378137,
+         GLOBES['mercury']: 2440530,
+         GLOBES['venus']: 6051800,
+         GLOBES['mars']: 3396190,
+         GLOBES['moon']: 1737400,
+         }
+
+RADIUS = RADII[EARTH]
+
+
+def globe_radius(entity):
+    """
+    Return the radius of a globe.
+
+    @param entity: entity URL of the globe
+    @type entity: str
+    @return: radius in meters
+    @rtype: int
+    @raises CoordinateGlobeUnknownException: the radius is not known
+    """
+    try:
+        return RADII[entity]
+    except KeyError:
+        raise CoordinateGlobeUnknownException(
+            u'The radius of %s is not known.' % entity)
+
+
+def haversine(lat1, lon1, lat2, lon2, radius=RADIUS):
+    """
+    Return the great-circle distance of two points.
+
+    @param lat1: latitude of the first point in degrees
+    @param lon1: longitude of the first point in degrees
+    @param lat2: latitude of the second point in degrees
+    @param lon2: longitude of the second point in degrees
+    @param radius: radius of the globe
+    @return: the distance in the unit of radius, by default in meters on
+        the Earth
+    @rtype: float
+    """
+    lat1 = math.radians(lat1)
+    lat2 = math.radians(lat2)
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) *
+         math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * radius * math.asin(math.sqrt(min(a, 1)))
+
 
 class Coordinate(object):
 
@@ -24,6 +91,9 @@ class Coordinate(object):
     in the future we can use it for the GeoData extension.
     """
 
+    __slots__ = ('lat', 'lon', 'alt', '_precision', 'globe', '_entity',
+                 'type', 'name', '_dim', 'site')
+
     def __init__(self, lat, lon, alt=None, precision=None, globe='earth',
                  typ="", name="", dim=None, site=None, entity=''):
         """
@@ -67,14 +137,48 @@ class Coordinate(object):
         string += ')'
         return string
 
+    def _globes(self):
+        """Return the entity URLs of the globes by name."""
+        return self.site.globes() if self.site else GLOBES
+
+    def _key(self):
+        # the globe as entity URL, so that globe='earth' equals the entity
+        globe = self._entity or self._globes().get(self.globe, self.globe)
+        return (self.lat, self.lon, self.alt, globe, self.precision)
+
     def __eq__(self, other):
-        return other.toWikibase() == self.toWikibase()
+        if not isinstance(other, Coordinate):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        """
+        Return the hash of the current value.
+
+        The attributes of a Coordinate can be changed; a coordinate must
+        not be changed while it is in a set or a dict key.
+        """
+        return hash(self._key())
 
     @property
     def entity(self):
+        """
+        Return the entity URL of the globe.
+
+        @raises CoordinateGlobeUnknownException: the globe is not known to
+            the site, or to Wikidata if there is no site
+        """
         if self._entity:
             return self._entity
-        return self.site.globes()[self.globe]
+        try:
+            return self._globes()[self.globe]
+        except KeyError:
+            raise CoordinateGlobeUnknownException(
+                u"%s is not supported in Wikibase yet." % self.globe)
 
     def toWikibase(self):
         """
@@ -82,10 +186,6 @@ class Coordinate(object):
 
         FIXME: Should this be in the DataSite object?
         """
-        if not self._entity and self.globe not in self.site.globes():
-            raise CoordinateGlobeUnknownException(
-                u"%s is not supported in Wikibase yet."
-                % self.globe)
         return {'latitude': self.lat,
                 'longitude': self.lon,
                 'altitude': self.alt,
@@ -132,11 +232,15 @@ class Coordinate(object):
         Therefore::
             precision = math.degrees(
                 self._dim/(radius*math.cos(math.radians(self.lat))))
+
+        The radius of the Earth is used for globes whose radius is not in
+        RADII.
         """
         if not self._precision:
             if self._dim is None:
                 return self._precision
-            radius = 6378137  # TODO: Support other globes
+            entity = self._entity or self._globes().get(self.globe)
+            radius = RADII.get(entity, RADIUS)
             self._precision = math.degrees(
                 self._dim / (radius * math.cos(math.radians(self.lat))))
         return self._precision
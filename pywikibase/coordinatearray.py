@@ -0,0 +1,231 @@
+# -*- coding: utf-8  -*-
+"""
+Batches of coordinates backed by NumPy arrays.
+
+This module requires NumPy.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import numpy
+
+from pywikibase.coordinate import EARTH, RADII, Coordinate
+from pywikibase.exceptions import CoordinateGlobeUnknownException
+
+try:
+    unicode = unicode
+except NameError:
+    basestring = (str, bytes)
+
+
+class CoordinateArray(object):
+
+    """
+    Many coordinates stored as parallel NumPy arrays.
+
+    Should be created from Wikibase JSON as::
+
+        coords = CoordinateArray.fromWikibase(
+            claim['mainsnak']['datavalue'] for claim in claims)
+
+    Globes are stored as indexes into the list globes of entity URLs.
+    Missing precisions and dimensions are NaN.
+    """
+
+    def __init__(self, lat, lon, precision=None, globe=None, dim=None,
+                 globes=None):
+        """
+        Constructor.
+
+        @param lat: latitudes
+        @param lon: longitudes
+        @param precision: precisions in degrees
+        @param globe: globe codes, indexes into globes; defaults to 0
+        @param dim: dimensions in meters, used when there is no precision
+        @param globes: entity URLs of the globes; defaults to the Earth
+        @type globes: list
+        """
+        self.lat = numpy.asarray(lat, dtype=numpy.float64)
+        self.lon = numpy.asarray(lon, dtype=numpy.float64)
+        if self.lat.shape != self.lon.shape or self.lat.ndim != 1:
+            raise ValueError('lat and lon must be 1-D arrays of equal size')
+        self._precision = self._column(precision, numpy.float64, numpy.nan)
+        self.dim = self._column(dim, numpy.float64, numpy.nan)
+        self.globe = self._column(globe, numpy.int16, 0)
+        self.globes = list(globes) if globes else [EARTH]
+
+    def _column(self, values, dtype, default):
+        if values is None:
+            return numpy.full(len(self.lat), default, dtype=dtype)
+        values = numpy.asarray(values, dtype=dtype)
+        if values.shape != self.lat.shape:
+            raise ValueError('all columns must have the same size')
+        return values
+
+    @classmethod
+    def fromWikibase(cls, values):
+        """
+        Create an array from globe-coordinate JSON.
+
+        @param values: globecoordinate datavalues or their value dicts
+        @type values: iterable of dict
+        @rtype: CoordinateArray
+        """
+        lat = []
+        lon = []
+        precision = []
+        globe = []
+        globes = [EARTH]
+        codes = {EARTH: 0}
+        for value in values:
+            if 'value' in value:
+                value = value['value']
+            lat.append(value['latitude'])
+            lon.append(value['longitude'])
+            precision.append(value.get('precision'))
+            uri = value.get('globe') or EARTH
+            code = codes.get(uri)
+            if code is None:
+                code = codes[uri] = len(globes)
+                globes.append(uri)
+            globe.append(code)
+        # None becomes NaN
+        precision = numpy.array(precision, dtype=numpy.float64)
+        return cls(lat, lon, precision, globe, globes=globes)
+
+    @classmethod
+    def fromCoordinates(cls, coordinates):
+        """
+        Create an array from Coordinate objects.
+
+        @param coordinates: the coordinates
+        @type coordinates: iterable of Coordinate
+        @rtype: CoordinateArray
+        """
+        coordinates = list(coordinates)
+        values = []
+        for coord in coordinates:
+            values.append({'latitude': coord.lat, 'longitude': coord.lon,
+                           'precision': coord._precision,
+                           'globe': coord.entity})
+        array = cls.fromWikibase(values)
+        array.dim = numpy.array([coord._dim for coord in coordinates],
+                                dtype=numpy.float64)
+        return array
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __getitem__(self, index):
+        """Return a single coordinate as Coordinate."""
+        precision = self._precision[index]
+        dim = self.dim[index]
+        return Coordinate(float(self.lat[index]), float(self.lon[index]),
+                          precision=None if numpy.isnan(precision)
+                          else float(precision),
+                          dim=None if numpy.isnan(dim) else float(dim),
+                          entity=self.globes[self.globe[index]])
+
+    @property
+    def precision(self):
+        """
+        Return the precisions in degrees.
+
+        Missing precisions are derived from the dimension like
+        Coordinate.precision does, and are NaN if there is neither. Unlike
+        Coordinate.precision, globes without a known radius are an error.
+
+        @rtype: numpy.ndarray
+        @raises CoordinateGlobeUnknownException: the radius of a globe is
+            not known
+        """
+        precision = self._precision.copy()
+        missing = (numpy.isnan(precision) | (precision == 0)) & \
+            ~numpy.isnan(self.dim)
+        if missing.any():
+            precision[missing] = numpy.degrees(
+                self.dim[missing] /
+                (self._radii(missing) *
+                 numpy.cos(numpy.radians(self.lat[missing]))))
+        return precision
+
+    def _radii(self, rows=slice(None)):
+        """
+        Return the radius of the globe of the coordinates in meters.
+
+        @raises CoordinateGlobeUnknownException: the radius of a globe is
+            not known
+        """
+        radii = numpy.array([RADII.get(uri, numpy.nan)
+                             for uri in self.globes])[self.globe[rows]]
+        unknown = numpy.isnan(radii)
+        if unknown.any():
+            raise CoordinateGlobeUnknownException(
+                u'The radius of %s is not known.'
+                % self.globes[self.globe[rows][unknown][0]])
+        return radii
+
+    def target_equals(self, value):
+        """
+        Check which coordinates are equal to a value, regarding precision.
+
+        This has the semantics of Claim.target_equals: the coordinates
+        match when latitude and longitude both differ by at most the
+        larger of the given precision (default 0.0001) and the precision
+        of the coordinate.
+
+        @param value: "lat,lon" or "lat,lon,precision", or a tuple thereof
+        @type value: str or tuple
+        @rtype: numpy.ndarray of bool
+        """
+        if isinstance(value, basestring):
+            value = [float(x) for x in value.split(',')]
+        if len(value) >= 3:
+            tolerance = value[2]
+        else:
+            tolerance = 0.0001  # Default value (~10 m at equator)
+        # fmax ignores the NaN of missing precisions
+        tolerance = numpy.fmax(tolerance, self.precision)
+        return ((numpy.abs(self.lat - value[0]) <= tolerance) &
+                (numpy.abs(self.lon - value[1]) <= tolerance))
+
+    def distance(self, lat, lon=None):
+        """
+        Return great-circle distances in meters using the haversine formula.
+
+        Distances are measured on the globe of every coordinate, i.e. a
+        point is taken to be on the same globe.
+
+        @param lat: latitude of a point, or a CoordinateArray of the same
+            length for element-wise distances
+        @type lat: float or CoordinateArray
+        @param lon: longitude of the point
+        @type lon: float
+        @rtype: numpy.ndarray
+        @raises ValueError: the coordinates of a CoordinateArray are on
+            other globes
+        @raises CoordinateGlobeUnknownException: the radius of a globe is
+            not known
+        """
+        radius = self._radii()
+        if isinstance(lat, CoordinateArray):
+            other = lat
+            if len(other) != len(self) or \
+                    (numpy.array(self.globes, dtype=object)[self.globe] !=
+                     numpy.array(other.globes, dtype=object)[other.globe]
+                     ).any():
+                raise ValueError('Distances can only be measured between '
+                                 'coordinates on the same globe')
+            lat, lon = other.lat, other.lon
+        lat1 = numpy.radians(self.lat)
+        lat2 = numpy.radians(lat)
+        dlat = lat2 - lat1
+        dlon = numpy.radians(lon) - numpy.radians(self.lon)
+        a = (numpy.sin(dlat / 2) ** 2 +
+             numpy.cos(lat1) * numpy.cos(lat2) * numpy.sin(dlon / 2) ** 2)
+        return 2 * radius * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1)))
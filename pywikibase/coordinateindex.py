@@ -0,0 +1,255 @@
+# -*- coding: utf-8  -*-
+"""
+Spatial index over coordinate claims.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import division, unicode_literals
+
+import heapq
+import math
+from collections import defaultdict
+
+from pywikibase.coordinate import EARTH, Coordinate, globe_radius, haversine
+
+
+class CoordinateIndex(object):
+
+    """
+    Grid index of globe-coordinate claims for proximity queries.
+
+    Should be used as::
+
+        index = CoordinateIndex()
+        for page in DumpReader('latest-all.json.gz', lazy=True):
+            index.addPage(page)
+        for entity_id, claim in index.within(52.52, 13.40, 500):
+            print(entity_id, claim.target)
+
+    Points are kept per globe in square cells of cell_size degrees. All
+    queries return (entity id, claim) tuples; distances are great-circle
+    distances in meters on a sphere with the radius of the globe, see
+    L{pywikibase.coordinate.RADII}.
+    """
+
+    def __init__(self, cell_size=0.1):
+        """
+        Constructor.
+
+        @param cell_size: edge of the grid cells in degrees; queries are
+            fastest when it is close to the usual search radius
+        @type cell_size: float
+        """
+        if not 0 < cell_size <= 90:
+            raise ValueError('cell_size must be in (0, 90]')
+        self.cell_size = cell_size
+        self._columns = int(math.ceil(360 / cell_size))
+        self._rows = int(math.ceil(180 / cell_size))
+        # globe -> (column, row) -> [(lat, lon, number, entity id, claim)]
+        self._cells = defaultdict(lambda: defaultdict(list))
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _cell(self, lat, lon):
+        column = int(math.floor((lon + 180) / self.cell_size))
+        row = int(math.floor((lat + 90) / self.cell_size))
+        return column % self._columns, min(max(row, 0), self._rows - 1)
+
+    def add(self, entity_id, claim):
+        """
+        Add a coordinate claim.
+
+        Claims without a Coordinate target are ignored.
+
+        @param entity_id: id of the entity the claim is on
+        @type entity_id: str
+        @param claim: the claim
+        @type claim: Claim
+        """
+        target = claim.getTarget()
+        if not isinstance(target, Coordinate):
+            return
+        globe = target.entity
+        self._cells[globe][self._cell(target.lat, target.lon)].append(
+            (target.lat, target.lon, self._count, entity_id, claim))
+        self._count += 1
+
+    def addPage(self, page, pid='P625'):
+        """
+        Add the coordinate claims of an entity.
+
+        @param page: the entity
+        @type page: WikibasePage
+        @param pid: the property of the claims
+        @type pid: str
+        """
+        if pid in page.claims:
+            entity_id = page.getID()
+            for claim in page.claims[pid]:
+                self.add(entity_id, claim)
+
+    def _points_in_cells(self, globe, rows, columns):
+        cells = self._cells.get(globe, {})
+        for row in rows:
+            for column in columns:
+                for point in cells.get((column % self._columns, row), ()):
+                    yield point
+
+    def _rows_between(self, south, north):
+        return range(self._cell(south, 0)[1], self._cell(north, 0)[1] + 1)
+
+    def _columns_between(self, west, east):
+        first = int(math.floor((west + 180) / self.cell_size))
+        last = int(math.floor((east + 180) / self.cell_size))
+        if last < first:  # crossing the antimeridian
+            last += self._columns
+        return range(first, min(last, first + self._columns - 1) + 1)
+
+    def bbox(self, south, west, north, east, globe=EARTH):
+        """
+        Return the claims inside a bounding box.
+
+        @param south: minimal latitude
+        @param west: minimal longitude; may be larger than east when the
+            box crosses the antimeridian
+        @param north: maximal latitude
+        @param east: maximal longitude
+        @param globe: entity URL of the globe
+        @type globe: str
+        @rtype: list of tuple
+        """
+        crossing = east < west
+        result = []
+        for lat, lon, number, entity_id, claim in self._points_in_cells(
+                globe, self._rows_between(south, north),
+                self._columns_between(west, east)):
+            if not south <= lat <= north:
+                continue
+            if crossing:
+                if not (lon >= west or lon <= east):
+                    continue
+            elif not west <= lon <= east:
+                continue
+            result.append((entity_id, claim))
+        return result
+
+    def _candidates(self, lat, lon, radius, globe):
+        """Return the points of all cells which may be within radius."""
+        dlat = math.degrees(radius / globe_radius(globe))
+        south = max(lat - dlat, -90)
+        north = min(lat + dlat, 90)
+        cos = math.cos(math.radians(max(abs(south), abs(north))))
+        if north >= 90 or south <= -90 or dlat >= 180 * cos:
+            columns = range(self._columns)
+        else:
+            dlon = dlat / cos
+            columns = self._columns_between(lon - dlon, lon + dlon)
+        return self._points_in_cells(globe, self._rows_between(south, north),
+                                     columns)
+
+    def within(self, lat, lon, radius, globe=EARTH):
+        """
+        Return the claims within a radius, nearest first.
+
+        @param lat: latitude of the center
+        @param lon: longitude of the center
+        @param radius: radius in meters
+        @param globe: entity URL of the globe
+        @type globe: str
+        @rtype: list of tuple
+        """
+        found = []
+        globe_meters = globe_radius(globe)
+        for point in self._candidates(lat, lon, radius, globe):
+            distance = haversine(lat, lon, point[0], point[1], globe_meters)
+            if distance <= radius:
+                found.append((distance, point[2], point[3], point[4]))
+        found.sort()
+        return [(entity_id, claim)
+                for distance, number, entity_id, claim in found]
+
+    def nearest(self, lat, lon, k=1, globe=EARTH):
+        """
+        Return the k claims nearest to a point, nearest first.
+
+        @param lat: latitude of the point
+        @param lon: longitude of the point
+        @param k: number of claims
+        @type k: int
+        @param globe: entity URL of the globe
+        @type globe: str
+        @rtype: list of tuple
+        """
+        cells = self._cells.get(globe, {})
+        globe_meters = globe_radius(globe)
+        column, row = self._cell(lat, lon)
+        # max-heap of the k best as (-distance, -number, entity id, claim)
+        best = []
+        seen = set()
+        cell_meters = math.radians(self.cell_size) * globe_meters
+        ring = 0
+        while len(seen) < len(cells):
+            if (2 * ring + 1) ** 2 >= len(cells) or \
+                    ring > max(self._rows, self._columns):
+                keys = [key for key in cells if key not in seen]
+            else:
+                keys = set()
+                for dx in range(-ring, ring + 1):
+                    for dy in (-ring, ring):
+                        keys.add(((column + dx) % self._columns, row + dy))
+                        keys.add(((column + dy) % self._columns, row + dx))
+            for key in keys:
+                if key in seen or key not in cells:
+                    continue
+                seen.add(key)
+                for point in cells[key]:
+                    entry = (-haversine(lat, lon, point[0], point[1],
+                                        globe_meters),
+                             -point[2], point[3], point[4])
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+            # Every point of the next ring is at least ring cells away in
+            # latitude or in longitude; longitude cells shrink towards the
+            # poles.
+            if len(best) == k:
+                lat_edge = min(abs(lat) + (ring + 1) * self.cell_size, 90)
+                dlon = min(math.radians(ring * self.cell_size), math.pi)
+                bound = min(ring * cell_meters, 2 * globe_meters * math.asin(
+                    math.cos(math.radians(lat_edge)) * math.sin(dlon / 2)))
+                if bound >= -best[0][0]:
+                    break
+            ring += 1
+        best.sort(reverse=True)
+        return [(entity_id, claim)
+                for distance, number, entity_id, claim in best]
+
+    def duplicates(self, tolerance=1.0, globe=EARTH):
+        """
+        Return pairs of claims at the same location.
+
+        @param tolerance: maximal distance in meters
+        @type tolerance: float
+        @param globe: entity URL of the globe
+        @type globe: str
+        @return: pairs of (entity id, claim) tuples, each pair once
+        @rtype: list of tuple
+        """
+        pairs = []
+        globe_meters = globe_radius(globe)
+        for points in self._cells.get(globe, {}).values():
+            for lat, lon, number, entity_id, claim in points:
+                for other in self._candidates(lat, lon, tolerance, globe):
+                    if other[2] > number and haversine(
+                            lat, lon, other[0], other[1],
+                            globe_meters) <= tolerance:
+                        pairs.append(((entity_id, claim),
+                                      (other[3], other[4])))
+        return pairs
@@ -0,0 +1,366 @@
+# -*- coding: utf-8  -*-
+"""
+Persistent cache of entities on disk.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import errno
+import os
+import re
+import struct
+import tempfile
+import zlib
+
+from pywikibase import binary
+from pywikibase.dumpindex import _replace
+from pywikibase.wikibasepage import WikibasePage
+
+MAGIC = b'WBDC'
+VERSION = 1
+
+# magic, version and lastrevid, followed by the binary encoded entity
+_HEADER = struct.Struct('<4sBxxxQ')
+# lastrevid of entities without one
+_NO_REVISION = 0
+
+_SUFFIX = '.wbe'
+
+# ids which may be used as file names
+_ID_RE = re.compile(r'[QPLM][1-9][0-9]*\Z')
+
+# fraction of max_bytes to which put evicts, so that a full cache is not
+# scanned again on every put
+_LOW_WATER = 0.9
+
+
+def _missing(error):
+    return getattr(error, 'errno', None) == errno.ENOENT
+
+
+def load_revisions(path):
+    """
+    Read id and lastrevid pairs from a text file.
+
+    Every line holds an entity id and a revision id separated by white
+    space, like "Q42 1234567"; empty lines and lines starting with # are
+    skipped.
+
+    @param path: path of the file
+    @type path: str
+    @rtype: dict
+    """
+    revisions = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            entity_id, lastrevid = line.split()
+            revisions[entity_id] = int(lastrevid)
+    return revisions
+
+
+class DiskEntityCache(object):
+
+    """
+    Cache of entities on disk, keyed by id and lastrevid.
+
+    Should be used as::
+
+        cache = DiskEntityCache('cache', max_bytes=10 * 1024 ** 3)
+        revisions = load_revisions('revisions.txt')
+        items = cache.refresh(revisions, fetch_entities)
+
+    Every entity is stored in a file of its own in the compact encoding
+    of L{binary}, in subdirectories by the last two digits of the id. The
+    header of a file holds the lastrevid, so revisions are checked without
+    decoding the entity. Only ids of items, properties, lexemes and
+    mediainfo entities are accepted, as they are used as file names.
+
+    Files are written to a temporary file and renamed, so several
+    processes may share the cache: readers see either the old or the new
+    file. Eviction removes the least recently used files, judged by their
+    modification time, which is updated on every hit.
+    """
+
+    def __init__(self, directory, max_bytes=None, compression='zlib'):
+        """
+        Constructor.
+
+        @param directory: the directory of the cache; it is created if
+            it does not exist
+        @type directory: str
+        @param max_bytes: maximal total size of the files, unlimited if
+            None
+        @type max_bytes: int
+        @param compression: compression of the entities, see L{binary}
+        @type compression: str
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compression = compression
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        # estimated total size, recomputed on eviction
+        self._bytes = self._scan_size() if max_bytes is not None else 0
+
+    def _path(self, entity_id):
+        if not _ID_RE.match(entity_id):
+            raise ValueError("Invalid entity id '%s'" % entity_id)
+        shard = entity_id[1:][-2:].zfill(2)
+        return os.path.join(self.directory, shard, entity_id + _SUFFIX)
+
+    def _files(self):
+        """Yield the path, size and modification time of all entities."""
+        for shard in os.listdir(self.directory):
+            directory = os.path.join(self.directory, shard)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith(_SUFFIX):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError as error:
+                    if _missing(error):  # removed by another process
+                        continue
+                    raise
+                yield path, stat.st_size, stat.st_mtime
+
+    def _scan_size(self):
+        return sum(size for path, size, mtime in self._files())
+
+    def __contains__(self, entity_id):
+        return os.path.exists(self._path(entity_id))
+
+    def __len__(self):
+        return sum(1 for entry in self._files())
+
+    def revision(self, entity_id):
+        """
+        Return the cached lastrevid of an entity.
+
+        @param entity_id: id of the entity
+        @type entity_id: str
+        @return: the revision, 0 for entities cached without one, or None
+            if the entity is not cached
+        @rtype: int
+        """
+        try:
+            with open(self._path(entity_id), 'rb') as f:
+                header = f.read(_HEADER.size)
+        except (IOError, OSError) as error:
+            if _missing(error):
+                return None
+            raise
+        if len(header) < _HEADER.size:
+            return None
+        magic, version, lastrevid = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            return None
+        return lastrevid
+
+    def is_current(self, entity_id, lastrevid):
+        """
+        Check whether the cached revision of an entity is lastrevid.
+
+        @param entity_id: id of the entity
+        @type entity_id: str
+        @param lastrevid: the current revision of the entity
+        @type lastrevid: int
+        @rtype: bool
+        """
+        return self.revision(entity_id) == lastrevid
+
+    def outdated(self, revisions):
+        """
+        Return the ids of the entities which need to be fetched again.
+
+        @param revisions: the current lastrevid by entity id, e.g. from a
+            recent changes feed or L{load_revisions}
+        @type revisions: dict or iterable of (id, lastrevid) tuples
+        @return: the ids which are not cached in that revision, in the
+            given order
+        @rtype: list
+        """
+        if isinstance(revisions, dict):
+            revisions = revisions.items()
+        return [entity_id for entity_id, lastrevid in revisions
+                if not self.is_current(entity_id, lastrevid)]
+
+    def get(self, entity_id, lastrevid=None):
+        """
+        Return a cached entity.
+
+        @param entity_id: id of the entity
+        @type entity_id: str
+        @param lastrevid: the required revision; any cached revision is
+            returned if None
+        @type lastrevid: int
+        @return: the entity or None if it is not cached in that revision
+        @rtype: ItemPage or PropertyPage
+        @raises ValueError: the entity id is invalid
+        """
+        path = self._path(entity_id)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except (IOError, OSError) as error:
+            if _missing(error):
+                self.misses += 1
+                return None
+            raise
+        try:
+            magic, version, revision = _HEADER.unpack_from(data)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError('%s is not a cached entity' % path)
+            page = binary.loads(data[_HEADER.size:])
+        except (ValueError, TypeError, EOFError, struct.error, zlib.error):
+            # corrupt or written by an incompatible version
+            self.remove(entity_id)
+            self.misses += 1
+            return None
+        if lastrevid is not None and revision != lastrevid:
+            self.stale += 1
+            self.misses += 1
+            return None
+        page.lastrevid = revision or None
+        self.hits += 1
+        try:
+            os.utime(path, None)
+        except OSError as error:
+            if not _missing(error):
+                raise
+        return page
+
+    def put(self, page):
+        """
+        Store an entity, replacing the cached one with the same id.
+
+        @param page: the entity, loaded with get()
+        @type page: ItemPage or PropertyPage
+        @raises ValueError: the entity id is invalid
+        """
+        path = self._path(page.getID())
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError as error:
+                if error.errno != errno.EEXIST:  # created by another process
+                    raise
+        data = _HEADER.pack(MAGIC, VERSION, page.lastrevid or _NO_REVISION)
+        data += binary.dumps(page, self.compression)
+        replaced = 0
+        if self.max_bytes is not None:
+            try:
+                replaced = os.path.getsize(path)
+            except OSError as error:
+                if not _missing(error):
+                    raise
+        fd, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            _replace(temp, path)
+        except BaseException:
+            os.remove(temp)
+            raise
+        self._bytes += len(data) - replaced
+        if self.max_bytes is not None and self._bytes > self.max_bytes:
+            self.evict(int(self.max_bytes * _LOW_WATER))
+
+    def remove(self, entity_id):
+        """
+        Remove an entity from the cache.
+
+        @param entity_id: id of the entity
+        @type entity_id: str
+        """
+        try:
+            os.remove(self._path(entity_id))
+        except OSError as error:
+            if not _missing(error):
+                raise
+
+    def evict(self, max_bytes=None):
+        """
+        Remove the least recently used entities until the size fits.
+
+        When the cache grows beyond max_bytes, put evicts down to 90% of
+        it, so that the following puts do not evict again.
+
+        @param max_bytes: the size to reach, defaults to max_bytes
+        @type max_bytes: int
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        files = sorted(self._files(), key=lambda entry: entry[2])
+        total = sum(size for path, size, mtime in files)
+        for path, size, mtime in files:
+            if max_bytes is None or total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError as error:
+                if not _missing(error):
+                    raise
+            total -= size
+            self.evictions += 1
+        self._bytes = total
+
+    def refresh(self, revisions, fetch, **kwargs):
+        """
+        Return entities from the cache, fetching those which changed.
+
+        @param revisions: the current lastrevid by entity id
+        @type revisions: dict or iterable of (id, lastrevid) tuples
+        @param fetch: called with the list of outdated ids, returning the
+            JSON of these entities (dict, str or bytes)
+        @type fetch: callable
+        @param kwargs: passed to L{WikibasePage.fromJSON}
+        @return: the entities by id; entities which are neither current
+            in the cache nor returned by fetch are missing
+        @rtype: dict
+        """
+        if isinstance(revisions, dict):
+            revisions = revisions.items()
+        pages = {}
+        outdated = []
+        for entity_id, lastrevid in revisions:
+            page = self.get(entity_id, lastrevid)
+            if page is None:
+                outdated.append(entity_id)
+            else:
+                pages[entity_id] = page
+        if outdated:
+            for content in fetch(outdated):
+                page = WikibasePage.fromJSON(content, **kwargs)
+                self.put(page)
+                pages[page.getID()] = page
+        return pages
+
+    def stats(self):
+        """
+        Return the statistics of this process.
+
+        @return: hits, misses, stale (misses because of a different
+            revision) and evictions
+        @rtype: dict
+        """
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                }
@@ -0,0 +1,109 @@
+# -*- coding: utf-8  -*-
+"""
+Reading Wikibase JSON dumps.
+
+The JSON dumps contain one big array with one entity per line::
+
+    [
+    {"type":"item","id":"Q1",...},
+    {"type":"item","id":"Q8",...}
+    ]
+
+The dump is streamed line by line, so memory use does not depend on the
+size of the dump.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import bz2
+import gzip
+import io
+
+from pywikibase.wikibasepage import WikibasePage
+
+_MAGIC = {b'\x1f\x8b': gzip.GzipFile,
+          b'BZ': bz2.BZ2File,
+          }
+
+
+def open_dump(path):
+    """
+    Open a plain, gzip or bz2 compressed dump for binary reading.
+
+    The compression is detected from the first bytes of the file.
+
+    @param path: path of the dump file
+    @type path: str
+    @rtype: file
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    if magic in _MAGIC:
+        f = _MAGIC[magic](path, 'rb')
+        # bz2.BZ2File of Python 2 is no io object, but buffers on its own
+        if hasattr(f, 'readable'):
+            f = io.BufferedReader(f)
+        return f
+    return open(path, 'rb')
+
+
+class DumpReader(object):
+
+    """
+    Iterator over the entities of a JSON dump.
+
+    Should be used as::
+
+        for page in DumpReader('latest-all.json.gz'):
+            print(page.getID())
+    """
+
+    def __init__(self, source, **kwargs):
+        """
+        Constructor.
+
+        @param source: path of the dump or a file object opened in binary
+            mode
+        @type source: str or file
+        @param kwargs: passed to L{WikibasePage.get} for every entity,
+            e.g. lazy=True
+        """
+        self.source = source
+        self.kwargs = kwargs
+
+    def __iter__(self):
+        fromJSON = WikibasePage.fromJSON
+        kwargs = self.kwargs
+        for line in self.lines():
+            yield fromJSON(line, **kwargs)
+
+    def lines(self):
+        """
+        Iterate over the JSON of the entities, without decoding it.
+
+        The array framing and the trailing commas are stripped.
+
+        @rtype: generator of bytes
+        """
+        if hasattr(self.source, 'read'):
+            for line in self._iterlines(self.source):
+                yield line
+        else:
+            with open_dump(self.source) as f:
+                for line in self._iterlines(f):
+                    yield line
+
+    @staticmethod
+    def _iterlines(f):
+        for line in f:
+            line = line.rstrip()
+            if line.endswith(b','):
+                line = line[:-1]
+            if line in (b'[', b']', b''):
+                continue
+            yield line
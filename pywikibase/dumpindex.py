@@ -0,0 +1,435 @@
+# -*- coding: utf-8  -*-
+"""
+Random access to the entities of a JSON dump.
+
+Should be used as::
+
+    DumpIndex.build('latest-all.json')
+    with DumpIndex('latest-all.json') as index:
+        item = index.get('Q12345')
+
+The index file holds one fixed size record per entity, sorted by id, and
+both the dump and the index are memory mapped, so a lookup is a binary
+search touching a few pages and memory use does not grow with the dump.
+
+Uncompressed dumps and gzip dumps consisting of many small members, like
+those written by bgzip, are supported. A lookup in a gzip dump
+decompresses from the start of the member holding the entity, so dumps
+compressed as one single member, like the official dumps, can be indexed
+but should be decompressed first for fast lookups.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+from pywikibase import jsonbackend
+from pywikibase.wikibasepage import WikibasePage
+
+MAGIC = b'WBIX'
+VERSION = 2
+
+# magic, version, compressed flag, number of records
+_HEADER = struct.Struct('<4sBBxxQ')
+# key, block, offset and length of an entity, see DumpIndex
+_RECORD = struct.Struct('<QQQI')
+
+# Entity types by the code stored in the low bits of the key
+_PREFIXES = 'QPLM'
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+_CHUNK = 1 << 16
+
+try:
+    _replace = os.replace
+except AttributeError:  # Python 2
+    def _replace(source, destination):
+        """Rename a file, replacing the destination like os.replace."""
+        try:
+            os.rename(source, destination)
+        except OSError:
+            # rename does not replace existing files on Windows
+            if os.name != 'nt' or not os.path.exists(destination):
+                raise
+            os.remove(destination)
+            os.rename(source, destination)
+
+
+def _key(entity_id):
+    """Return the integer key of an entity id."""
+    try:
+        code = _PREFIXES.index(entity_id[0])
+        return int(entity_id[1:]) << 2 | code
+    except (IndexError, ValueError):
+        raise KeyError(entity_id)
+
+
+def _line_key(line):
+    """Return the key of the entity on a dump line."""
+    entity_id = jsonbackend._top_level(jsonbackend._ID_RE, line)
+    if entity_id is None:
+        entity_id = jsonbackend.loads(line)['id']
+    return _key(entity_id)
+
+
+def _strip(line):
+    """Return the JSON of a dump line, or None for the array framing."""
+    line = line.rstrip()
+    if line.endswith(b','):
+        line = line[:-1]
+    if line in (b'[', b']', b''):
+        return None
+    return line
+
+
+def _plain_lines(f):
+    """Yield (position, 0, line) for every line of an uncompressed file."""
+    position = 0
+    for line in f:
+        yield position, 0, line
+        position += len(line)
+
+
+def _member_end(decompressor):
+    """Return whether the gzip member of a decompressor has ended."""
+    try:
+        return decompressor.eof
+    except AttributeError:
+        # Python 2 has no eof, but data after the end of the member is
+        # kept as unused_data
+        return bool(decompressor.unused_data)
+
+
+def _gzip_members(f):
+    """Yield (file position, decompressed data) for every gzip member."""
+    position = 0  # of data in the file
+    data = f.read(_CHUNK)
+    while data:
+        member = position
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        while True:
+            chunk = decompressor.decompress(data)
+            if chunk:
+                yield member, chunk
+            if _member_end(decompressor):
+                unused = decompressor.unused_data
+                position += len(data) - len(unused)
+                data = unused
+                break
+            position += len(data)
+            data = f.read(_CHUNK)
+            if not data:
+                if not hasattr(decompressor, 'eof'):
+                    # Python 2 cannot tell whether the last member ended
+                    return
+                raise ValueError('Truncated gzip member at %d' % member)
+        if not data:
+            data = f.read(_CHUNK)
+
+
+def _gzip_lines(f):
+    """Yield (member position, offset, line) for every line of a gzip."""
+    # (position, decompressed start) of the members of the current line
+    members = []
+    # the chunks of the current line, joined once the line is complete,
+    # so a long line is neither copied nor searched once per chunk
+    pieces = []
+    pending = 0  # length of pieces
+    start = 0  # decompressed position of the current line
+    for member, chunk in _gzip_members(f):
+        if not members or members[-1][0] != member:
+            members.append((member, start + pending))
+        position = 0
+        while True:
+            end = chunk.find(b'\n', position)
+            if end < 0:
+                break
+            while len(members) > 1 and members[1][1] <= start:
+                members.pop(0)
+            line = chunk[position:end + 1]
+            if pieces:
+                pieces.append(line)
+                line = b''.join(pieces)
+                pieces = []
+                pending = 0
+            yield members[0][0], start - members[0][1], line
+            start += len(line)
+            position = end + 1
+        if position < len(chunk):
+            pieces.append(chunk[position:])
+            pending += len(chunk) - position
+    if pieces:
+        while len(members) > 1 and members[1][1] <= start:
+            members.pop(0)
+        yield members[0][0], start - members[0][1], b''.join(pieces)
+
+
+def _read_runs(path):
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(_RECORD.size)
+            if not data:
+                return
+            yield _RECORD.unpack(data)
+
+
+class DumpIndex(object):
+
+    """
+    Memory mapped index of the entities of a JSON dump.
+
+    Every entity is stored as a record of its key, i.e. the numeric id
+    shifted by two bits plus the code of its type, the block, offset and
+    length. For uncompressed dumps the block is the position of the line
+    and the offset 0; for gzip dumps the block is the position of the
+    gzip member where the line starts, and the offset is the position of
+    the line in the decompressed data from there on.
+    """
+
+    def __init__(self, dump, index=None):
+        """
+        Constructor.
+
+        @param dump: path of the dump
+        @type dump: str
+        @param index: path of the index, defaults to the dump path with
+            '.idx' appended
+        @type index: str
+        @raises ValueError: the index file is invalid
+        """
+        self.dump = dump
+        self.index = index or dump + '.idx'
+        self._dump_file = open(dump, 'rb')
+        self._index_file = open(self.index, 'rb')
+        self._dump_map = self._map(self._dump_file)
+        self._index_map = self._map(self._index_file)
+        if self._index_map is None or len(self._index_map) < _HEADER.size:
+            self.close()
+            raise ValueError('%s is not a dump index' % self.index)
+        magic, version, self.compressed, self._count = _HEADER.unpack_from(
+            self._index_map)
+        if magic != MAGIC or version != VERSION or \
+                len(self._index_map) != \
+                _HEADER.size + self._count * _RECORD.size:
+            self.close()
+            raise ValueError('%s is not a dump index of version %d'
+                             % (self.index, VERSION))
+
+    @staticmethod
+    def _map(f):
+        if os.fstat(f.fileno()).st_size == 0:
+            return None  # empty files cannot be mapped
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        """Close the memory maps and files."""
+        for name in ('_dump_map', '_index_map', '_dump_file', '_index_file'):
+            resource = getattr(self, name, None)
+            if resource is not None:
+                resource.close()
+            setattr(self, name, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, entity_id):
+        return self.locate(entity_id) is not None
+
+    def _record(self, number):
+        return _RECORD.unpack_from(self._index_map,
+                                   _HEADER.size + number * _RECORD.size)
+
+    def locate(self, entity_id):
+        """
+        Return the position of an entity in the dump.
+
+        @param entity_id: id of the entity, like 'Q42'
+        @type entity_id: str
+        @return: block, offset and length, or None if not in the dump
+        @rtype: tuple
+        """
+        try:
+            key = _key(entity_id)
+        except KeyError:
+            return None
+        low = 0
+        high = self._count
+        unpack_from = _RECORD.unpack_from
+        data = self._index_map
+        while low < high:
+            middle = (low + high) // 2
+            record = unpack_from(data, _HEADER.size + middle * _RECORD.size)
+            if record[0] < key:
+                low = middle + 1
+            elif record[0] > key:
+                high = middle
+            else:
+                return record[1:]
+        return None
+
+    def getJSON(self, entity_id):
+        """
+        Return the undecoded JSON of an entity.
+
+        @param entity_id: id of the entity, like 'Q42'
+        @type entity_id: str
+        @rtype: bytes
+        @raises KeyError: the entity is not in the dump
+        """
+        location = self.locate(entity_id)
+        if location is None:
+            raise KeyError(entity_id)
+        block, offset, length = location
+        if not self.compressed:
+            return self._dump_map[block:block + length]
+        return self._decompress(block, offset, length)
+
+    def _decompress(self, block, offset, length):
+        data = self._dump_map
+        position = block
+        pending = b''  # compressed data not decompressed yet
+        parts = []
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        while length > 0:
+            if not pending:
+                if position >= len(data):
+                    raise ValueError('Truncated dump %s' % self.dump)
+                pending = data[position:position + _CHUNK]
+                position += _CHUNK
+            # decompress at most _CHUNK bytes at once and discard them
+            # until the offset, so memory use does not grow with it
+            chunk = decompressor.decompress(pending, _CHUNK)
+            if _member_end(decompressor):
+                # the line continues in the next member
+                pending = decompressor.unused_data
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                pending = decompressor.unconsumed_tail
+            if offset >= len(chunk):
+                offset -= len(chunk)
+                continue
+            chunk = chunk[offset:offset + length]
+            offset = 0
+            parts.append(chunk)
+            length -= len(chunk)
+        return b''.join(parts)
+
+    def get(self, entity_id, **kwargs):
+        """
+        Return an entity of the dump.
+
+        @param entity_id: id of the entity, like 'Q42'
+        @type entity_id: str
+        @param kwargs: passed to L{WikibasePage.get}, e.g. lazy=True
+        @rtype: ItemPage or PropertyPage
+        @raises KeyError: the entity is not in the dump
+        """
+        return WikibasePage.fromJSON(self.getJSON(entity_id), **kwargs)
+
+    def __getitem__(self, entity_id):
+        return self.get(entity_id)
+
+    def ids(self):
+        """
+        Iterate over the ids of the entities in the order of the index.
+
+        @rtype: generator of str
+        """
+        for number in range(self._count):
+            key = self._record(number)[0]
+            yield '%s%d' % (_PREFIXES[key & 3], key >> 2)
+
+    @classmethod
+    def build(cls, dump, index=None, run_size=1000000):
+        """
+        Create the index of a dump.
+
+        The records are sorted in runs of run_size records, which are then
+        merged, so memory use does not grow with the dump. Of entities
+        occurring more than once the first occurrence is indexed.
+
+        @param dump: path of an uncompressed or gzip compressed dump
+        @type dump: str
+        @param index: path of the index, defaults to the dump path with
+            '.idx' appended
+        @type index: str
+        @param run_size: records sorted in memory at once
+        @type run_size: int
+        @rtype: DumpIndex
+        @raises ValueError: the dump is compressed otherwise
+        """
+        index = index or dump + '.idx'
+        with open(dump, 'rb') as f:
+            magic = f.read(2)
+            f.seek(0)
+            compressed = magic == _GZIP_MAGIC
+            if magic == b'BZ':
+                raise ValueError('bz2 compressed dumps cannot be indexed')
+            lines = _gzip_lines(f) if compressed else _plain_lines(f)
+
+            runs = []
+            records = []
+            try:
+                for block, offset, line in lines:
+                    entity = _strip(line)
+                    if entity is None:
+                        continue
+                    records.append((_line_key(entity), block, offset,
+                                    len(entity)))
+                    if len(records) >= run_size:
+                        runs.append(cls._write_run(records, index))
+                        records = []
+                records.sort()
+                if runs:
+                    runs.append(cls._write_run(records, index))
+                    records = heapq.merge(*[_read_runs(run)
+                                            for run in runs])
+                cls._write_index(records, index, compressed)
+            finally:
+                for run in runs:
+                    os.remove(run)
+        return cls(dump, index)
+
+    @staticmethod
+    def _write_run(records, index):
+        records.sort()
+        fd, path = tempfile.mkstemp(prefix=os.path.basename(index),
+                                    dir=os.path.dirname(index) or None)
+        with os.fdopen(fd, 'wb') as f:
+            for record in records:
+                f.write(_RECORD.pack(*record))
+        return path
+
+    @staticmethod
+    def _write_index(records, index, compressed):
+        path = index + '.tmp'
+        count = 0
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, compressed, 0))
+            last = None
+            for record in records:
+                if record[0] == last:
+                    continue
+                last = record[0]
+                f.write(_RECORD.pack(*record))
+                count += 1
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, compressed, count))
+        _replace(path, index)
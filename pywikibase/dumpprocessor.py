@@ -0,0 +1,139 @@
+# -*- coding: utf-8  -*-
+"""
+Processing Wikibase JSON dumps on several processes.
+
+The main process only splits the dump into chunks of raw lines. Decoding
+the JSON, building the entities and running the user supplied function
+happens in the worker processes, and only the results are sent back.
+
+This module requires concurrent.futures, i.e. Python 3.2 or later, or
+the futures backport on Python 2.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import collections
+import itertools
+import multiprocessing
+
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                wait)
+
+from pywikibase.dump import DumpReader
+from pywikibase.wikibasepage import WikibasePage
+
+try:
+    unicode = unicode
+except NameError:
+    basestring = (str, bytes)
+
+
+def _process_chunk(func, kwargs, lines):
+    """Parse the lines of a chunk and run the function on every entity."""
+    fromJSON = WikibasePage.fromJSON
+    return [func(fromJSON(line, **kwargs)) for line in lines]
+
+
+class DumpProcessor(object):
+
+    """
+    Run a function on every entity of a dump using a process pool.
+
+    Should be used as::
+
+        processor = DumpProcessor(operator.methodcaller('getID'))
+        for result in processor.process('latest-all.json.gz'):
+            print(result)
+
+    The function and its results must be picklable, so the function has to
+    be defined at module level.
+    """
+
+    def __init__(self, func, processes=None, chunksize=200,
+                 max_pending=None, ordered=True, **kwargs):
+        """
+        Constructor.
+
+        @param func: called with every parsed entity in a worker process
+        @type func: callable
+        @param processes: number of worker processes, by default the
+            number of CPUs
+        @type processes: int
+        @param chunksize: number of dump lines sent to a worker at once
+        @type chunksize: int
+        @param max_pending: maximum number of chunks dispatched but not yet
+            consumed, by default four per process
+        @type max_pending: int
+        @param ordered: yield the results in the order of the dump
+        @type ordered: bool
+        @param kwargs: passed to L{WikibasePage.get} for every entity
+        """
+        if chunksize < 1:
+            raise ValueError('chunksize must be at least 1')
+        self.func = func
+        self.processes = processes
+        self.chunksize = chunksize
+        self.max_pending = max_pending
+        self.ordered = ordered
+        self.kwargs = kwargs
+
+    def _chunks(self, source):
+        if isinstance(source, basestring) or hasattr(source, 'read'):
+            lines = DumpReader(source).lines()
+        else:
+            lines = iter(source)
+        while True:
+            chunk = list(itertools.islice(lines, self.chunksize))
+            if not chunk:
+                return
+            yield chunk
+
+    def process(self, source):
+        """
+        Run the function on every entity of the source.
+
+        @param source: path or binary file object of a dump, or an iterable
+            of the JSON lines of single entities
+        @return: the results of the function
+        @rtype: generator
+        """
+        processes = self.processes or multiprocessing.cpu_count()
+        max_pending = self.max_pending or processes * 4
+        # the function is sent with every chunk, as the initializer of
+        # the pool requires Python 3.7
+        with ProcessPoolExecutor(processes) as executor:
+            if self.ordered:
+                pending = collections.deque()
+            else:
+                pending = set()
+            try:
+                for chunk in self._chunks(source):
+                    if len(pending) >= max_pending:
+                        for result in self._collect(pending):
+                            yield result
+                    future = executor.submit(_process_chunk, self.func,
+                                             self.kwargs, chunk)
+                    if self.ordered:
+                        pending.append(future)
+                    else:
+                        pending.add(future)
+                while pending:
+                    for result in self._collect(pending):
+                        yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _collect(self, pending):
+        """Wait for finished chunks and return their results."""
+        if self.ordered:
+            return pending.popleft().result()
+        done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+        pending.difference_update(done)
+        return itertools.chain.from_iterable(future.result()
+                                             for future in done)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8  -*-
+"""
+Coalescing changes of many entities into wbeditentity payloads.
+
+Should be used as::
+
+    batcher = EditBatcher()
+    for item in items:
+        item.startJournal()
+        ...
+        batcher.addPage(item)
+    batcher.flush()
+    for payload in batcher.payloads():
+        site.post(action='wbeditentity', **payload)
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+from collections import OrderedDict, deque
+
+from pywikibase import jsonbackend
+from pywikibase.wikibasepage import _freeze
+
+# Sections of the data keyed by language or site
+_TERMS = ('labels', 'descriptions', 'aliases', 'sitelinks')
+
+
+def _claim_key(claim):
+    """Return the key under which a claim is merged."""
+    claim_id = claim.get('id')
+    if claim_id is not None:
+        return claim_id
+    # new claims without id are only merged when equal
+    return _freeze(claim)
+
+
+class EditBatcher(object):
+
+    """
+    Builder of wbeditentity payloads, merging the changes per entity.
+
+    Changes added for the same entity are merged into one data object:
+    a later label, description, alias list of a language or sitelink
+    replaces the earlier one, and a later claim replaces the earlier claim
+    with the same statement id, including its removal.
+
+    Flushing an entity appends its payloads to a queue of ready payloads.
+    A data object whose JSON exceeds max_bytes in UTF-8 is split into
+    several payloads, each holding whole terms and claims, so one entity
+    might be edited more than once.
+    """
+
+    def __init__(self, max_bytes=1024 ** 2, max_pending=None):
+        """
+        Constructor.
+
+        @param max_bytes: maximal UTF-8 length of the JSON of one payload; it
+            should leave room below the POST size limit of the wiki for
+            URL encoding and the other parameters
+        @type max_bytes: int
+        @param max_pending: maximal number of entities with pending
+            changes; when exceeded, the entity changed first is flushed.
+            Unlimited if None.
+        @type max_pending: int
+        """
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        # id -> (data, baserevid), in the order of the first change
+        self._pending = OrderedDict()
+        self.ready = deque()
+
+    def __len__(self):
+        """Return the number of entities with pending changes."""
+        return len(self._pending)
+
+    def __contains__(self, entity_id):
+        return entity_id in self._pending
+
+    def add(self, entity_id, data, baserevid=None):
+        """
+        Add changes of an entity.
+
+        @param entity_id: id of the entity
+        @type entity_id: str
+        @param data: changes in the form of toJSON(diffto=...)
+        @type data: dict
+        @param baserevid: revision the changes are based on; the first
+            one added for an entity is kept
+        @type baserevid: int
+        """
+        if entity_id not in self._pending:
+            self._pending[entity_id] = (
+                dict((key, OrderedDict()) for key in _TERMS + ('claims',)),
+                baserevid)
+        merged = self._pending[entity_id][0]
+        for key in _TERMS:
+            merged[key].update(data.get(key, {}))
+        for prop, claims in data.get('claims', {}).items():
+            prop_claims = merged['claims'].setdefault(prop, OrderedDict())
+            for claim in claims:
+                key = _claim_key(claim)
+                # move the replaced claim to the end, like a new change
+                prop_claims.pop(key, None)
+                prop_claims[key] = claim
+        if self.max_pending is not None and \
+                len(self._pending) > self.max_pending:
+            self.flush(next(iter(self._pending)))
+
+    def addPage(self, page, diffto=None):
+        """
+        Add the changes of an entity.
+
+        @param page: the changed entity; the changes recorded in its
+            journal are used if it has one, see L{WikibasePage.startJournal}
+        @type page: WikibasePage
+        @param diffto: JSON to diff to if the entity has no journal
+        @type diffto: dict
+        """
+        # the claim JSON is only read, so it need not be copied
+        if page._journal is not None:
+            data = page.changesToJSON(shared=True)
+        else:
+            data = page.toJSON(diffto=diffto, shared=True)
+        if data:
+            self.add(page.getID(), data, page.lastrevid)
+
+    def _pieces(self, merged):
+        """Yield the section, key and value of every term and claim."""
+        for section in _TERMS:
+            for key, value in merged[section].items():
+                yield section, key, value
+        for prop, claims in merged['claims'].items():
+            for claim in claims.values():
+                yield 'claims', prop, claim
+
+    @staticmethod
+    def _added(data, section, key, value):
+        """Return an upper bound of the bytes added by a piece to data."""
+        def dumps(obj):
+            return jsonbackend.dumps(obj).encode('utf-8')
+        # the value and a comma
+        added = len(dumps(value)) + 1
+        if section == 'claims':
+            if key not in data.get('claims', ()):
+                # "P31":[],
+                added += len(dumps(key)) + 4
+        else:
+            # "en":
+            added += len(dumps(key)) + 1
+        if section not in data:
+            # "labels":{},
+            added += len(section) + 6
+        return added
+
+    def _split(self, entity_id, merged):
+        """Return the data objects of an entity within max_bytes."""
+        parts = []
+        data = {}
+        size = 2  # {}
+        for section, key, value in self._pieces(merged):
+            added = self._added(data, section, key, value)
+            if data and size + added > self.max_bytes:
+                parts.append(data)
+                data = {}
+                size = 2
+                added = self._added(data, section, key, value)
+            if size + added > self.max_bytes:
+                raise ValueError('%s of %s does not fit into %d bytes'
+                                 % (key, entity_id, self.max_bytes))
+            size += added
+            self._put(data, section, key, value)
+        if data:
+            parts.append(data)
+        return parts
+
+    @staticmethod
+    def _put(data, section, key, value):
+        if section == 'claims':
+            data.setdefault('claims', {}).setdefault(key, []).append(value)
+        else:
+            data.setdefault(section, {})[key] = value
+
+    def flush(self, entity_id=None):
+        """
+        Move the pending changes into the queue of ready payloads.
+
+        @param entity_id: id of the entity to flush, all entities in the
+            order of their first change if None
+        @type entity_id: str
+        @raises ValueError: a single term or claim is longer than max_bytes
+        """
+        if entity_id is None:
+            entity_ids = list(self._pending)
+        elif entity_id in self._pending:
+            entity_ids = [entity_id]
+        else:
+            return
+        for entity_id in entity_ids:
+            merged, baserevid = self._pending[entity_id]
+            parts = self._split(entity_id, merged)
+            del self._pending[entity_id]
+            for number, data in enumerate(parts):
+                payload = {'id': entity_id, 'data': jsonbackend.dumps(data)}
+                # later parts are based on the revision of the earlier ones
+                if number == 0 and baserevid is not None:
+                    payload['baserevid'] = baserevid
+                self.ready.append(payload)
+
+    def payloads(self):
+        """
+        Remove and yield the ready payloads in order.
+
+        Every payload is a dict of the id, data and optionally baserevid
+        parameters of a wbeditentity request.
+
+        @rtype: generator of dict
+        """
+        while self.ready:
+            yield self.ready.popleft()
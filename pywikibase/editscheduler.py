@@ -0,0 +1,345 @@
+# -*- coding: utf-8  -*-
+"""
+Submitting edits concurrently with asyncio.
+
+Should be used as::
+
+    scheduler = EditScheduler(csrf_token, rate=2, bot=1,
+                              transport=authenticated_transport)
+    for item in items:
+        scheduler.add(item.getID(), item.toJSON(diffto=old[item.getID()]))
+    await scheduler.run()
+
+or with the payloads of an L{EditBatcher}::
+
+    scheduler.addPayloads(batcher.payloads())
+    scheduler.runSync()
+
+Edits of the same entity are made one after the other in the order they
+were added; edits of different entities run concurrently.
+
+This module requires Python 3.6 or later.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import asyncio
+import random
+import time
+from collections import OrderedDict, deque
+
+from pywikibase import jsonbackend
+from pywikibase.exceptions import APIError
+from pywikibase.fetcher import HTTPTransport, _retry_after
+
+# API error codes after which an edit is retried, as it was not made
+_THROTTLED = ('maxlag', 'ratelimited', 'readonly')
+
+
+class TokenBucket(object):
+
+    """
+    Token bucket limiting the rate of edits.
+
+    The rate is halved when the server throttles the edits and grows back
+    by a tenth of the configured rate per successful edit.
+    """
+
+    def __init__(self, rate, burst=1, min_rate=None):
+        """
+        Constructor.
+
+        @param rate: tokens per second
+        @type rate: float
+        @param burst: maximal number of tokens saved up
+        @type burst: int
+        @param min_rate: lowest rate after throttling, defaults to a tenth
+            of rate
+        @type min_rate: float
+        """
+        self.max_rate = self.rate = float(rate)
+        self.min_rate = min_rate if min_rate is not None else rate / 10.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait for a token and take it."""
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def throttle(self):
+        """Decrease the rate after the server throttled an edit."""
+        self.rate = max(self.rate / 2, self.min_rate)
+
+    def recover(self):
+        """Increase the rate after a successful edit."""
+        self.rate = min(self.rate + self.max_rate / 10, self.max_rate)
+
+
+class EditScheduler(object):
+
+    """
+    Submit wbeditentity requests with bounded concurrency.
+
+    At most concurrency edits run at the same time and, if rate is given,
+    edits start at no more than rate per second. The maxlag parameter is
+    sent with every edit; when the server is lagged or throttles the
+    edits, all edits pause for the time of the Retry-After header and the
+    rate is reduced. Only edits which the server reports as not processed,
+    i.e. throttled, lagged or rejected with status 429, or 503 with a
+    Retry-After header, are retried, with exponential back-off and jitter.
+
+    Connection errors and timeouts are not retried, as the edit might have
+    been made nevertheless; the edit fails with the exception. Add edits
+    with baserevid, so that making such an edit again conflicts instead
+    of applying the changes twice.
+
+    When an edit fails, the later edits of the same entity are not made,
+    as they might depend on it; they are added to failed as well.
+    """
+
+    def __init__(self, token, endpoint='https://www.wikidata.org/w/api.php',
+                 concurrency=4, rate=1, burst=1, maxlag=5, max_retries=5,
+                 transport=None, callback=None, **kwargs):
+        """
+        Constructor.
+
+        @param token: the csrf token of the user
+        @type token: str
+        @param endpoint: URL of api.php
+        @type endpoint: str
+        @param concurrency: maximal number of edits at the same time
+        @type concurrency: int
+        @param rate: maximal edits per second, unlimited if None
+        @type rate: float
+        @param burst: edits which may start at once after a pause
+        @type burst: int
+        @param maxlag: maxlag parameter of the edits, None to omit it
+        @type maxlag: int
+        @param max_retries: retries of an edit before giving up
+        @type max_retries: int
+        @param transport: transport of the requests, see L{HTTPTransport};
+            the default transport is anonymous
+        @param callback: called with the parameters and the response of
+            every successful edit
+        @type callback: callable
+        @param kwargs: additional parameters of every edit, e.g. bot=1 or
+            summary
+        """
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.maxlag = maxlag
+        self.max_retries = max_retries
+        self.transport = transport or HTTPTransport(endpoint, concurrency)
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.callback = callback
+        self.params = dict(kwargs, action='wbeditentity', format='json',
+                           token=token)
+        if maxlag is not None:
+            self.params['maxlag'] = maxlag
+        # entity id -> deque of parameters, in the order of the first edit
+        self._queues = OrderedDict()
+        self.failed = []
+        self.edits = 0
+        self.requests = 0
+        self.retries = 0
+        self.latencies = []
+        self._elapsed = 0
+        # time.time() until which no edit is made, after maxlag
+        self._resume = 0
+
+    def __len__(self):
+        """Return the number of edits not made yet."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def close(self):
+        """Close the transport."""
+        self.transport.close()
+
+    def add(self, entity_id, data, baserevid=None, **kwargs):
+        """
+        Add an edit.
+
+        @param entity_id: id of the entity
+        @type entity_id: str
+        @param data: the changes, e.g. from toJSON(diffto=...)
+        @type data: dict or str
+        @param baserevid: revision the changes are based on
+        @type baserevid: int
+        @param kwargs: additional parameters of this edit, e.g. summary
+        """
+        if not isinstance(data, (str, bytes)):
+            data = jsonbackend.dumps(data)
+        params = dict(self.params, id=entity_id, data=data, **kwargs)
+        if baserevid is not None:
+            params['baserevid'] = baserevid
+        self._queues.setdefault(entity_id, deque()).append(params)
+
+    def addPayloads(self, payloads):
+        """
+        Add edits from dicts of id, data and optionally baserevid.
+
+        @param payloads: e.g. L{EditBatcher.payloads}
+        @type payloads: iterable of dict
+        """
+        for payload in payloads:
+            payload = dict(payload)
+            self.add(payload.pop('id'), payload.pop('data'), **payload)
+
+    async def _pause(self):
+        while True:
+            delay = self._resume - time.time()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def _edit(self, params):
+        """Make an edit and return the response."""
+        attempt = 0
+        while True:
+            await self._pause()
+            if self.bucket:
+                await self.bucket.acquire()
+                # the bucket might have waited out a pause set meanwhile
+                await self._pause()
+            self.requests += 1
+            # transport errors are raised: the edit might have been made
+            status, headers, body = await self.transport.request(
+                params, 'POST')
+            if status == 429 or status == 503 and 'retry-after' in headers:
+                delay = _retry_after(headers, 2 ** attempt)
+            elif status != 200:
+                raise APIError('http-%d' % status,
+                               body[:200].decode('utf-8', 'replace'))
+            else:
+                data = jsonbackend.loads(body)
+                error = data.get('error')
+                if error is None:
+                    if self.bucket:
+                        self.bucket.recover()
+                    return data
+                if error.get('code') not in _THROTTLED:
+                    raise APIError(error.get('code'), error.get('info'))
+                delay = _retry_after(headers, 5)
+            if attempt >= self.max_retries:
+                raise APIError('maxretries', 'Gave up after %d retries'
+                               % attempt)
+            if self.bucket:
+                self.bucket.throttle()
+            # pause all edits, with jitter so they do not restart at once
+            self._resume = max(
+                self._resume,
+                time.time() + delay * (1 + random.random() / 10))
+            self.retries += 1
+            attempt += 1
+
+    async def _timed(self, params):
+        start = time.monotonic()
+        result = await self._edit(params)
+        self.latencies.append(time.monotonic() - start)
+        return result
+
+    async def run(self):
+        """
+        Make all edits added so far.
+
+        Edits failing permanently are added to failed together with their
+        exception; run does not raise them.
+        """
+        start = time.monotonic()
+        ready = deque(self._queues)
+        running = {}
+        try:
+            while True:
+                while len(running) < self.concurrency and ready:
+                    entity_id = ready.popleft()
+                    params = self._queues[entity_id].popleft()
+                    task = asyncio.ensure_future(self._timed(params))
+                    running[task] = (entity_id, params)
+                if not running:
+                    return
+                done = (await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED))[0]
+                for task in done:
+                    entity_id, params = running.pop(task)
+                    queue = self._queues[entity_id]
+                    if task.cancelled():
+                        error = asyncio.CancelledError()
+                    else:
+                        error = task.exception()
+                    if error is None:
+                        self.edits += 1
+                        if self.callback:
+                            self.callback(params, task.result())
+                    else:
+                        self.failed.append((params, error))
+                        while queue:
+                            self.failed.append(
+                                (queue.popleft(),
+                                 APIError('skipped', 'An earlier edit of %s '
+                                          'failed' % entity_id)))
+                    if queue:
+                        ready.append(entity_id)
+                    else:
+                        del self._queues[entity_id]
+        finally:
+            for task, (entity_id, params) in running.items():
+                task.cancel()
+                self._queues[entity_id].appendleft(params)
+            self._elapsed += time.monotonic() - start
+
+    def runSync(self):
+        """Make all edits added so far without asyncio."""
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.run())
+        finally:
+            loop.close()
+
+    def stats(self):
+        """
+        Return the statistics.
+
+        @return: edits, failed, requests, retries, elapsed seconds,
+            throughput in edits per second, and the mean, median, 95th
+            percentile and maximum latency of the edits in seconds,
+            including retries
+        @rtype: dict
+        """
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return latencies[min(int(len(latencies) * fraction),
+                                 len(latencies) - 1)]
+
+        return {'edits': self.edits,
+                'failed': len(self.failed),
+                'requests': self.requests,
+                'retries': self.retries,
+                'elapsed': self._elapsed,
+                'throughput': (self.edits / self._elapsed
+                               if self._elapsed else None),
+                'latency_mean': (sum(latencies) / len(latencies)
+                                 if latencies else None),
+                'latency_median': percentile(0.5),
+                'latency_p95': percentile(0.95),
+                'latency_max': latencies[-1] if latencies else None,
+                }
@@ -0,0 +1,220 @@
+# -*- coding: utf-8  -*-
+"""
+In-memory cache of parsed entities.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import threading
+from collections import OrderedDict
+
+from pywikibase import jsonbackend
+from pywikibase.wikibasepage import WikibasePage
+
+_LASTREVID_RE = r'"lastrevid"\s*:\s*([0-9]+)'
+
+# Estimated JSON lengths of the parts of a decoded entity, see _estimate
+_CLAIM_SIZE = 500
+_TERM_SIZE = 50
+
+
+def _estimate(content):
+    """Return the estimated length of the JSON of a decoded entity."""
+    size = 200
+    for key, value in content.items():
+        if key == 'claims' and isinstance(value, dict):
+            size += _CLAIM_SIZE * sum(len(claims)
+                                      for claims in value.values())
+        elif isinstance(value, dict):
+            size += _TERM_SIZE * len(value)
+    return size
+
+
+class EntityCache(object):
+
+    """
+    LRU cache of parsed entities, keyed by entity id and lastrevid.
+
+    Should be used as a replacement of WikibasePage.fromJSON::
+
+        cache = EntityCache(max_bytes=500 * 1024 ** 2)
+        for content in fetch_entities(ids):
+            item = cache.get(content)
+
+    An entity is only served for the same lastrevid as when it was
+    cached; a different revision replaces it. The size of an entity is
+    the length of its JSON in UTF-8, which is a lower bound of the memory
+    used by the parsed entity; for decoded JSON it is estimated from the
+    number of claims and terms unless given.
+
+    The cached entities are shared between all callers and must not be
+    modified; parse the JSON again to change an entity.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        """
+        Constructor.
+
+        @param max_entries: maximal number of entities, unlimited if None
+        @type max_entries: int
+        @param max_bytes: maximal total size of the entities, unlimited if
+            None
+        @type max_bytes: int
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # id -> (page, lastrevid, size), the least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, entity_id):
+        return entity_id in self._entries
+
+    @property
+    def size(self):
+        """Return the total size of the cached entities."""
+        return self._bytes
+
+    def lookup(self, entity_id, lastrevid=None):
+        """
+        Return a cached entity.
+
+        @param entity_id: id of the entity
+        @type entity_id: str
+        @param lastrevid: the required revision; any cached revision is
+            returned if None
+        @type lastrevid: int
+        @return: the entity or None if it is not cached in that revision
+        @rtype: WikibasePage
+        """
+        with self._lock:
+            entry = self._entries.pop(entity_id, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            if lastrevid is not None and entry[1] != lastrevid:
+                self._bytes -= entry[2]
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries[entity_id] = entry
+            self.hits += 1
+            return entry[0]
+
+    def put(self, page, size=0):
+        """
+        Add an entity, replacing the cached one with the same id.
+
+        @param page: the entity
+        @type page: WikibasePage
+        @param size: the size of the entity, e.g. the length of its JSON
+        @type size: int
+        """
+        entity_id = page.getID()
+        with self._lock:
+            old = self._entries.pop(entity_id, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[entity_id] = (page, page.lastrevid, size)
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (
+                self.max_entries is not None and
+                len(self._entries) > self.max_entries or
+                self.max_bytes is not None and self._bytes > self.max_bytes):
+            entry = self._entries.popitem(last=False)[1]
+            self._bytes -= entry[2]
+            self.evictions += 1
+
+    def get(self, content, size=None, **kwargs):
+        """
+        Return the entity of some JSON, parsing it only when not cached.
+
+        For str and bytes the id and lastrevid are looked up in the
+        undecoded JSON, so a hit does not decode it at all.
+
+        @param content: JSON of a single entity, either decoded or encoded
+        @type content: dict, str or bytes
+        @param size: the size of the entity if content is a dict, e.g. the
+            length of the response it was decoded from
+        @type size: int
+        @param kwargs: passed to L{WikibasePage.fromJSON} when parsing
+        @rtype: ItemPage or PropertyPage
+        """
+        if isinstance(content, dict):
+            entity_id = content.get('id')
+            lastrevid = content.get('lastrevid')
+        else:
+            entity_id = jsonbackend._top_level(jsonbackend._ID_RE, content)
+            lastrevid = jsonbackend._top_level(_LASTREVID_RE, content)
+            if lastrevid is not None:
+                lastrevid = int(lastrevid)
+            size = None
+        if entity_id is not None and lastrevid is not None:
+            page = self.lookup(entity_id, lastrevid)
+            if page is not None:
+                return page
+        else:
+            # without a revision the entity might have changed
+            with self._lock:
+                self.misses += 1
+        if isinstance(content, bytes):
+            size = len(content)
+        elif not isinstance(content, dict):
+            # bytes like max_bytes, not characters
+            size = len(content.encode('utf-8'))
+        elif size is None:
+            size = _estimate(content)
+        page = WikibasePage.fromJSON(content, **kwargs)
+        self.put(page, size)
+        return page
+
+    def invalidate(self, entity_id):
+        """
+        Remove an entity.
+
+        @param entity_id: id of the entity
+        @type entity_id: str
+        """
+        with self._lock:
+            entry = self._entries.pop(entity_id, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self):
+        """Remove all entities; the statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Return the statistics.
+
+        @return: hits, misses, stale (misses because of a different
+            revision), evictions, entries and bytes
+        @rtype: dict
+        """
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'stale': self.stale,
+                    'evictions': self.evictions,
+                    'entries': len(self._entries),
+                    'bytes': self._bytes,
+                    }
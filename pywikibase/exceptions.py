@@ -30,3 +30,21 @@ class EntityTypeUnknownException(WikiBaseError):
     """The requested entity type is not recognised on this site."""
 
     pass
+
+
+class APIError(WikiBaseError):
+
+    """The MediaWiki API returned an error."""
+
+    def __init__(self, code, info):
+        """
+        Constructor.
+
+        @param code: the error code, like 'maxlag'
+        @type code: str
+        @param info: the error message
+        @type info: str
+        """
+        super(APIError, self).__init__('%s: %s' % (code, info))
+        self.code = code
+        self.info = info
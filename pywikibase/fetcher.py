@@ -0,0 +1,309 @@
+# -*- coding: utf-8  -*-
+"""
+Fetching entities from the MediaWiki API with asyncio.
+
+Should be used as::
+
+    fetcher = EntityFetcher('https://www.wikidata.org/w/api.php')
+    async for item in fetcher.fetch(ids):
+        print(item.getID())
+
+or without asyncio as::
+
+    items = fetcher.fetchAll(ids)
+
+This module requires Python 3.6 or later.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import asyncio
+import http.client
+import itertools
+import queue
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from pywikibase import __version__, jsonbackend
+from pywikibase.exceptions import APIError
+from pywikibase.wikibasepage import WikibasePage
+
+USER_AGENT = 'pywikibase/%s' % __version__
+
+# Errors after which a request is retried
+_TRANSIENT = (OSError, http.client.HTTPException)
+
+
+def _retry_after(headers, default):
+    """Return the seconds of the Retry-After header, or default."""
+    try:
+        return max(float(headers['retry-after']), 0)
+    except (KeyError, ValueError):
+        return default
+
+
+class HTTPTransport(object):
+
+    """
+    Pool of keep-alive HTTP connections to one API endpoint.
+
+    The requests are made by http.client in a thread pool with one thread
+    per connection, so that the event loop is not blocked.
+
+    Other transports, e.g. using aiohttp, must provide the same methods.
+    """
+
+    def __init__(self, endpoint, pool_size=4, timeout=60,
+                 user_agent=USER_AGENT, headers=None):
+        """
+        Constructor.
+
+        @param endpoint: URL of api.php
+        @type endpoint: str
+        @param pool_size: maximal number of connections
+        @type pool_size: int
+        @param timeout: timeout of a request in seconds
+        @type timeout: float
+        @param user_agent: User-Agent header of the requests
+        @type user_agent: str
+        @param headers: additional headers of the requests, e.g. an OAuth
+            Authorization header
+        @type headers: dict
+        """
+        url = urlsplit(endpoint)
+        if url.scheme == 'https':
+            self._connection_class = http.client.HTTPSConnection
+        elif url.scheme == 'http':
+            self._connection_class = http.client.HTTPConnection
+        else:
+            raise ValueError("Unsupported URL '%s'" % endpoint)
+        self._host = url.netloc
+        self._path = url.path or '/'
+        self._timeout = timeout
+        self._headers = {'User-Agent': user_agent,
+                         'Accept-Encoding': 'identity'}
+        self._headers.update(headers or {})
+        self._connections = queue.LifoQueue()
+        self._executor = ThreadPoolExecutor(pool_size)
+
+    async def request(self, params, method='GET'):
+        """
+        Make a request.
+
+        @param params: the query parameters, or the form data of a POST
+            request
+        @type params: dict
+        @param method: GET or POST
+        @type method: str
+        @return: status, headers with lowercase names, and body
+        @rtype: tuple
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, self._request,
+                                          params, method)
+
+    def _request(self, params, method='GET'):
+        try:
+            connection = self._connections.get_nowait()
+        except queue.Empty:
+            connection = self._connection_class(self._host,
+                                                timeout=self._timeout)
+        try:
+            if method == 'POST':
+                headers = dict(self._headers)
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+                connection.request(method, self._path,
+                                   urlencode(params).encode('utf-8'), headers)
+            else:
+                connection.request(method,
+                                   self._path + '?' + urlencode(params),
+                                   headers=self._headers)
+            response = connection.getresponse()
+            body = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._connections.put(connection)
+        headers = dict((name.lower(), value)
+                       for name, value in response.getheaders())
+        return response.status, headers, body
+
+    def close(self):
+        """Close all connections."""
+        self._executor.shutdown()
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class EntityFetcher(object):
+
+    """
+    Fetch entities in batches using the wbgetentities API module.
+
+    Up to concurrency batches are requested at the same time over
+    keep-alive connections. The maxlag parameter is sent with every
+    request; when the server is lagged or overloaded, all requests pause
+    for the time of the Retry-After header before the batch is retried.
+    Connection errors are retried with exponential back-off.
+
+    The ids of entities which do not exist are added to missing.
+    """
+
+    def __init__(self, endpoint='https://www.wikidata.org/w/api.php',
+                 batch_size=50, concurrency=4, maxlag=5, max_retries=5,
+                 transport=None, **kwargs):
+        """
+        Constructor.
+
+        @param endpoint: URL of api.php
+        @type endpoint: str
+        @param batch_size: ids per request; 50 is the limit of the API
+            for normal users
+        @type batch_size: int
+        @param concurrency: maximal number of requests at the same time
+        @type concurrency: int
+        @param maxlag: maxlag parameter of the requests, None to omit it
+        @type maxlag: int
+        @param max_retries: retries of a batch before giving up
+        @type max_retries: int
+        @param transport: transport of the requests, defaults to an
+            L{HTTPTransport} with concurrency connections
+        @param kwargs: passed to L{WikibasePage.fromJSON} for every
+            entity, e.g. lazy=True
+        """
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.maxlag = maxlag
+        self.max_retries = max_retries
+        self.transport = transport or HTTPTransport(endpoint, concurrency)
+        self.kwargs = kwargs
+        self.missing = []
+        self.requests = 0
+        self.retries = 0
+        # time.time() until which no request is made, after maxlag
+        self._resume = 0
+
+    def close(self):
+        """Close the transport."""
+        self.transport.close()
+
+    def _params(self, ids):
+        params = {'action': 'wbgetentities', 'format': 'json',
+                  'ids': '|'.join(ids)}
+        if self.maxlag is not None:
+            params['maxlag'] = self.maxlag
+        return params
+
+    async def _pause(self):
+        while True:
+            delay = self._resume - time.time()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def _fetch_batch(self, ids):
+        """Return the JSON of the entities of a batch."""
+        params = self._params(ids)
+        attempt = 0
+        while True:
+            await self._pause()
+            self.requests += 1
+            delay = None
+            try:
+                status, headers, body = await self.transport.request(params)
+            except _TRANSIENT:
+                if attempt >= self.max_retries:
+                    raise
+                delay = 2 ** attempt + random.random()
+            else:
+                if status in (429, 503):
+                    delay = _retry_after(headers, 2 ** attempt)
+                elif status != 200:
+                    raise APIError('http-%d' % status,
+                                   body[:200].decode('utf-8', 'replace'))
+                else:
+                    data = jsonbackend.loads(body)
+                    error = data.get('error')
+                    if error is None:
+                        return data.get('entities', {})
+                    if error.get('code') != 'maxlag':
+                        raise APIError(error.get('code'), error.get('info'))
+                    delay = _retry_after(headers, 5)
+                if attempt >= self.max_retries:
+                    raise APIError('maxretries', 'Gave up after %d retries'
+                                   % attempt)
+                # pause all requests
+                self._resume = max(self._resume, time.time() + delay)
+                delay = 0
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _parse(self, entities):
+        pages = []
+        for entity_id, content in entities.items():
+            if 'missing' in content:
+                self.missing.append(entity_id)
+            else:
+                pages.append(WikibasePage.fromJSON(content, **self.kwargs))
+        return pages
+
+    async def fetch(self, ids):
+        """
+        Fetch entities, yielding them as their batches finish.
+
+        @param ids: ids of the entities
+        @type ids: iterable of str
+        @rtype: async generator of ItemPage or PropertyPage
+        """
+        ids = iter(ids)
+        pending = set()
+        try:
+            while True:
+                while len(pending) < self.concurrency:
+                    batch = list(itertools.islice(ids, self.batch_size))
+                    if not batch:
+                        break
+                    pending.add(asyncio.ensure_future(
+                        self._fetch_batch(batch)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for page in self._parse(task.result()):
+                        yield page
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def fetchAll(self, ids):
+        """
+        Fetch entities without asyncio.
+
+        @param ids: ids of the entities
+        @type ids: iterable of str
+        @return: the entities, in the order their batches finished
+        @rtype: list
+        """
+        async def collect():
+            return [page async for page in self.fetch(ids)]
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(collect())
+        finally:
+            loop.close()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8  -*-
+"""
+Opt-in counters and timers for the hot paths.
+
+Should be used as::
+
+    from pywikibase import instrumentation
+    instrumentation.enable()
+    for page in DumpReader('latest-all.json.gz'):
+        ...
+    print(instrumentation.snapshot())
+
+While disabled, nothing is wrapped, so there is no overhead at all.
+enable() replaces the measured functions by wrappers and disable()
+restores the originals. The measured names are:
+
+    - json.loads: decoding of entity JSON
+    - Claim.fromJSON, Claim.referenceFromJSON, Claim.qualifierFromJSON
+    - converter.<datatype>: each entry of Claim.TARGET_CONVERTER
+    - Claim.toJSON: all calls, including those answered from the cache
+    - Claim.toJSON.uncached: claims actually serialized
+    - WikibasePage.toJSON and WikibasePage.toJSON.diff_claims
+
+Times are inclusive: Claim.fromJSON also counts the calls made for the
+snaks of qualifiers and references, and includes the time of the
+converters. Only the current process is measured; the counters of
+DumpProcessor workers stay in the worker processes.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import functools
+import time
+
+from pywikibase import jsonbackend
+
+try:
+    _timer = time.perf_counter
+except AttributeError:
+    _timer = time.time
+
+# name -> [count, seconds]
+_stats = {}
+_hooks = []
+# (owner, attribute, original, wrapper) of the wrapped functions while
+# enabled
+_originals = None
+
+
+def _record(name, seconds):
+    stat = _stats.get(name)
+    if stat is None:
+        stat = _stats[name] = [0, 0.0]
+    stat[0] += 1
+    stat[1] += seconds
+    for hook in _hooks:
+        hook(name, seconds)
+
+
+def _timed(name, func):
+    """Return a wrapper of func recording its calls under name."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = _timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(name, _timer() - start)
+    return wrapper
+
+
+def _wrap(raw, name):
+    """Wrap a function, classmethod or staticmethod object."""
+    if isinstance(raw, classmethod):
+        return classmethod(_timed(name, raw.__func__))
+    if isinstance(raw, staticmethod):
+        return staticmethod(_timed(name, raw.__func__))
+    return _timed(name, raw)
+
+
+def _targets():
+    """Return (owner, attribute, name) of the functions to be measured."""
+    from pywikibase.claim import Claim
+    from pywikibase.wikibasepage import WikibasePage
+    targets = [(jsonbackend, 'loads', 'json.loads'),
+               (Claim, 'fromJSON', 'Claim.fromJSON'),
+               (Claim, 'referenceFromJSON', 'Claim.referenceFromJSON'),
+               (Claim, 'qualifierFromJSON', 'Claim.qualifierFromJSON'),
+               (Claim, 'toJSON', 'Claim.toJSON'),
+               (Claim, '_toJSON', 'Claim.toJSON.uncached'),
+               (WikibasePage, 'toJSON', 'WikibasePage.toJSON'),
+               (WikibasePage, '_diff_claims',
+                'WikibasePage.toJSON.diff_claims')]
+    for datatype in Claim.TARGET_CONVERTER:
+        targets.append((Claim.TARGET_CONVERTER, datatype,
+                        'converter.' + datatype))
+    return targets
+
+
+def _get(owner, attr):
+    if isinstance(owner, dict):
+        return owner.get(attr)
+    # not getattr, which would unwrap classmethods and staticmethods
+    return vars(owner).get(attr)
+
+
+def _set(owner, attr, value):
+    if isinstance(owner, dict):
+        owner[attr] = value
+    else:
+        setattr(owner, attr, value)
+
+
+def is_enabled():
+    """
+    Return whether the instrumentation is enabled.
+
+    @rtype: bool
+    """
+    return _originals is not None
+
+
+def enable():
+    """Start measuring; does nothing if already enabled."""
+    global _originals
+    if _originals is not None:
+        return
+    _originals = []
+    for owner, attr, name in _targets():
+        raw = _get(owner, attr)
+        wrapped = _wrap(raw, name)
+        _originals.append((owner, attr, raw, wrapped))
+        _set(owner, attr, wrapped)
+
+
+def disable():
+    """
+    Stop measuring and restore the original functions.
+
+    The counters are kept until reset() is called.
+    """
+    global _originals
+    if _originals is None:
+        return
+    for owner, attr, raw, wrapped in _originals:
+        # keep what was replaced by others in the meantime
+        if _get(owner, attr) is wrapped:
+            _set(owner, attr, raw)
+    _originals = None
+
+
+def reset():
+    """Clear all counters."""
+    _stats.clear()
+
+
+def snapshot(reset=False):
+    """
+    Return the counters.
+
+    @param reset: clear the counters afterwards
+    @type reset: bool
+    @return: {name: {'count': calls, 'time': seconds}}
+    @rtype: dict
+    """
+    result = dict((name, {'count': stat[0], 'time': stat[1]})
+                  for name, stat in list(_stats.items()))
+    if reset:
+        _stats.clear()
+    return result
+
+
+def add_hook(hook):
+    """
+    Call hook(name, seconds) for every measured call.
+
+    Hooks may forward the measurements to a metrics system; they are
+    called synchronously, so they should be cheap.
+
+    @param hook: the callable
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """
+    Remove a hook added by add_hook.
+
+    @raises ValueError: the hook was not added
+    """
+    _hooks.remove(hook)
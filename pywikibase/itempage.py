@@ -9,8 +9,10 @@ Handling a Wikibase entity.
 # Distributed under the terms of the MIT license.
 #
 from __future__ import unicode_literals
+from collections import defaultdict, Counter
 
 import re
+import weakref
 
 from pywikibase.wikibasepage import WikibasePage
 
@@ -26,6 +28,9 @@ class ItemPage(WikibasePage):
     been looked up, the item is then defined by the qid.
     """
 
+    # Pool of shared items created by fromNumericID, see setInterning
+    _pool = None
+
     def __init__(self, title=None, content=None):
         """
         Constructor.
@@ -41,12 +46,61 @@ class ItemPage(WikibasePage):
                 % title)
         self.id = title
 
+    @classmethod
+    def fromNumericID(cls, numeric_id):
+        """
+        Create an item from the numeric part of its id.
+
+        This is meant for ids from trusted JSON, e.g. the numeric-id of a
+        wikibase-item snak, and skips the validation of the title. When
+        interning is enabled, the same object is returned for equal ids.
+
+        @param numeric_id: the id without "Q" prefix
+        @type numeric_id: int or str
+        @rtype: ItemPage
+        """
+        numeric_id = int(numeric_id)
+        pool = cls._pool
+        if pool is not None:
+            item = pool.get(numeric_id)
+            if item is not None:
+                return item
+        if numeric_id < 1:
+            raise RuntimeError(
+                u"'Q%s' is not a valid item page title" % numeric_id)
+        item = cls.__new__(cls)
+        item.id = 'Q%s' % numeric_id
+        if pool is not None:
+            pool[numeric_id] = item
+        return item
+
+    @classmethod
+    def setInterning(cls, enabled=True):
+        """
+        Enable or disable sharing of the items created by fromNumericID.
+
+        Claim targets are created through fromNumericID, so with interning
+        enabled all claims pointing to the same item share one ItemPage.
+        Items are held by weak references and are dropped from the pool
+        once no claim uses them anymore.
+
+        Shared items must be treated as read-only references; do not call
+        get() on them.
+
+        @param enabled: whether to intern the items
+        @type enabled: bool
+        """
+        cls._pool = weakref.WeakValueDictionary() if enabled else None
+
     def get(self, *args, **kwargs):
         """
         Fetch all item data, and cache it.
 
         @param args: values of props
+        @param kwargs: see L{WikibasePage.get}
         """
+        # the sitelinks are parsed from the content afterwards
+        keep_content = kwargs.pop('keep_content', True)
         data = super(ItemPage, self).get(*args, **kwargs)
 
         # sitelinks and badges
@@ -60,11 +114,14 @@ class ItemPage(WikibasePage):
                     self.badges[dbname] = \
                         self._content['sitelinks'][dbname]['badges']
 
+        if not keep_content:
+            del self._content
+
         data['claims'] = self.claims
         data['sitelinks'] = self.sitelinks
         return data
 
-    def toJSON(self, diffto=None):
+    def toJSON(self, diffto=None, shared=False):
         """
         Create JSON suitable for Wikibase API.
 
@@ -73,15 +130,43 @@ class ItemPage(WikibasePage):
 
         @param diffto: JSON containing claim data
         @type diffto: dict
+        @param shared: return the cached JSON of the claims instead of
+            copies, see L{WikibasePage.toJSON}
+        @type shared: bool
 
         @return: dict
         """
-        data = super(ItemPage, self).toJSON(diffto=diffto)
+        data = super(ItemPage, self).toJSON(diffto=diffto, shared=shared)
 
         self._diff_to('sitelinks', 'site', 'title', diffto, data)
 
         return data
 
+    def setSitelink(self, site, title):
+        """
+        Set the sitelink to a site.
+
+        @param site: database name of the site, e.g. "enwiki"
+        @type site: str
+        @param title: title of the linked page
+        @type title: str
+        """
+        self.sitelinks[site] = title
+        if self._journal is not None:
+            self._journal['sitelinks'][site] = title
+
+    def removeSitelink(self, site):
+        """
+        Remove the sitelink to a site.
+
+        @param site: database name of the site, e.g. "enwiki"
+        @type site: str
+        """
+        self.sitelinks.pop(site, None)
+        self.badges.pop(site, None)
+        if self._journal is not None:
+            self._journal['sitelinks'][site] = ''
+
     def addClaim(self, claim):
         """
         Add a claim to the item.
@@ -94,6 +179,8 @@ class ItemPage(WikibasePage):
             self.claims[claim.getID()].append(claim)
         else:
             self.claims[claim.getID()] = [claim]
+        if self._journal is not None:
+            self._claimChanged(claim)
 
     def removeClaims(self, claims, **kwargs):
         """
@@ -108,8 +195,24 @@ class ItemPage(WikibasePage):
         from pywikibase.claim import Claim
         if isinstance(claims, Claim):
             claims = [claims]
+        # Count the claims per property, so each property list is only
+        # walked once whatever the number of claims removed from it.
+        to_remove = defaultdict(Counter)
         for claim in claims:
-            if claim in self.claims.get(claim.getID(), []):
-                self.claims.get(claim.getID(), []).remove(claim)
-            if claim.getID() in self.claims and not self.claims[claim.getID()]:
-                self.claims.pop(claim.getID())
+            to_remove[claim.getID()][claim] += 1
+        for pid, counter in to_remove.items():
+            if pid not in self.claims:
+                continue
+            prop_claims = self.claims[pid]
+            kept = []
+            for claim in prop_claims:
+                if counter[claim] > 0:
+                    counter[claim] -= 1
+                    claim.on_item = None
+                    if self._journal is not None:
+                        self._claimRemoved(claim)
+                else:
+                    kept.append(claim)
+            prop_claims[:] = kept
+            if not prop_claims:
+                self.claims.pop(pid)
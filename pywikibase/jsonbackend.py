@@ -0,0 +1,187 @@
+# -*- coding: utf-8  -*-
+"""
+Pluggable JSON decoding and encoding.
+
+The fastest installed backend of orjson, simdjson (pysimdjson) and ujson
+is used, falling back to the json module of the standard library. The
+backend may be chosen globally using set_backend, or per call.
+
+Pretty printed output (indent) is always created by the json module, so
+it does not depend on the installed backends.
+"""
+
+#
+# (C) Pywikibot team, 2008-2015
+#
+# Distributed under the terms of the MIT license.
+#
+from __future__ import unicode_literals
+
+import json
+import re
+
+# In order of preference
+BACKENDS = ('orjson', 'simdjson', 'ujson', 'json')
+
+_backend = None
+
+# The id of an entity in undecoded JSON, see _top_level
+_ID_RE = r'"id"\s*:\s*"([QPLM][1-9][0-9]*)"'
+
+# (regex, str or bytes) -> compiled pattern
+_patterns = {}
+
+
+def _json_loads(data):
+    """Decode JSON using the json module, which needs str before 3.6."""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def _top_level(regex, data):
+    """
+    Return the first group of the first match of a regex in undecoded JSON.
+
+    The match must be a key of the outermost object, i.e. follow one more
+    opening than closing brace; otherwise, like for an id nested in a
+    snak value, None is returned and the JSON has to be decoded.
+
+    @param regex: the regex, written for str
+    @type regex: str
+    @param data: the JSON
+    @type data: str or bytes
+    @rtype: str or None
+    """
+    kind = type(data)
+    pattern = _patterns.get((regex, kind))
+    if pattern is None:
+        pattern = _patterns[regex, kind] = re.compile(
+            regex.encode('ascii') if kind is bytes else regex)
+    match = pattern.search(data)
+    if match is None:
+        return None
+    if kind is bytes:
+        opening, closing = b'{', b'}'
+    else:
+        opening, closing = '{', '}'
+    if data.count(opening, 0, match.start()) - \
+            data.count(closing, 0, match.start()) != 1:
+        return None
+    group = match.group(1)
+    return group.decode('ascii') if kind is bytes else group
+
+
+def _load(name):
+    """Return loads and compact dumps functions of a backend."""
+    if name == 'json':
+        return _json_loads, lambda obj, sort_keys: json.dumps(
+            obj, sort_keys=sort_keys, separators=(',', ':'),
+            ensure_ascii=False)
+    if name == 'orjson':
+        import orjson
+
+        def dumps(obj, sort_keys):
+            option = orjson.OPT_SORT_KEYS if sort_keys else 0
+            return orjson.dumps(obj, option=option).decode('utf-8')
+        return orjson.loads, dumps
+    if name == 'simdjson':
+        import simdjson
+        return simdjson.loads, _load('json')[1]
+    if name == 'ujson':
+        import ujson
+        # ujson escapes slashes by default, unlike the other backends
+        return ujson.loads, lambda obj, sort_keys: ujson.dumps(
+            obj, sort_keys=sort_keys, ensure_ascii=False,
+            escape_forward_slashes=False)
+    raise ValueError("Unknown JSON backend '%s'" % name)
+
+
+_functions = {}
+
+
+def _get(name):
+    if name is None:
+        if _backend is None:
+            set_backend()
+        name = _backend
+    functions = _functions.get(name)
+    if functions is None:
+        functions = _functions[name] = _load(name)
+    return functions
+
+
+def available():
+    """
+    Return the names of the installed backends, best first.
+
+    @rtype: list of str
+    """
+    names = []
+    for name in BACKENDS:
+        try:
+            _get(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def set_backend(name=None):
+    """
+    Set the backend used by default.
+
+    @param name: one of BACKENDS, or None for the best installed one
+    @type name: str
+    @raises ImportError: the backend is not installed
+    @raises ValueError: the backend is unknown
+    """
+    global _backend
+    if name is None:
+        name = available()[0]
+    _get(name)
+    _backend = name
+
+
+def get_backend():
+    """
+    Return the name of the backend used by default.
+
+    @rtype: str
+    """
+    if _backend is None:
+        set_backend()
+    return _backend
+
+
+def loads(data, backend=None):
+    """
+    Decode JSON.
+
+    @param data: the JSON document; bytes are decoded as UTF-8 without
+        creating a str first where the backend supports it
+    @type data: str or bytes
+    @param backend: the backend to use instead of the default one
+    @type backend: str
+    """
+    return _get(backend)[0](data)
+
+
+def dumps(obj, indent=None, sort_keys=False, backend=None):
+    """
+    Encode JSON.
+
+    @param obj: the object to encode
+    @param indent: indentation for pretty printing; implies the json
+        module
+    @type indent: int
+    @param sort_keys: sort the keys of dicts
+    @type sort_keys: bool
+    @param backend: the backend to use instead of the default one
+    @type backend: str
+    @rtype: str
+    """
+    if indent is not None:
+        return json.dumps(obj, indent=indent, sort_keys=sort_keys,
+                          separators=(',', ': '))
+    return _get(backend)[1](obj, sort_keys)
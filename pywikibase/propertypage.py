@@ -38,15 +38,16 @@ class PropertyPage(WikibasePage, Property):
         self.id = title
         Property.__init__(self, self.id, datatype)
 
-    def get(self, *args):
+    def get(self, *args, **kwargs):
         """
         Fetch the property entity, and cache it.
 
         @param force: override caching
         @param args: values of props
         """
-        if not hasattr(self, '_content'):
-            WikibasePage.get(self, *args)
+        # loaded before, possibly without keeping the content
+        if not hasattr(self, 'claims'):
+            WikibasePage.get(self, *args, **kwargs)
 
     def newClaim(self, *args, **kwargs):
         """
@@ -20,7 +20,7 @@ except NameError:
     basestring = (str, bytes)
 
 
-class Property():
+class Property(object):
 
     """
     A Wikibase property.
@@ -33,6 +33,9 @@ class Property():
     it subclasses this Property class, but a claim does not have Page like
     behaviour and semantics.
     """
+
+    __slots__ = ('id', '_type')
+
     from pywikibase.itempage import ItemPage  # noqa
     types = {'wikibase-item': ItemPage,
              'string': basestring,
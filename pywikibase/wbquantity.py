@@ -11,7 +11,31 @@ Wikibase Quantity.
 from __future__ import unicode_literals
 from decimal import Decimal
 
-import json
+from pywikibase import jsonbackend
+
+
+def _decimal(name):
+    """
+    Return a property converting a raw string value to Decimal on access.
+
+    The value is stored in the slot of the same name prefixed with an
+    underscore. Setting the value drops the raw strings kept for
+    toWikibase.
+    """
+    slot = '_' + name
+
+    def fget(self):
+        value = getattr(self, slot)
+        if value is not None and not isinstance(value, Decimal):
+            value = self._todecimal(value)
+            setattr(self, slot, value)
+        return value
+
+    def fset(self, value):
+        setattr(self, slot, value)
+        self._raw = None
+
+    return property(fget, fset)
 
 
 class WbQuantity(object):
@@ -20,6 +44,15 @@ class WbQuantity(object):
 
     _items = ('amount', 'upperBound', 'lowerBound', 'unit')
 
+    __slots__ = ('_amount', '_upperBound', '_lowerBound', 'unit', '_raw')
+
+    amount = _decimal('amount')
+    upperBound = _decimal('upperBound')
+    lowerBound = _decimal('lowerBound')
+
+    # Default of the lazy parameter of fromWikibase
+    lazy = False
+
     @staticmethod
     def _todecimal(value):
         """
@@ -70,6 +103,7 @@ class WbQuantity(object):
         if unit is None:
             unit = '1'
 
+        self._raw = None
         self.amount = self._todecimal(amount)
         self.unit = unit
 
@@ -94,6 +128,12 @@ class WbQuantity(object):
         @return: Wikibase JSON
         @rtype: dict
         """
+        if self._raw is not None:
+            return {'amount': self._raw[0],
+                    'upperBound': self._raw[1],
+                    'lowerBound': self._raw[2],
+                    'unit': self.unit
+                    }
         json = {'amount': self._fromdecimal(self.amount),
                 'upperBound': self._fromdecimal(self.upperBound),
                 'lowerBound': self._fromdecimal(self.lowerBound),
@@ -102,25 +142,51 @@ class WbQuantity(object):
         return json
 
     @classmethod
-    def fromWikibase(cls, wb):
+    def fromWikibase(cls, wb, lazy=None):
         """
         Create a WbQuanity from the JSON data given by the Wikibase API.
 
+        The bounds are taken over as given; they are only kept when both
+        are present.
+
+        In lazy mode the amount and bounds are kept as the given strings
+        and only converted to Decimal when accessed; float() of the
+        quantity does not convert them at all. toWikibase returns the
+        original strings until one of the values is changed.
+
         @param wb: Wikibase JSON
         @type wb: dict
+        @param lazy: use lazy mode, defaults to the class attribute lazy
+        @type lazy: bool
         @rtype: pywikibot.WbQuanity
         """
-        amount = cls._todecimal(wb['amount'])
-        upperBound = cls._todecimal(wb.get('upperBound'))
-        lowerBound = cls._todecimal(wb.get('lowerBound'))
-        error = None
-        if (upperBound and lowerBound):
-            error = (upperBound - amount, amount - lowerBound)
-        return cls(amount, wb['unit'], error)
+        amount = wb['amount']
+        upperBound = wb.get('upperBound')
+        lowerBound = wb.get('lowerBound')
+        if upperBound is None or lowerBound is None:
+            upperBound = lowerBound = None
+        quantity = cls.__new__(cls)
+        quantity.unit = wb['unit']
+        if lazy or lazy is None and cls.lazy:
+            quantity._raw = (amount, upperBound, lowerBound)
+            quantity._amount = amount
+            quantity._upperBound = upperBound
+            quantity._lowerBound = lowerBound
+        else:
+            quantity._raw = None
+            quantity._amount = cls._todecimal(amount)
+            quantity._upperBound = cls._todecimal(upperBound)
+            quantity._lowerBound = cls._todecimal(lowerBound)
+        return quantity
+
+    def __float__(self):
+        if self._raw is not None:
+            return float(self._raw[0])
+        return float(self.amount)
 
     def __str__(self):
-        return json.dumps(self.toWikibase(), indent=4, sort_keys=True,
-                          separators=(',', ': '))
+        return jsonbackend.dumps(self.toWikibase(), indent=4,
+                                 sort_keys=True)
 
     def __repr__(self):
 
@@ -129,5 +195,22 @@ class WbQuantity(object):
                           for attr, value in values)
         return '{0}({1})'.format(self.__class__.__name__, attrs)
 
+    def _key(self):
+        return tuple(getattr(self, attr) for attr in self._items)
+
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        if not isinstance(other, WbQuantity):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        """
+        Return the hash of the amount, unit and bounds.
+
+        A quantity must not be changed while it is hashed in a set or dict.
+        """
+        return hash(self._key())
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
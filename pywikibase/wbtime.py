@@ -11,18 +11,34 @@ Exceptions
 from __future__ import unicode_literals
 
 import re
-import json
+from array import array
+
+from pywikibase import jsonbackend
 
 try:
     long
 except NameError:
     long = int
 
+# Typecode of 64 bit integer arrays; Python 2 has no 'q', but its 'l' is
+# 64 bit on the platforms other than Windows.
+try:
+    array('q')
+except ValueError:
+    _INT64 = 'l'
+else:
+    _INT64 = 'q'
+
 
 class WbTime(object):
 
     """A Wikibase time representation."""
 
+    _items = ('year', 'month', 'day', 'hour', 'minute', 'second',
+              'precision', 'before', 'after', 'timezone', 'calendarmodel')
+
+    __slots__ = _items
+
     PRECISION = {'1000000000': 0,
                  '100000000': 1,
                  '10000000': 2,
@@ -42,6 +58,14 @@ class WbTime(object):
 
     FORMATSTR = '{0:+04d}-{1:02d}-{2:02d}T{3:02d}:{4:02d}:{5:02d}Z'
 
+    _TIMESTR_RE = re.compile(r'([-+]?\d+)-(\d+)-(\d+)T(\d+):(\d+):(\d+)Z')
+
+    # Integer codes of the calendar models used by decodeBulk
+    CALENDARMODEL_CODES = {
+        'http://www.wikidata.org/entity/Q1985727': 1,  # Gregorian
+        'http://www.wikidata.org/entity/Q1985786': 2,  # Julian
+    }
+
     def __init__(self, year=None, month=None, day=None,
                  hour=None, minute=None, second=None,
                  precision=None, before=0, after=0,
@@ -95,8 +119,7 @@ class WbTime(object):
     @classmethod
     def fromTimestr(cls, datetimestr, precision=14, before=0, after=0,
                     timezone=0, calendarmodel=None):
-        match = re.match(r'([-+]?\d+)-(\d+)-(\d+)T(\d+):(\d+):(\d+)Z',
-                         datetimestr)
+        match = cls._TIMESTR_RE.match(datetimestr)
         if not match:
             raise ValueError(u"Invalid format: '%s'" % datetimestr)
         t = match.groups()
@@ -130,20 +153,102 @@ class WbTime(object):
 
     @classmethod
     def fromWikibase(cls, ts):
-        return cls.fromTimestr(ts[u'time'], ts[u'precision'],
-                               ts[u'before'], ts[u'after'],
-                               ts[u'timezone'], ts[u'calendarmodel'])
+        """
+        Create a WbTime from the JSON data given by the Wikibase API.
+
+        The data is trusted to be valid, so the precision is not checked
+        and the constructor is bypassed.
+
+        @param ts: Wikibase JSON
+        @type ts: dict
+        @rtype: WbTime
+        """
+        match = cls._TIMESTR_RE.match(ts[u'time'])
+        if not match:
+            raise ValueError(u"Invalid format: '%s'" % ts[u'time'])
+        year, month, day, hour, minute, second = match.groups()
+        time = cls.__new__(cls)
+        time.year = long(year)
+        time.month = int(month)
+        time.day = int(day)
+        time.hour = int(hour)
+        time.minute = int(minute)
+        time.second = int(second)
+        time.precision = ts[u'precision']
+        time.before = ts[u'before']
+        time.after = ts[u'after']
+        time.timezone = ts[u'timezone']
+        time.calendarmodel = ts[u'calendarmodel']
+        return time
+
+    @staticmethod
+    def _splitDate(timestr):
+        """Return year, month and day of a trusted Wikibase time string."""
+        # time is [+-]Y+-MM-DDThh:mm:ssZ
+        date = timestr[:timestr.index('T')]
+        return int(date[:-6]), int(date[-5:-3]), int(date[-2:])
+
+    @classmethod
+    def decodeBulk(cls, values):
+        """
+        Decode many time values into parallel arrays without WbTime objects.
+
+        The arrays are indexed like values and can be wrapped without
+        copying, e.g. by numpy.frombuffer. Calendar models are coded
+        using CALENDARMODEL_CODES, unknown ones as 0.
+
+        @param values: time datavalues or their value dicts
+        @type values: iterable of dict
+        @return: arrays 'year' (int64), 'month', 'day', 'precision' and
+            'calendarmodel' (int8)
+        @rtype: dict
+        """
+        years = array(_INT64)
+        months = array('b')
+        days = array('b')
+        precisions = array('b')
+        calendars = array('b')
+        codes = cls.CALENDARMODEL_CODES
+        splitDate = cls._splitDate
+        for value in values:
+            if 'value' in value:
+                value = value['value']
+            year, month, day = splitDate(value['time'])
+            years.append(year)
+            months.append(month)
+            days.append(day)
+            precisions.append(value['precision'])
+            calendars.append(codes.get(value['calendarmodel'], 0))
+        return {'year': years,
+                'month': months,
+                'day': days,
+                'precision': precisions,
+                'calendarmodel': calendars,
+                }
 
     def __str__(self):
-        return json.dumps(self.toWikibase(), indent=4, sort_keys=True,
-                          separators=(',', ': '))
+        return jsonbackend.dumps(self.toWikibase(), indent=4,
+                                 sort_keys=True)
+
+    def _key(self):
+        return tuple(getattr(self, attr) for attr in self._items)
 
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        if not isinstance(other, WbTime):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        """Return the hash of the time; do not change hashed times."""
+        return hash(self._key())
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
 
     def __repr__(self):
         return u"WbTime(year=%(year)d, month=%(month)d, day=%(day)d, " \
             u"hour=%(hour)d, minute=%(minute)d, second=%(second)d, " \
             u"precision=%(precision)d, before=%(before)d, after=%(after)d, " \
             u"timezone=%(timezone)d, calendarmodel='%(calendarmodel)s')" \
-            % self.__dict__
+            % dict((attr, getattr(self, attr)) for attr in self._items)
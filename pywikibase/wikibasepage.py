@@ -9,9 +9,9 @@ Handling a Wikibase entity.
 # Distributed under the terms of the MIT license.
 #
 from __future__ import unicode_literals
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, OrderedDict
 
-import json
+from pywikibase import jsonbackend
 
 try:
     unicode = unicode
@@ -19,6 +19,30 @@ except NameError:
     basestring = (str, bytes)
 
 
+def _copy(data):
+    """Return a deep copy of JSON data, faster than copy.deepcopy."""
+    if isinstance(data, dict):
+        return dict((key, _copy(value)) for key, value in data.items())
+    if isinstance(data, list):
+        return [_copy(value) for value in data]
+    return data
+
+
+def _freeze(data):
+    """
+    Convert JSON data into a hashable value with the same equality.
+
+    Claims use it for their targets as well, which are JSON values or
+    hashable objects.
+    """
+    if isinstance(data, dict):
+        return frozenset((key, _freeze(value))
+                         for key, value in data.items())
+    if isinstance(data, list):
+        return tuple(_freeze(value) for value in data)
+    return data
+
+
 class WikibasePage(object):
 
     """
@@ -27,6 +51,12 @@ class WikibasePage(object):
     There should be no need to instantiate this directly.
     """
 
+    # Changes recorded since startJournal, or None when not recording
+    _journal = None
+
+    # Revision of the loaded content, if given in it
+    lastrevid = None
+
     def __init__(self, id=None):
         self.id = id
 
@@ -35,25 +65,41 @@ class WikibasePage(object):
             return other == self.id
         return other.id == self.id
 
-    def get(self, content=None):
+    def __hash__(self):
+        # consistent with the comparison to the id string
+        return hash(self.id)
+
+    def get(self, content=None, lazy=False, json_backend=None,
+            keep_content=True):
         """
         Fetch all page data, and cache it.
 
         @param force: override caching
         @type force: bool
         @param content: content
+        @param lazy: build the Claims of a property only when it is first
+            read from the claims mapping
+        @type lazy: bool
+        @param json_backend: JSON backend used to decode str or bytes
+            content instead of the default one, see L{jsonbackend}
+        @type json_backend: str
+        @param keep_content: keep the decoded JSON in _content; otherwise
+            only the parsed attributes and the JSON of the claims remain,
+            which toJSON uses, and get() needs content to be called again
+        @type keep_content: bool
         @param args: may be used to specify custom props.
         """
         if content:
             if isinstance(content, dict):
                 self._content = content
             else:
-                self._content = json.loads(content)
+                self._content = jsonbackend.loads(content, json_backend)
         if not hasattr(self, '_content'):
             raise ValueError('You must provide some content.')
 
         if 'id' in self._content or 'title' in self._content:
             self.id = self._content.get('title', self._content['id'])
+        self.lastrevid = self._content.get('lastrevid')
         # aliases
         self.aliases = {}
         if 'aliases' in self._content:
@@ -78,8 +124,13 @@ class WikibasePage(object):
 
         # claims
         from pywikibase.claim import Claim
-        self.claims = {}
-        if 'claims' in self._content:
+        from pywikibase.claimcollection import ClaimCollection
+        if lazy:
+            self.claims = ClaimCollection(self._content.get('claims'),
+                                          on_item=self)
+        else:
+            self.claims = {}
+        if not lazy and 'claims' in self._content:
             for pid in self._content['claims']:
                 self.claims[pid] = []
                 for claim in self._content['claims'][pid]:
@@ -87,12 +138,65 @@ class WikibasePage(object):
                     c.on_item = self
                     self.claims[pid].append(c)
 
+        if not keep_content:
+            del self._content
+
         return {'aliases': self.aliases,
                 'labels': self.labels,
                 'descriptions': self.descriptions,
                 'claims': self.claims,
                 }
 
+    @classmethod
+    def fromJSON(cls, content, **kwargs):
+        """
+        Create an entity object of the matching type from its JSON.
+
+        @param content: JSON of a single entity, either decoded or encoded
+        @type content: dict, str or bytes
+        @param kwargs: passed to L{get}
+        @return: ItemPage or PropertyPage, depending on the entity type
+        @raises EntityTypeUnknownException: the entity type is not supported
+        """
+        if not isinstance(content, dict):
+            content = jsonbackend.loads(content, kwargs.get('json_backend'))
+        entity_type = content.get('type')
+        if entity_type == 'item':
+            from pywikibase.itempage import ItemPage
+            page = ItemPage(content['id'])
+        elif entity_type == 'property':
+            from pywikibase.propertypage import PropertyPage
+            page = PropertyPage(content['id'], content.get('datatype'))
+        else:
+            from pywikibase.exceptions import EntityTypeUnknownException
+            raise EntityTypeUnknownException(
+                u"'%s' is not a supported entity type" % entity_type)
+        page.get(content=content, **kwargs)
+        return page
+
+    @classmethod
+    def fromBinary(cls, data):
+        """
+        Create an entity object from its binary encoding.
+
+        @param data: the result of L{toBinary}
+        @type data: bytes
+        @return: ItemPage or PropertyPage, depending on the entity type
+        """
+        from pywikibase import binary
+        return binary.loads(data)
+
+    def toBinary(self, compression=None):
+        """
+        Encode the entity in the compact binary format of L{binary}.
+
+        @param compression: None, 'zlib' or 'zstd'
+        @type compression: str
+        @rtype: bytes
+        """
+        from pywikibase import binary
+        return binary.dumps(self, compression)
+
     def _diff_to(self, type_key, key_name, value_name, diffto, data):
         assert type_key not in data, 'Key type must be defined in data'
         source = getattr(self, type_key).copy()
@@ -109,15 +213,20 @@ class WikibasePage(object):
         if source:
             data[type_key] = source
 
-    def toJSON(self, diffto=None):
+    def toJSON(self, diffto=None, shared=False):
         """
         Create JSON suitable for Wikibase API.
 
         When diffto is provided, JSON representing differences
-        to the provided data is created.
+        to the provided data is created. The claims of a lazily loaded
+        entity are all materialized.
 
         @param diffto: JSON containing claim data
         @type diffto: dict
+        @param shared: return the cached JSON of the claims, see
+            L{Claim.toJSON}, instead of copies; faster, but the claim JSON
+            must not be modified
+        @type shared: bool
 
         @return: dict
         """
@@ -126,7 +235,8 @@ class WikibasePage(object):
 
         self._diff_to('descriptions', 'language', 'value', diffto, data)
 
-        aliases = self.aliases
+        aliases = dict((lang, list(strings))
+                       for lang, strings in self.aliases.items())
         if diffto and 'aliases' in diffto:
             for lang in set(diffto['aliases'].keys()) - set(aliases.keys()):
                 aliases[lang] = []
@@ -147,34 +257,71 @@ class WikibasePage(object):
 
         claims = {}
         for prop in self.claims:
+            # Reading a lazily loaded property materializes its claims, so
+            # the output has the same form whether it was read before or
+            # not, and the claim JSON is cached for later calls.
             if len(self.claims[prop]) > 0:
-                claims[prop] = [claim.toJSON() for claim in self.claims[prop]]
+                claims[prop] = [claim.toJSON(shared=True)
+                                for claim in self.claims[prop]]
 
         if diffto and 'claims' in diffto:
-            temp = defaultdict(list)
-            claim_ids = set()
-
-            diffto_claims = diffto['claims']
-
-            for prop in claims:
-                for claim in claims[prop]:
-                    if (prop not in diffto_claims or
-                            claim not in diffto_claims[prop]):
-                        temp[prop].append(claim)
-
-                    claim_ids.add(claim['id'])
-
-            for prop, prop_claims in diffto_claims.items():
-                for claim in prop_claims:
-                    if 'id' in claim and claim['id'] not in claim_ids:
-                        temp[prop].append({'id': claim['id'], 'remove': ''})
-
-            claims = temp
+            claims = self._diff_claims(claims, diffto['claims'])
 
         if claims:
+            if not shared:
+                claims = dict((prop, [_copy(claim) for claim in prop_claims])
+                              for prop, prop_claims in claims.items())
             data['claims'] = claims
         return data
 
+    @staticmethod
+    def _diff_claims(claims, diffto_claims):
+        """
+        Return the claims changed compared to diffto_claims.
+
+        Claims which are not equal to any claim of the same property in
+        diffto_claims are returned, followed by removal entries for the
+        claims of diffto_claims whose id is gone. The claims of diffto
+        are indexed by statement id, and by content when they have no id,
+        so the diff takes linear time.
+
+        @param claims: JSON of the current claims per property
+        @type claims: dict
+        @param diffto_claims: JSON of the old claims per property
+        @type diffto_claims: dict
+        @rtype: dict
+        """
+        temp = defaultdict(list)
+        claim_ids = set()
+
+        for prop in claims:
+            by_id = defaultdict(list)
+            by_content = None
+            for claim in diffto_claims.get(prop, ()):
+                by_id[claim.get('id')].append(claim)
+
+            for claim in claims[prop]:
+                claim_id = claim.get('id')
+                if claim_id is not None:
+                    unchanged = claim in by_id.get(claim_id, ())
+                else:
+                    if by_content is None:
+                        by_content = set(_freeze(old) for old
+                                         in by_id.get(None, ()))
+                    unchanged = _freeze(claim) in by_content
+                if not unchanged:
+                    temp[prop].append(claim)
+
+                if claim_id is not None:
+                    claim_ids.add(claim_id)
+
+        for prop, prop_claims in diffto_claims.items():
+            for claim in prop_claims:
+                if 'id' in claim and claim['id'] not in claim_ids:
+                    temp[prop].append({'id': claim['id'], 'remove': ''})
+
+        return temp
+
     def getID(self, numeric=False, force=False):
         """
         Get the entity identifier.
@@ -191,6 +338,131 @@ class WikibasePage(object):
 
         return self.id
 
+    def startJournal(self):
+        """
+        Start recording changes made to the entity.
+
+        Changes made through editLabels, editDescriptions, editAliases,
+        the claim methods of ItemPage and the setters of Claim are
+        recorded, and L{changesToJSON} creates the edit data from them
+        without comparing the whole entity. Calling it again discards the
+        changes recorded so far, e.g. once they have been saved.
+        """
+        self._journal = {'labels': OrderedDict(),
+                         'descriptions': OrderedDict(),
+                         'aliases': OrderedDict(),
+                         'sitelinks': OrderedDict(),
+                         'claims': OrderedDict(),
+                         'removed': OrderedDict(),
+                         }
+
+    def stopJournal(self):
+        """Stop recording changes and discard the recorded ones."""
+        self._journal = None
+
+    def editLabels(self, labels):
+        """
+        Set or remove labels.
+
+        @param labels: new label per language code; an empty value removes
+            the label
+        @type labels: dict
+        """
+        self._edit_terms('labels', labels)
+
+    def editDescriptions(self, descriptions):
+        """
+        Set or remove descriptions.
+
+        @param descriptions: new description per language code; an empty
+            value removes the description
+        @type descriptions: dict
+        """
+        self._edit_terms('descriptions', descriptions)
+
+    def _edit_terms(self, type_key, terms):
+        values = getattr(self, type_key)
+        for lang, value in terms.items():
+            if value:
+                values[lang] = value
+            else:
+                values.pop(lang, None)
+            if self._journal is not None:
+                self._journal[type_key][lang] = value or ''
+
+    def editAliases(self, aliases):
+        """
+        Replace the aliases of some languages.
+
+        @param aliases: new list of aliases per language code; an empty
+            list removes all aliases of the language
+        @type aliases: dict
+        """
+        for lang, strings in aliases.items():
+            old = self.aliases.get(lang, [])
+            if strings:
+                self.aliases[lang] = list(strings)
+            else:
+                self.aliases.pop(lang, None)
+            if self._journal is not None:
+                # keep the number of aliases before the first change, the
+                # removed ones are sent as empty strings
+                previous = self._journal['aliases'].get(lang, (len(old),))
+                self._journal['aliases'][lang] = (previous[0],
+                                                  list(strings))
+
+    def _claimChanged(self, claim):
+        """Record a changed or added claim in the journal."""
+        self._journal['claims'][id(claim)] = claim
+
+    def _claimRemoved(self, claim):
+        """Record a removed claim in the journal."""
+        self._journal['claims'].pop(id(claim), None)
+        if claim.snak is not None:
+            self._journal['removed'][claim.snak] = claim.getID()
+
+    def changesToJSON(self, shared=False):
+        """
+        Create JSON suitable for Wikibase API from the recorded changes.
+
+        The result has the same form as toJSON(diffto=...), but only the
+        recorded changes are visited. See L{startJournal}.
+
+        @param shared: return the cached JSON of the claims instead of
+            copies, see L{toJSON}
+        @type shared: bool
+        @return: dict
+        @raises ValueError: no journal has been started
+        """
+        if self._journal is None:
+            raise ValueError('No journal has been started.')
+        journal = self._journal
+        data = {}
+        for type_key, key_name, value_name in (
+                ('labels', 'language', 'value'),
+                ('descriptions', 'language', 'value'),
+                ('sitelinks', 'site', 'title')):
+            if journal[type_key]:
+                data[type_key] = dict(
+                    (key, {key_name: key, value_name: value})
+                    for key, value in journal[type_key].items())
+
+        if journal['aliases']:
+            data['aliases'] = {}
+            for lang, (count, strings) in journal['aliases'].items():
+                strings = strings + [''] * (count - len(strings))
+                data['aliases'][lang] = [{'language': lang, 'value': value}
+                                         for value in strings]
+
+        claims = defaultdict(list)
+        for claim in journal['claims'].values():
+            claims[claim.getID()].append(claim.toJSON(shared=shared))
+        for claim_id, pid in journal['removed'].items():
+            claims[pid].append({'id': claim_id, 'remove': ''})
+        if claims:
+            data['claims'] = dict(claims)
+        return data
+
     @classmethod
     def _normalizeData(cls, data):
         """
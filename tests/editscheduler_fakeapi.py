@@ -0,0 +1,42 @@
+"""In-process transport for the EditScheduler tests."""
+import asyncio
+import json
+import random
+
+
+class FakeAPI(object):
+
+    """In-process transport answering wbeditentity requests."""
+
+    def __init__(self):
+        self.edits = []
+        self.running = 0
+        self.max_running = 0
+        # responses returned before the normal ones
+        self.failures = []
+        # responses returned for the edits of an entity
+        self.entity_failures = {}
+
+    async def request(self, params, method='GET'):
+        assert method == 'POST'
+        assert params['action'] == 'wbeditentity'
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(random.random() / 500)
+            failures = self.entity_failures.get(params['id'],
+                                                self.failures)
+            if failures:
+                failure = failures.pop(0)
+                if isinstance(failure, Exception):
+                    raise failure
+                status, data, headers = failure
+            else:
+                self.edits.append((params['id'], json.loads(params['data'])))
+                status, data, headers = 200, {'success': 1}, {}
+            return status, headers, json.dumps(data).encode('utf-8')
+        finally:
+            self.running -= 1
+
+    def close(self):
+        pass
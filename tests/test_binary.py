@@ -0,0 +1,92 @@
+import unittest
+import json
+import os
+
+from pywikibase import (binary, Claim, ItemPage, PropertyPage, WbTime,
+                        WikibasePage)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class TestBinary(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd')) as f:
+            self._content = json.load(f)['entities']['Q7251']
+        self.item_page = ItemPage()
+        self.item_page.get(content=self._content)
+
+    def assertRoundTrip(self, page, compression=None):
+        decoded = binary.loads(binary.dumps(page, compression))
+        self.assertIsInstance(decoded, type(page))
+        self.assertEqual(decoded.getID(), page.getID())
+        self.assertEqual(decoded.toJSON(), page.toJSON())
+        for pid in page.claims:
+            self.assertEqual(decoded.claims[pid], page.claims[pid])
+            for claim in decoded.claims[pid]:
+                self.assertIs(claim.on_item, decoded)
+        return decoded
+
+    def test_round_trip(self):
+        decoded = self.assertRoundTrip(self.item_page)
+        self.assertEqual(decoded.sitelinks, self.item_page.sitelinks)
+        self.assertEqual(decoded.badges, self.item_page.badges)
+        self.assertEqual(decoded.aliases, self.item_page.aliases)
+        self.assertRoundTrip(self.item_page, 'zlib')
+        self.assertRoundTrip(ItemPage.fromJSON(self._content, lazy=True))
+
+    @unittest.skipIf(zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        self.assertRoundTrip(self.item_page, 'zstd')
+
+    def test_size(self):
+        data = binary.dumps(self.item_page)
+        self.assertLess(len(data), len(json.dumps(self._content)) / 2)
+        self.assertLess(len(binary.dumps(self.item_page, 'zlib')), len(data))
+
+    def test_property(self):
+        page = PropertyPage('P569', 'time')
+        page.get(content={'id': 'P569', 'type': 'property',
+                          'datatype': 'time',
+                          'labels': {'en': {'language': 'en',
+                                            'value': 'date of birth'}}})
+        decoded = self.assertRoundTrip(page)
+        self.assertEqual(decoded.type, 'time')
+        self.assertEqual(decoded.labels, {'en': 'date of birth'})
+
+    def test_unusual_values(self):
+        claim = Claim('P585', datatype='time')
+        claim.setTarget(WbTime(year=-44, month=3, day=15))
+        claim.snak = 'Q1$5627445f'
+        qualifier = Claim('P1545', datatype='string')
+        qualifier.setTarget('1')
+        qualifier.hash = 'not a hash'
+        claim.addQualifier(qualifier)
+        source = Claim('P248', datatype='wikibase-item')
+        source.setSnakType('somevalue')
+        claim.addSource(source)
+        self.item_page.addClaim(claim)
+        self.item_page.claims['P31'][0].setRank('preferred')
+        decoded = self.assertRoundTrip(self.item_page)
+        self.assertEqual(decoded.claims['P585'][0].snak, 'Q1$5627445f')
+
+    def test_methods(self):
+        decoded = WikibasePage.fromBinary(self.item_page.toBinary('zlib'))
+        self.assertEqual(decoded.toJSON(), self.item_page.toJSON())
+
+    def test_errors(self):
+        data = binary.dumps(self.item_page)
+        self.assertRaises(ValueError, binary.loads, b'{}')
+        self.assertRaises(ValueError, binary.loads,
+                          data[:3] + b'\x63' + data[4:])
+        self.assertRaises(ValueError, binary.loads,
+                          data[:4] + b'\x63' + data[5:])
+        self.assertRaises(ValueError, binary.dumps, self.item_page, 'lzma')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -99,6 +99,64 @@ class TestClaim(unittest.TestCase):
         self.assertEqual(claim.getRank(), 'preferred')
         self.assertEqual(claim.rank, 'preferred')
 
+    def test_json_cache(self):
+        data = self.claim1.toJSON(shared=True)
+        self.assertIs(self.claim1.toJSON(shared=True), data)
+        # a copy by default, which may be modified
+        copy = self.claim1.toJSON()
+        self.assertIsNot(copy, data)
+        self.assertEqual(copy, data)
+        copy['mainsnak']['property'] = 'P1'
+        self.assertEqual(self.claim1.toJSON()['mainsnak']['property'],
+                         'P31')
+
+        self.claim1.setRank('preferred')
+        self.assertIsNot(self.claim1.toJSON(shared=True), data)
+        self.assertEqual(self.claim1.toJSON()['rank'], 'preferred')
+
+        self.claim1.target = ItemPage('Q6')
+        snak = self.claim1.toJSON()['mainsnak']
+        self.assertEqual(snak['datavalue']['value']['numeric-id'], 6)
+
+        # changes of a source are propagated to the claim
+        source = self.claim1.sources[0]['P143'][0]
+        data = self.claim1.toJSON(shared=True)
+        source.setTarget(ItemPage('Q8447'))
+        self.assertIsNot(self.claim1.toJSON(shared=True), data)
+        snak = self.claim1.toJSON()['references'][0]['snaks']['P143'][0]
+        self.assertEqual(snak['datavalue']['value']['numeric-id'], 8447)
+
+        qualifier = Claim('P642', datatype='wikibase-item')
+        qualifier.setTarget(ItemPage('Q5'))
+        self.claim1.addQualifier(qualifier)
+        self.assertIn('P642', self.claim1.toJSON()['qualifiers'])
+        qualifier.setSnakType('novalue')
+        self.assertEqual(
+            self.claim1.toJSON()['qualifiers']['P642'][0]['snaktype'],
+            'novalue')
+
+    def test_hash(self):
+        content = self.claim1.on_item._content
+        other = Claim.fromJSON(content['claims']['P31'][0])
+        self.assertIsNot(other, self.claim1)
+        self.assertEqual(other, self.claim1)
+        self.assertEqual(hash(other), hash(self.claim1))
+        self.assertEqual(len(set([self.claim1, other, self.claim2])), 2)
+        self.assertNotEqual(self.claim1, self.claim2)
+        self.assertNotEqual(self.claim1, 'Q5')
+
+        other.setRank('preferred')
+        self.assertNotEqual(other, self.claim1)
+        other.setRank('normal')
+        self.assertEqual(other, self.claim1)
+
+        other.sources[0]['P143'][0].setTarget(ItemPage('Q8447'))
+        self.assertNotEqual(other, self.claim1)
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.claim1, '__dict__'))
+        self.assertRaises(AttributeError, setattr, self.claim1, 'foo', 1)
+
 
 if __name__ == '__main__':
     unittest.main()
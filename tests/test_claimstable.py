@@ -0,0 +1,112 @@
+import unittest
+import json
+import math
+import os
+
+from pywikibase import ItemPage
+from pywikibase.claimstable import ClaimsTable
+from pywikibase.exceptions import EntityTypeUnknownException
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestClaimsTable(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd')) as f:
+            self._content = json.load(f)['entities']['Q7251']
+        self.item_page = ItemPage()
+        self.item_page.get(content=self._content)
+        self.table = ClaimsTable()
+        self.table.add(self.item_page)
+
+    def _row(self, pid, index=0):
+        rows = [row for row in range(len(self.table))
+                if self.table.property[row] == int(pid[1:])]
+        return rows[index]
+
+    def test_rows(self):
+        table = self.table
+        self.assertEqual(len(table), sum(len(claims) for claims
+                                         in self._content['claims'].values()))
+        self.assertEqual(set(table.subject), set([7251]))
+        row = self._row('P31')
+        self.assertEqual(table.item[row], 5)
+        self.assertEqual(table.datatypes[table.datatype[row]],
+                         'wikibase-item')
+        self.assertEqual(table.RANKS[table.rank[row]], 'normal')
+        self.assertEqual(table.references[row], 2)
+        self.assertTrue(math.isnan(table.latitude[row]))
+
+        row = self._row('P569')
+        self.assertEqual((table.time_year[row], table.time_month[row],
+                          table.time_day[row], table.time_precision[row],
+                          table.time_calendarmodel[row]),
+                         (1912, 6, 23, 11, 1))
+
+        row = self._row('P18')
+        self.assertEqual(table.getString(row), 'Alan Turing Aged 16.jpg')
+        self.assertEqual(table.getString(self._row('P31')), '')
+
+    def test_raw(self):
+        raw = ClaimsTable()
+        raw.add(json.dumps(self._content))
+        self.assertEqual(raw.datatypes, self.table.datatypes)
+        for name, typecode in ClaimsTable.COLUMNS:
+            column = getattr(raw, name)
+            expected = getattr(self.table, name)
+            if typecode == 'd':
+                column = [None if math.isnan(x) else x for x in column]
+                expected = [None if math.isnan(x) else x for x in expected]
+            self.assertEqual(list(column), list(expected), name)
+        self.assertEqual(raw.string_data, self.table.string_data)
+        self.assertEqual(raw.string_offsets, self.table.string_offsets)
+
+    def test_entity_types(self):
+        table = ClaimsTable()
+        claims = {'P31': self._content['claims']['P31']}
+        table.add({'type': 'lexeme', 'id': 'L5', 'claims': claims})
+        table.add({'type': 'mediainfo', 'id': 'M7', 'claims': claims})
+        self.assertEqual(list(table.subject), [5, 7])
+        self.assertEqual([table.ENTITY_TYPES[code]
+                          for code in table.subject_type],
+                         ['lexeme', 'mediainfo'])
+        self.assertRaises(EntityTypeUnknownException, table.add,
+                          {'type': 'entityschema', 'id': 'E5',
+                           'claims': claims})
+
+    def test_invalid(self):
+        content = json.loads(json.dumps(self._content))
+        # a value snak without datavalue after valid claims
+        claim = content['claims']['P31'][0]
+        del claim['mainsnak']['datavalue']
+        content['claims'] = {'P18': self._content['claims']['P18'],
+                             'P31': [claim]}
+        self.assertRaises(KeyError, self.table.add, content)
+        length = len(self.table)
+        for name, typecode in ClaimsTable.COLUMNS:
+            self.assertEqual(len(getattr(self.table, name)), length, name)
+        self.assertEqual(len(self.table.string_offsets), length + 1)
+        self.assertEqual(self.table.string_offsets[-1],
+                         len(self.table.string_data))
+        self.table.add(self.item_page)
+        self.assertEqual(len(self.table), 2 * length)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy(self):
+        columns = self.table.toNumpy()
+        self.assertEqual(columns['subject'].dtype, numpy.int64)
+        self.assertEqual(len(columns['item']), len(self.table))
+        self.assertEqual(columns['string_offsets'][-1],
+                         len(columns['string_data']))
+        # the table can still grow
+        self.table.add(self.item_page)
+        self.assertEqual(len(columns['item']) * 2, len(self.table))
+
+
+if __name__ == '__main__':
+    unittest.main()
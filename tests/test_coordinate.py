@@ -33,12 +33,42 @@ class TestCoordinate(unittest.TestCase):
         self.assertEqual(self.coordinate.precision, 2.7777777777778e-06)
         coord = Coordinate(38.897669444444, -77.03655, dim=100)
         self.assertEqual(coord.precision, 0.0011542482624706185)
+        # the Earth radius for globes without a known radius
+        for globe in ('titan', 'unknown'):
+            coord = Coordinate(38.897669444444, -77.03655, dim=100,
+                               globe=globe)
+            self.assertEqual(coord.precision, 0.0011542482624706185)
+            self.assertEqual(coord, coord)
+            hash(coord)
+        self.assertEqual(Coordinate(0, 0, dim=1000, globe='moon').precision,
+                         Coordinate(0, 0, dim=1000 * 6378137 / 1737400.0)
+                         .precision)
 
     def test_entity(self):
         """Test entity property."""
         self.assertEqual(
             self.coordinate.entity, 'http://www.wikidata.org/entity/Q2')
 
+    def test_hash(self):
+        """Test hashing consistent with comparison."""
+        same = Coordinate.fromWikibase(self.params)
+        self.assertEqual(hash(same), hash(self.coordinate))
+        self.assertNotEqual(self.coordinate, Coordinate(38.9, -77.03655))
+        # the globe name and the globe entity are resolved to the same key
+        named = Coordinate(38.897669444444, -77.03655,
+                           precision=2.7777777777778e-06, globe='earth')
+        self.assertEqual(named, self.coordinate)
+        self.assertEqual(hash(named), hash(self.coordinate))
+        self.assertNotEqual(named, Coordinate(
+            38.897669444444, -77.03655, precision=2.7777777777778e-06,
+            globe='moon'))
+        self.assertEqual(Coordinate(1, 2, globe='moon').entity,
+                         'http://www.wikidata.org/entity/Q405')
+
+    def test_slots(self):
+        """Test that Coordinate has no instance dict."""
+        self.assertFalse(hasattr(self.coordinate, '__dict__'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+
+from pywikibase import Claim, Coordinate
+from pywikibase.exceptions import CoordinateGlobeUnknownException
+
+try:
+    import numpy
+    from pywikibase.coordinatearray import CoordinateArray
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestCoordinateArray(unittest.TestCase):
+
+    """Test CoordinateArray."""
+
+    def setUp(self):
+        self.values = [
+            {'latitude': 38.897669444444, 'longitude': -77.03655,
+             'altitude': None, 'precision': 2.7777777777778e-06,
+             'globe': 'http://www.wikidata.org/entity/Q2'},
+            {'value': {'latitude': 51.5, 'longitude': -0.1,
+                       'altitude': None, 'precision': None,
+                       'globe': 'http://www.wikidata.org/entity/Q2'},
+             'type': 'globecoordinate'},
+            {'latitude': 10.0, 'longitude': 20.0, 'altitude': None,
+             'precision': 0.1,
+             'globe': 'http://www.wikidata.org/entity/Q405'},
+        ]
+        self.coords = CoordinateArray.fromWikibase(self.values)
+
+    def test_from_wikibase(self):
+        """Test creation from JSON."""
+        self.assertEqual(len(self.coords), 3)
+        self.assertEqual(list(self.coords.globe), [0, 0, 1])
+        self.assertEqual(self.coords.globes[1],
+                         'http://www.wikidata.org/entity/Q405')
+        self.assertTrue(numpy.isnan(self.coords.precision[1]))
+        self.assertEqual(self.coords[0],
+                         Coordinate.fromWikibase(self.values[0]))
+
+    def test_precision(self):
+        """Test precision derived from dim."""
+        coord = Coordinate(38.897669444444, -77.03655, dim=100)
+        coords = CoordinateArray.fromCoordinates([coord, self.coords[0]])
+        self.assertAlmostEqual(coords.precision[0], coord.precision)
+        self.assertEqual(coords.precision[1], 2.7777777777778e-06)
+
+    def test_target_equals(self):
+        """Test comparison consistent with Claim.target_equals."""
+        for value in ('38.8977,-77.0366', '51.50005,-0.1', '10.05,20.05',
+                      '10.05,20.05,0.01', '51.6,-0.1,0.2'):
+            expected = []
+            for data in self.values:
+                claim = Claim('P625', datatype='globe-coordinate')
+                claim.setTarget(Coordinate.fromWikibase(
+                    data.get('value', data)))
+                expected.append(claim.target_equals(value))
+            self.assertEqual(list(self.coords.target_equals(value)),
+                             expected, value)
+
+    def test_distance(self):
+        """Test great-circle distance."""
+        distances = self.coords.distance(38.897669444444, -77.03655)
+        self.assertEqual(distances[0], 0)
+        # Washington to London, about 5900 km
+        self.assertAlmostEqual(distances[1] / 1000, 5910, delta=20)
+        self.assertEqual(list(self.coords.distance(self.coords)),
+                         [0, 0, 0])
+
+    def test_globes(self):
+        """Test globe names and radii of other globes."""
+        moon = Coordinate(0.0, 20.0, globe='moon', dim=1000)
+        coords = CoordinateArray.fromCoordinates([moon])
+        self.assertEqual(coords.globes[coords.globe[0]],
+                         'http://www.wikidata.org/entity/Q405')
+        self.assertAlmostEqual(coords.precision[0], moon.precision)
+        # a quarter of the moon's circumference
+        self.assertAlmostEqual(coords.distance(0.0, 110.0)[0] / 1000,
+                               2729, delta=1)
+        self.assertRaises(ValueError, self.coords.distance,
+                          CoordinateArray.fromWikibase(self.values[:1] * 3))
+        titan = CoordinateArray.fromWikibase([
+            {'latitude': 1.0, 'longitude': 2.0, 'precision': None,
+             'globe': 'http://www.wikidata.org/entity/Q2565'}])
+        self.assertRaises(CoordinateGlobeUnknownException, titan.distance,
+                          1.0, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
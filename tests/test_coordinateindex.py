@@ -0,0 +1,94 @@
+import unittest
+import random
+
+from pywikibase import Claim, Coordinate, ItemPage
+from pywikibase.coordinate import haversine
+from pywikibase.coordinateindex import CoordinateIndex
+
+
+class TestCoordinateIndex(unittest.TestCase):
+
+    """Test CoordinateIndex."""
+
+    def setUp(self):
+        rand = random.Random(42)
+        self.points = []
+        self.index = CoordinateIndex(cell_size=1)
+        for number in range(1, 2001):
+            lat = rand.uniform(-89, 89)
+            lon = rand.uniform(-180, 180)
+            self.points.append(self._add(number, lat, lon))
+
+    def _add(self, number, lat, lon, entity='http://www.wikidata.org/'
+                                             'entity/Q2'):
+        claim = Claim('P625', datatype='globe-coordinate')
+        claim.setTarget(Coordinate(lat, lon, entity=entity))
+        page = ItemPage('Q%d' % number)
+        page.claims = {'P625': [claim]}
+        self.index.addPage(page)
+        return lat, lon, 'Q%d' % number, claim
+
+    def _brute(self, lat, lon):
+        return sorted((haversine(lat, lon, p[0], p[1]), p[2])
+                      for p in self.points)
+
+    def test_within(self):
+        """Test radius queries against a linear scan."""
+        for lat, lon in ((0, 0), (52.5, 13.4), (-85, 179.9), (89, -20)):
+            radius = 800000
+            expected = [entity_id for distance, entity_id
+                        in self._brute(lat, lon) if distance <= radius]
+            found = [entity_id for entity_id, claim
+                     in self.index.within(lat, lon, radius)]
+            self.assertEqual(found, expected)
+
+    def test_nearest(self):
+        """Test k-nearest queries against a linear scan."""
+        for lat, lon in ((0, 0), (52.5, 13.4), (-88.5, 179.9), (60, -179)):
+            expected = [entity_id for distance, entity_id
+                        in self._brute(lat, lon)[:5]]
+            found = [entity_id for entity_id, claim
+                     in self.index.nearest(lat, lon, k=5)]
+            self.assertEqual(found, expected)
+
+    def test_bbox(self):
+        """Test bounding boxes, also across the antimeridian."""
+        for south, west, north, east in ((10, 20, 30, 40),
+                                         (-10, 170, 10, -170)):
+            expected = set()
+            for lat, lon, entity_id, claim in self.points:
+                inside_lon = (west <= lon <= east if west <= east
+                              else lon >= west or lon <= east)
+                if south <= lat <= north and inside_lon:
+                    expected.add(entity_id)
+            found = set(entity_id for entity_id, claim
+                        in self.index.bbox(south, west, north, east))
+            self.assertEqual(found, expected)
+
+    def test_duplicates(self):
+        """Test duplicate detection and globes."""
+        lat, lon, entity_id, claim = self.points[0]
+        dup = self._add(3000, lat + 0.000001, lon)
+        self._add(3001, lat, lon, 'http://www.wikidata.org/entity/Q405')
+        self.assertEqual(self.index.duplicates(),
+                         [((entity_id, claim), (dup[2], dup[3]))])
+        self.assertEqual(len(self.index), 2002)
+        self.assertEqual(
+            len(self.index.within(
+                lat, lon, 1, 'http://www.wikidata.org/entity/Q405')), 1)
+
+    def test_globe_names(self):
+        """Test coordinates with a globe name instead of an entity."""
+        index = CoordinateIndex()
+        claim = Claim('P625', datatype='globe-coordinate')
+        claim.setTarget(Coordinate(0.0, 0.0, globe='moon'))
+        index.add('Q1', claim)
+        moon = 'http://www.wikidata.org/entity/Q405'
+        self.assertEqual(index.within(0.0, 0.0, 1), [])
+        # one degree on the moon is about 30 km
+        self.assertEqual(index.within(0.0, 1.0, 31000, moon), [('Q1', claim)])
+        self.assertEqual(index.within(0.0, 1.0, 30000, moon), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
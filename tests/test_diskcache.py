@@ -0,0 +1,142 @@
+import unittest
+import json
+import marshal
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+
+from pywikibase import DiskEntityCache, ItemPage, WikibasePage
+from pywikibase.diskcache import load_revisions
+
+
+class TestDiskEntityCache(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd')) as f:
+            self._content = json.load(f)['entities']['Q7251']
+        self.item_page = WikibasePage.fromJSON(self._content)
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = DiskEntityCache(os.path.join(self.tmpdir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _item(self, number, lastrevid=1):
+        return {'type': 'item', 'id': 'Q%d' % number,
+                'lastrevid': lastrevid,
+                'labels': {'en': {'language': 'en', 'value': 'x' * 100}}}
+
+    def test_put_get(self):
+        self.assertIsNone(self.cache.get('Q7251'))
+        self.assertNotIn('Q7251', self.cache)
+        self.cache.put(self.item_page)
+        self.assertIn('Q7251', self.cache)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.revision('Q7251'), 247379361)
+        item = self.cache.get('Q7251')
+        self.assertIsInstance(item, ItemPage)
+        self.assertEqual(item.lastrevid, 247379361)
+        self.assertEqual(item.toJSON(), self.item_page.toJSON())
+        self.assertIsNotNone(self.cache.get('Q7251', 247379361))
+        self.assertIsNone(self.cache.get('Q7251', 247379362))
+        self.assertEqual(self.cache.stats(),
+                         {'hits': 2, 'misses': 2, 'stale': 1,
+                          'evictions': 0})
+        # another instance sees the same files
+        other = DiskEntityCache(self.cache.directory)
+        self.assertEqual(other.get('Q7251').getID(), 'Q7251')
+        self.cache.remove('Q7251')
+        self.cache.remove('Q7251')
+        self.assertIsNone(other.get('Q7251'))
+        self.assertEqual(os.listdir(os.path.join(self.cache.directory,
+                                                 '51')), [])
+
+    def test_corrupt(self):
+        self.cache.put(self.item_page)
+        with open(self.cache._path('Q7251'), 'wb') as f:
+            f.write(b'WBDC\x01')
+        self.assertIsNone(self.cache.revision('Q7251'))
+        self.assertIsNone(self.cache.get('Q7251'))
+        self.assertNotIn('Q7251', self.cache)
+        # damaged compressed or marshal data
+        self.cache.put(WikibasePage.fromJSON(self._item(1)))
+        for payload in (b'WBE\x01\x01garbage', b'WBE\x01\x00',
+                        b'WBE\x01\x01' + zlib.compress(b'\xe9'),
+                        b'WBE\x01\x00' + marshal.dumps(5)):
+            with open(self.cache._path('Q1'), 'wb') as f:
+                f.write(struct.pack('<4sBxxxQ', b'WBDC', 1, 0) + payload)
+            self.assertIsNone(self.cache.get('Q1'))
+            self.assertNotIn('Q1', self.cache)
+
+    def test_invalid_id(self):
+        for entity_id in ('Q', 'Q01', 'X1', '../Q1', 'Q1/../../x', 'Q1\n',
+                          'L5-F1'):
+            self.assertRaises(ValueError, self.cache.get, entity_id)
+            self.assertRaises(ValueError, self.cache.remove, entity_id)
+        page = WikibasePage.fromJSON(self._item(1))
+        page.id = '../Q1'
+        self.assertRaises(ValueError, self.cache.put, page)
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+    def test_outdated(self):
+        for number in range(1, 4):
+            self.cache.put(WikibasePage.fromJSON(self._item(number, 10)))
+        path = os.path.join(self.tmpdir, 'revisions.txt')
+        with open(path, 'w') as f:
+            f.write('# id revision\nQ1 10\nQ2\t11\n\nQ4 10\n')
+        revisions = load_revisions(path)
+        self.assertEqual(revisions, {'Q1': 10, 'Q2': 11, 'Q4': 10})
+        self.assertTrue(self.cache.is_current('Q1', 10))
+        self.assertFalse(self.cache.is_current('Q2', 11))
+        self.assertEqual(self.cache.outdated([('Q1', 10), ('Q2', 11),
+                                              ('Q4', 10)]), ['Q2', 'Q4'])
+
+        fetched = []
+
+        def fetch(ids):
+            fetched.extend(ids)
+            return [json.dumps(self._item(2, 11)), self._item(4, 10)]
+        pages = self.cache.refresh(revisions, fetch)
+        self.assertEqual(sorted(fetched), ['Q2', 'Q4'])
+        self.assertEqual(sorted(pages), ['Q1', 'Q2', 'Q4'])
+        self.assertEqual(pages['Q2'].lastrevid, 11)
+        self.assertEqual(self.cache.outdated(revisions), [])
+        fetched = []
+        self.cache.refresh(revisions, fetch)
+        self.assertEqual(fetched, [])
+
+    def test_evict(self):
+        self.cache.put(WikibasePage.fromJSON(self._item(1)))
+        size = os.path.getsize(self.cache._path('Q1'))
+        # some slack, as the sizes differ by a few bytes
+        cache = DiskEntityCache(self.cache.directory, max_bytes=3 * size + 8)
+        for number in range(2, 5):
+            cache.put(WikibasePage.fromJSON(self._item(number)))
+            os.utime(cache._path('Q%d' % number), (number, number))
+        os.utime(cache._path('Q1'), (5, 5))
+        cache.put(WikibasePage.fromJSON(self._item(5)))
+        self.assertEqual(cache.stats()['evictions'], 2)
+        self.assertNotIn('Q2', cache)
+        self.assertNotIn('Q3', cache)
+        self.assertIn('Q1', cache)
+        # replacing an entity does not grow the size
+        for _ in range(3):
+            cache.put(WikibasePage.fromJSON(self._item(5)))
+        self.assertEqual(cache._bytes, cache._scan_size())
+        self.assertEqual(cache.stats()['evictions'], 2)
+        # a full cache is evicted to 90% of max_bytes, leaving room
+        cache.put(WikibasePage.fromJSON(self._item(6)))
+        self.assertEqual(cache.stats()['evictions'], 4)
+        self.assertEqual(len(cache), 2)
+        cache.put(WikibasePage.fromJSON(self._item(7)))
+        self.assertEqual(cache.stats()['evictions'], 4)
+        self.assertEqual(cache._bytes, cache._scan_size())
+        cache.evict(0)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
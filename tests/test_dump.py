@@ -0,0 +1,71 @@
+import unittest
+import bz2
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from pywikibase import DumpReader, ItemPage, PropertyPage, WikibasePage
+from pywikibase.exceptions import EntityTypeUnknownException
+
+
+class TestDumpReader(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd')) as f:
+            self._content = json.load(f)['entities']['Q7251']
+        prop = {'type': 'property', 'id': 'P31', 'datatype': 'wikibase-item',
+                'labels': {'en': {'language': 'en', 'value': 'instance of'}}}
+        lines = [json.dumps(self._content), json.dumps(prop)]
+        self.dump = ('[\n' + ',\n'.join(lines) + '\n]\n').encode('utf-8')
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, opener):
+        path = os.path.join(self.tmpdir, name)
+        with opener(path, 'wb') as f:
+            f.write(self.dump)
+        return path
+
+    def _check(self, path):
+        pages = list(DumpReader(path))
+        self.assertEqual(len(pages), 2)
+        self.assertIsInstance(pages[0], ItemPage)
+        self.assertEqual(pages[0].getID(), 'Q7251')
+        self.assertEqual(len(pages[0].claims), 56)
+        self.assertEqual(len(pages[0].sitelinks), 134)
+        self.assertIsInstance(pages[1], PropertyPage)
+        self.assertEqual(pages[1].type, 'wikibase-item')
+        self.assertEqual(pages[1].labels['en'], 'instance of')
+
+    def test_plain(self):
+        self._check(self._write('dump.json', open))
+
+    def test_gzip(self):
+        self._check(self._write('dump.json.gz', gzip.open))
+
+    def test_bz2(self):
+        self._check(self._write('dump.json.bz2', bz2.BZ2File))
+
+    def test_lines(self):
+        path = self._write('dump.json', open)
+        lines = list(DumpReader(path).lines())
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0].decode('utf-8')), self._content)
+
+    def test_kwargs(self):
+        path = self._write('dump.json', open)
+        page = next(iter(DumpReader(path, lazy=True)))
+        self.assertFalse(page.claims.isMaterialized('P31'))
+
+    def test_unknown_type(self):
+        self.assertRaises(EntityTypeUnknownException, WikibasePage.fromJSON,
+                          {'type': 'lexeme', 'id': 'L1'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import bz2
+import gzip
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+from pywikibase import DumpIndex, ItemPage, PropertyPage
+
+
+def _gzip(data):
+    """Return data as one gzip member; gzip.compress needs Python 3.2."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+        f.write(data)
+    return buffer.getvalue()
+
+
+class TestDumpIndex(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd')) as f:
+            self._content = json.load(f)['entities']['Q7251']
+        prop = {'type': 'property', 'id': 'P31', 'datatype': 'wikibase-item',
+                'labels': {'en': {'language': 'en', 'value': 'instance of'}}}
+        # the id of the entity after a nested one
+        snak = {'snaktype': 'value', 'property': 'P31',
+                'datatype': 'wikibase-item',
+                'datavalue': {'type': 'wikibase-entityid',
+                              'value': {'entity-type': 'item',
+                                        'numeric-id': 5, 'id': 'Q5'}}}
+        nested = {'claims': {'P31': [{'mainsnak': snak, 'rank': 'normal',
+                                      'type': 'statement'}]},
+                  'type': 'item', 'id': 'Q9'}
+        self.lines = [json.dumps(item) for item in
+                      [{'type': 'item', 'id': 'Q%d' % number}
+                       for number in (42, 3, 100)] +
+                      [self._content, prop, nested,
+                       {'type': 'item', 'id': 'Q3', 'labels': {}}]]
+        self.dump = ('[\n' + ',\n'.join(self.lines) + '\n]\n').encode('utf-8')
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def _check(self, index):
+        self.assertEqual(len(index), 6)
+        self.assertEqual(list(index.ids()),
+                         ['Q3', 'Q9', 'P31', 'Q42', 'Q100', 'Q7251'])
+        self.assertIn('Q42', index)
+        self.assertNotIn('Q43', index)
+        self.assertNotIn('X1', index)
+        self.assertIsNone(index.locate('Q1'))
+        self.assertRaises(KeyError, index.get, 'Q1')
+        self.assertRaises(KeyError, index.getJSON, '')
+        # the first occurrence
+        self.assertEqual(json.loads(index.getJSON('Q3').decode('utf-8')),
+                         {'type': 'item', 'id': 'Q3'})
+        self.assertEqual(index.getJSON('Q9'),
+                         self.lines[5].encode('utf-8'))
+        item = index.get('Q7251')
+        self.assertIsInstance(item, ItemPage)
+        self.assertEqual(len(item.claims), 56)
+        prop = index['P31']
+        self.assertIsInstance(prop, PropertyPage)
+        self.assertEqual(prop.labels['en'], 'instance of')
+        self.assertFalse(index.get('Q7251', lazy=True).claims
+                         .isMaterialized('P31'))
+
+    def test_plain(self):
+        path = self._path('dump.json')
+        with open(path, 'wb') as f:
+            f.write(self.dump)
+        with DumpIndex.build(path) as index:
+            self.assertFalse(index.compressed)
+            self._check(index)
+        self.assertTrue(os.path.exists(path + '.idx'))
+        with DumpIndex(path) as index:
+            self._check(index)
+
+    def test_runs(self):
+        path = self._path('dump.json')
+        with open(path, 'wb') as f:
+            f.write(self.dump)
+        index = DumpIndex.build(path, self._path('index'), run_size=2)
+        self._check(index)
+        index.close()
+        self.assertEqual(sorted(os.listdir(self.tmpdir)),
+                         ['dump.json', 'index'])
+
+    def test_gzip(self):
+        path = self._path('dump.json.gz')
+        # members of 1000 bytes, so that lines span members
+        with open(path, 'wb') as f:
+            for start in range(0, len(self.dump), 1000):
+                f.write(_gzip(self.dump[start:start + 1000]))
+        with DumpIndex.build(path) as index:
+            self.assertTrue(index.compressed)
+            self._check(index)
+
+    def test_gzip_single_member(self):
+        path = self._path('dump.json.gz')
+        # lines far into the member, beyond a decompressed chunk
+        padding = ''.join('{"type": "item", "id": "Q%d"},\n' % number
+                          for number in range(10000, 19000))
+        dump = self.dump.replace(b'[\n', b'[\n' + padding.encode('ascii'))
+        with open(path, 'wb') as f:
+            f.write(_gzip(dump))
+        with DumpIndex.build(path) as index:
+            self.assertEqual(len(index), 9006)
+            block, offset, length = index.locate('Q7251')
+            self.assertEqual(block, 0)
+            self.assertGreater(offset, 1 << 16)
+            self.assertEqual(len(index.get('Q7251').claims), 56)
+            self.assertEqual(json.loads(index.getJSON('Q18999').decode()),
+                             {'type': 'item', 'id': 'Q18999'})
+
+    def test_errors(self):
+        path = self._path('dump.json.bz2')
+        with bz2.BZ2File(path, 'wb') as f:
+            f.write(self.dump)
+        self.assertRaises(ValueError, DumpIndex.build, path)
+        with open(path + '.idx', 'wb') as f:
+            f.write(b'WBIX')
+        self.assertRaises(ValueError, DumpIndex, path)
+        # an index of the previous version with 32 bit offsets
+        with open(path + '.idx', 'wb') as f:
+            f.write(struct.pack('<4sBBxxQ', b'WBIX', 1, 0, 1))
+            f.write(struct.pack('<QQII', 12, 0, 0, 10))
+        self.assertRaises(ValueError, DumpIndex, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
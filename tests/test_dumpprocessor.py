@@ -0,0 +1,48 @@
+import unittest
+import json
+import operator
+import os
+
+try:
+    from pywikibase.dumpprocessor import DumpProcessor
+except ImportError:  # concurrent.futures is missing
+    DumpProcessor = None
+
+
+@unittest.skipIf(DumpProcessor is None, 'concurrent.futures is not available')
+class TestDumpProcessor(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd')) as f:
+            content = json.load(f)['entities']['Q7251']
+        self.lines = []
+        for i in range(1, 40):
+            content['id'] = content['title'] = 'Q%d' % i
+            self.lines.append(json.dumps(content).encode('utf-8'))
+        self.ids = ['Q%d' % i for i in range(1, 40)]
+
+    def test_ordered(self):
+        processor = DumpProcessor(operator.methodcaller('getID'),
+                                  processes=2, chunksize=3, max_pending=2)
+        self.assertEqual(list(processor.process(self.lines)), self.ids)
+
+    def test_unordered(self):
+        processor = DumpProcessor(operator.methodcaller('getID'),
+                                  processes=2, chunksize=5, ordered=False)
+        self.assertEqual(sorted(processor.process(self.lines)),
+                         sorted(self.ids))
+
+    def test_kwargs(self):
+        processor = DumpProcessor(operator.attrgetter('claims'),
+                                  processes=1, lazy=True)
+        claims = next(processor.process(self.lines[:1]))
+        self.assertFalse(claims.isMaterialized('P31'))
+        self.assertEqual(claims['P31'][0].target.getID(), 'Q5')
+
+    def test_chunksize(self):
+        self.assertRaises(ValueError, DumpProcessor, len, chunksize=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import json
+import os
+
+from pywikibase import Claim, EditBatcher, ItemPage
+
+
+class TestEditBatcher(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd')) as f:
+            self._content = json.load(f)['entities']['Q7251']
+        self.item = ItemPage()
+        self.item.get(content=self._content)
+
+    def _claim(self, target):
+        claim = Claim('P17', datatype='wikibase-item')
+        claim.setTarget(ItemPage(target))
+        return claim.toJSON()
+
+    def test_merge(self):
+        batcher = EditBatcher()
+        old = self.item.claims['P31'][0].toJSON()
+        batcher.add('Q7251', {
+            'labels': {'en': {'language': 'en', 'value': 'Turing'}},
+            'claims': {'P31': [dict(old, rank='preferred')],
+                       'P17': [self._claim('Q91')]}}, baserevid=10)
+        batcher.add('Q1', {
+            'labels': {'en': {'language': 'en', 'value': 'Universe'}}})
+        changes = {
+            'labels': {'en': {'language': 'en', 'value': 'Alan Turing'}},
+            'descriptions': {'de': {'language': 'de', 'value': 'Mensch'}},
+            'claims': {'P31': [{'id': old['id'], 'remove': ''}],
+                       'P17': [self._claim('Q91'), self._claim('Q92')]}}
+        batcher.add('Q7251', changes, baserevid=11)
+        self.assertEqual(len(batcher), 2)
+        self.assertIn('Q7251', batcher)
+        batcher.flush()
+        self.assertEqual(len(batcher), 0)
+        payloads = list(batcher.payloads())
+        self.assertEqual([payload['id'] for payload in payloads],
+                         ['Q7251', 'Q1'])
+        self.assertEqual(payloads[0]['baserevid'], 10)
+        self.assertNotIn('baserevid', payloads[1])
+        data = json.loads(payloads[0]['data'])
+        self.assertEqual(data['labels']['en']['value'], 'Alan Turing')
+        self.assertEqual(data['descriptions']['de']['value'], 'Mensch')
+        self.assertEqual(data['claims']['P31'],
+                         [{'id': old['id'], 'remove': ''}])
+        self.assertEqual(data['claims']['P17'],
+                         [self._claim('Q91'), self._claim('Q92')])
+        self.assertEqual(list(batcher.payloads()), [])
+
+    def test_pages(self):
+        batcher = EditBatcher()
+        old = self.item.toJSON()
+        self.item.startJournal()
+        self.item.editLabels({'en': 'Turing'})
+        self.item.removeClaims(self.item.claims['P31'])
+        batcher.addPage(self.item)
+        self.item.setSitelink('enwiki', 'Turing')
+        batcher.addPage(self.item)
+        other = ItemPage()
+        other.get(content=self._content)
+        other.editDescriptions({'fr': 'Turing'})
+        batcher.addPage(other, diffto=old)
+        unchanged = ItemPage()
+        unchanged.get(content={'type': 'item', 'id': 'Q1'})
+        unchanged.startJournal()
+        batcher.addPage(unchanged)
+        self.assertEqual(len(batcher), 1)
+        batcher.flush('Q7251')
+        payload = batcher.ready.popleft()
+        self.assertEqual(payload['baserevid'], 247379361)
+        data = json.loads(payload['data'])
+        self.assertEqual(sorted(data), ['claims', 'descriptions', 'labels',
+                                        'sitelinks'])
+        self.assertEqual(data['claims'], self.item.changesToJSON()['claims'])
+
+    def test_split(self):
+        batcher = EditBatcher(max_bytes=2000)
+        data = {'labels': {'en': {'language': 'en', 'value': 'Turing'}},
+                'claims': {'P17': [self._claim('Q%d' % number)
+                                   for number in range(1, 30)]}}
+        batcher.add('Q7251', data, baserevid=10)
+        batcher.flush()
+        payloads = list(batcher.payloads())
+        self.assertGreater(len(payloads), 1)
+        self.assertEqual(payloads[0]['baserevid'], 10)
+        claims = []
+        for payload in payloads:
+            self.assertLessEqual(len(payload['data']), 2000)
+            self.assertNotIn('baserevid', payload if claims else {})
+            part = json.loads(payload['data'])
+            claims += part['claims']['P17']
+        self.assertEqual(json.loads(payloads[0]['data'])['labels'],
+                         data['labels'])
+        self.assertEqual(claims, data['claims']['P17'])
+
+        batcher = EditBatcher(max_bytes=100)
+        batcher.add('Q7251', data)
+        self.assertRaises(ValueError, batcher.flush)
+        self.assertIn('Q7251', batcher)
+
+    def test_split_utf8(self):
+        # three bytes per character in UTF-8
+        labels = dict((language, {'language': language,
+                                  'value': '\u30c1\u30e5\u30fc' * 20})
+                      for language in ('ja', 'zh', 'ko', 'en', 'de', 'fr'))
+        batcher = EditBatcher(max_bytes=500)
+        batcher.add('Q7251', {'labels': labels})
+        batcher.flush()
+        payloads = list(batcher.payloads())
+        self.assertGreater(len(payloads), 1)
+        merged = {}
+        for payload in payloads:
+            self.assertLessEqual(len(payload['data'].encode('utf-8')), 500)
+            merged.update(json.loads(payload['data'])['labels'])
+        self.assertEqual(merged, labels)
+
+    def test_max_pending(self):
+        batcher = EditBatcher(max_pending=2)
+        for number in range(1, 5):
+            batcher.add('Q%d' % number, {
+                'labels': {'en': {'language': 'en', 'value': 'label'}}})
+        batcher.add('Q3', {
+            'labels': {'de': {'language': 'de', 'value': 'Name'}}})
+        self.assertEqual([payload['id'] for payload in batcher.ready],
+                         ['Q1', 'Q2'])
+        self.assertEqual(len(batcher), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import sys
+import unittest
+
+if sys.version_info < (3, 6):
+    raise unittest.SkipTest('EditScheduler requires Python 3.6 or later')
+
+import time
+
+from pywikibase import EditBatcher
+from pywikibase.editscheduler import EditScheduler, TokenBucket
+
+# FakeAPI uses async def, a syntax error before Python 3.5
+from editscheduler_fakeapi import FakeAPI
+
+
+class TestEditScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeAPI()
+
+    def _scheduler(self, **kwargs):
+        kwargs.setdefault('rate', None)
+        return EditScheduler('abc', concurrency=3, transport=self.api,
+                             bot=1, **kwargs)
+
+    def _data(self, number):
+        return {'labels': {'en': {'language': 'en', 'value': str(number)}}}
+
+    def test_ordering(self):
+        scheduler = self._scheduler()
+        for number in range(30):
+            scheduler.add('Q%d' % (number % 4), self._data(number))
+        self.assertEqual(len(scheduler), 30)
+        scheduler.runSync()
+        self.assertEqual(len(scheduler), 0)
+        self.assertEqual(len(self.api.edits), 30)
+        self.assertLessEqual(self.api.max_running, 3)
+        for entity in range(4):
+            values = [int(data['labels']['en']['value'])
+                      for entity_id, data in self.api.edits
+                      if entity_id == 'Q%d' % entity]
+            self.assertEqual(values, list(range(entity, 30, 4)))
+        stats = scheduler.stats()
+        self.assertEqual(stats['edits'], 30)
+        self.assertEqual(stats['failed'], 0)
+        self.assertEqual(stats['requests'], 30)
+        self.assertGreater(stats['throughput'], 0)
+        self.assertLessEqual(stats['latency_median'], stats['latency_max'])
+
+    def test_retries(self):
+        results = []
+        scheduler = self._scheduler(
+            callback=lambda params, result: results.append(params))
+        self.api.failures = [
+            (200, {'error': {'code': 'maxlag', 'info': 'lagged'}},
+             {'retry-after': '0'}),
+            (429, {}, {'retry-after': '0'}),
+            (200, {'error': {'code': 'ratelimited', 'info': 'slow'}},
+             {'retry-after': '0'}),
+        ]
+        scheduler.add('Q1', self._data(1), baserevid=5, summary='test')
+        scheduler.runSync()
+        self.assertEqual(scheduler.retries, 3)
+        self.assertEqual(scheduler.requests, 4)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['baserevid'], 5)
+        self.assertEqual(results[0]['summary'], 'test')
+        self.assertEqual(results[0]['token'], 'abc')
+        self.assertEqual(results[0]['bot'], 1)
+        self.assertEqual(results[0]['maxlag'], 5)
+
+    def test_failures(self):
+        scheduler = self._scheduler(max_retries=1)
+        self.api.entity_failures['Q1'] = [
+            (200, {'error': {'code': 'badtoken', 'info': 'Invalid'}}, {})]
+        scheduler.add('Q1', self._data(1))
+        scheduler.add('Q1', self._data(2))
+        scheduler.add('Q2', self._data(3))
+        scheduler.runSync()
+        self.assertEqual([entity_id for entity_id, data in self.api.edits],
+                         ['Q2'])
+        self.assertEqual([error.code for params, error in scheduler.failed],
+                         ['badtoken', 'skipped'])
+
+        # the edit might have been made, so it is not retried
+        self.api.failures = [OSError('reset')]
+        scheduler.add('Q3', self._data(4))
+        scheduler.runSync()
+        self.assertIsInstance(scheduler.failed[-1][1], OSError)
+        self.assertEqual(scheduler.stats()['failed'], 3)
+        self.assertEqual(scheduler.retries, 0)
+
+        # 503 is only retried with Retry-After
+        self.api.failures = [(503, {}, {'retry-after': '0'}),
+                             (503, {}, {})]
+        scheduler.add('Q4', self._data(5))
+        scheduler.runSync()
+        self.assertEqual(scheduler.failed[-1][1].code, 'http-503')
+        self.assertEqual(scheduler.retries, 1)
+        self.assertEqual(self.api.edits[-1][0], 'Q2')
+
+    def test_rate(self):
+        scheduler = self._scheduler(rate=100)
+        batcher = EditBatcher()
+        for number in range(11):
+            batcher.add('Q%d' % number, self._data(number), baserevid=1)
+        batcher.flush()
+        scheduler.addPayloads(batcher.payloads())
+        start = time.time()
+        scheduler.runSync()
+        self.assertGreaterEqual(time.time() - start, 0.09)
+        self.assertEqual(len(self.api.edits), 11)
+
+    def test_bucket(self):
+        bucket = TokenBucket(10, burst=2)
+        bucket.throttle()
+        self.assertEqual(bucket.rate, 5)
+        for count in range(10):
+            bucket.throttle()
+        self.assertEqual(bucket.rate, 1)
+        bucket.recover()
+        self.assertEqual(bucket.rate, 2)
+        for count in range(20):
+            bucket.recover()
+        self.assertEqual(bucket.rate, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import json
+import os
+
+from pywikibase import EntityCache, ItemPage, PropertyPage
+
+
+class TestEntityCache(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd')) as f:
+            self._content = json.load(f)['entities']['Q7251']
+        self._text = json.dumps(self._content)
+
+    def _item(self, number, lastrevid=1):
+        return json.dumps({'type': 'item', 'id': 'Q%d' % number,
+                           'lastrevid': lastrevid})
+
+    def test_hit(self):
+        cache = EntityCache()
+        item = cache.get(self._text)
+        self.assertIsInstance(item, ItemPage)
+        self.assertEqual(item.lastrevid, 247379361)
+        self.assertIs(cache.get(self._text.encode('utf-8')), item)
+        self.assertIs(cache.get(self._content), item)
+        self.assertIs(cache.lookup('Q7251'), item)
+        self.assertIs(cache.lookup('Q7251', 247379361), item)
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 4)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], len(self._text))
+
+    def test_stale(self):
+        cache = EntityCache()
+        item = cache.get(self._item(1, 10))
+        self.assertIsNone(cache.lookup('Q1', 11))
+        self.assertNotIn('Q1', cache)
+        self.assertEqual(cache.size, 0)
+        new = cache.get(self._item(1, 11))
+        self.assertIsNot(new, item)
+        self.assertEqual(new.lastrevid, 11)
+        self.assertIsNot(cache.get(self._item(1, 12)), new)
+        stats = cache.stats()
+        self.assertEqual(stats['stale'], 2)
+        self.assertEqual(stats['misses'], 4)
+        self.assertEqual(stats['hits'], 0)
+
+    def test_without_revision(self):
+        cache = EntityCache()
+        prop = {'type': 'property', 'id': 'P31', 'datatype': 'wikibase-item'}
+        page = cache.get(prop)
+        self.assertIsInstance(page, PropertyPage)
+        self.assertIsNot(cache.get(prop), page)
+        self.assertIsNot(cache.get(json.dumps(prop)), page)
+        self.assertIsInstance(cache.lookup('P31'), PropertyPage)
+        self.assertEqual(cache.stats()['misses'], 3)
+
+    def test_nested_id(self):
+        cache = EntityCache()
+        text = ('{"claims": {"P31": [{"mainsnak": {"snaktype": "value", '
+                '"property": "P31", "datatype": "wikibase-item", '
+                '"datavalue": {"type": "wikibase-entityid", "value": '
+                '{"entity-type": "item", "numeric-id": 5, "id": "Q5"}}}, '
+                '"type": "statement"}]}, "lastrevid": 3, "type": "item", '
+                '"id": "Q9"}')
+        self.assertEqual(cache.get(text).getID(), 'Q9')
+        self.assertIsNone(cache.lookup('Q5'))
+        self.assertIs(cache.get(text), cache.lookup('Q9'))
+
+    def test_decoded_size(self):
+        cache = EntityCache()
+        cache.get(self._content)
+        # estimated within a factor of two of the JSON length
+        self.assertLess(abs(cache.size - len(self._text)), len(self._text) / 2)
+        cache.clear()
+        cache.get(self._content, size=1234)
+        self.assertEqual(cache.size, 1234)
+        # str in UTF-8 bytes
+        cache.clear()
+        text = json.dumps(self._content, ensure_ascii=False)
+        cache.get(text)
+        self.assertGreater(len(text.encode('utf-8')), len(text))
+        self.assertEqual(cache.size, len(text.encode('utf-8')))
+
+    def test_entry_budget(self):
+        cache = EntityCache(max_entries=2)
+        cache.get(self._item(1))
+        cache.get(self._item(2))
+        cache.lookup('Q1')
+        cache.get(self._item(3))
+        self.assertEqual(len(cache), 2)
+        self.assertIn('Q1', cache)
+        self.assertNotIn('Q2', cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_byte_budget(self):
+        size = len(self._item(1))
+        cache = EntityCache(max_bytes=3 * size)
+        for number in range(1, 6):
+            cache.get(self._item(number))
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.size, 3 * size)
+        cache.get(self._text)
+        self.assertEqual(len(cache), 0)
+        cache.invalidate('Q7251')
+        cache.get(self._item(1))
+        cache.clear()
+        self.assertEqual((len(cache), cache.size), (0, 0))
+        self.assertEqual(cache.stats()['evictions'], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
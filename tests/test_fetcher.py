@@ -0,0 +1,135 @@
+import sys
+import unittest
+
+if sys.version_info < (3, 6):
+    raise unittest.SkipTest('EntityFetcher requires Python 3.6 or later')
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+from pywikibase import ItemPage
+from pywikibase.exceptions import APIError
+from pywikibase.fetcher import EntityFetcher
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, content):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.content = content
+        self.lock = threading.Lock()
+        self.batches = []
+        self.ports = set()
+        # responses returned before the normal ones
+        self.failures = []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, data, headers=()):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        params = parse_qs(urlsplit(self.path).query)
+        server = self.server
+        with server.lock:
+            server.ports.add(self.client_address[1])
+            failure = server.failures.pop(0) if server.failures else None
+            if failure is None:
+                ids = params['ids'][0].split('|')
+                server.batches.append(ids)
+        if failure is not None:
+            self._send(*failure)
+            return
+        assert params['action'] == ['wbgetentities']
+        assert params['maxlag'] == ['5']
+        entities = {}
+        for entity_id in ids:
+            if entity_id == 'Q7251':
+                entities[entity_id] = server.content
+            elif entity_id.startswith('Q0'):
+                entities[entity_id] = {'id': entity_id, 'missing': ''}
+            else:
+                entities[entity_id] = {'type': 'item', 'id': entity_id,
+                                       'lastrevid': 1}
+        self._send(200, {'entities': entities, 'success': 1})
+
+
+class TestEntityFetcher(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd')) as f:
+            content = json.load(f)['entities']['Q7251']
+        self.server = StubServer(content)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.fetcher = EntityFetcher(
+            'http://127.0.0.1:%d/w/api.php' % self.server.server_port,
+            concurrency=3)
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_fetch(self):
+        ids = ['Q%d' % number for number in range(1, 501)] + ['Q7251',
+                                                               'Q01']
+        pages = self.fetcher.fetchAll(ids)
+        self.assertEqual(sorted(page.getID() for page in pages),
+                         sorted(ids[:-1]))
+        self.assertTrue(all(isinstance(page, ItemPage) for page in pages))
+        item = [page for page in pages if page.getID() == 'Q7251'][0]
+        self.assertEqual(len(item.claims), 56)
+        self.assertEqual(self.fetcher.missing, ['Q01'])
+        self.assertEqual(len(self.server.batches), 11)
+        self.assertTrue(all(len(batch) <= 50
+                            for batch in self.server.batches))
+        # keep-alive connections
+        self.assertLessEqual(len(self.server.ports), 3)
+        self.assertEqual(self.fetcher.requests, 11)
+
+    def test_backoff(self):
+        self.server.failures = [
+            (200, {'error': {'code': 'maxlag', 'info': 'lagged'}},
+             [('Retry-After', '0')]),
+            (503, {}, [('Retry-After', '0')]),
+        ]
+        pages = self.fetcher.fetchAll(['Q1', 'Q2'])
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(self.fetcher.retries, 2)
+        self.assertEqual(self.fetcher.requests, 3)
+
+    def test_errors(self):
+        self.server.failures = [
+            (200, {'error': {'code': 'no-such-entity', 'info': 'Q-1'}}, [])]
+        with self.assertRaises(APIError) as context:
+            self.fetcher.fetchAll(['Q1'])
+        self.assertEqual(context.exception.code, 'no-such-entity')
+        self.fetcher.max_retries = 1
+        self.server.failures = [(503, {}, [('Retry-After', '0')])] * 2
+        self.assertRaises(APIError, self.fetcher.fetchAll, ['Q1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
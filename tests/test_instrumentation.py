@@ -0,0 +1,78 @@
+import unittest
+import json
+import os
+
+from pywikibase import Claim, ItemPage, instrumentation, jsonbackend
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd')) as f:
+            self._text = json.dumps(json.load(f)['entities']['Q7251'])
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled(self):
+        from_json = vars(Claim)['fromJSON']
+        converters = dict(Claim.TARGET_CONVERTER)
+        loads = jsonbackend.loads
+        instrumentation.enable()
+        self.assertTrue(instrumentation.is_enabled())
+        self.assertIsNot(vars(Claim)['fromJSON'], from_json)
+        instrumentation.disable()
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertIs(vars(Claim)['fromJSON'], from_json)
+        self.assertEqual(Claim.TARGET_CONVERTER, converters)
+        self.assertIs(jsonbackend.loads, loads)
+        item = ItemPage()
+        item.get(content=self._text)
+        self.assertEqual(instrumentation.snapshot(), {})
+
+    def test_counters(self):
+        instrumentation.enable()
+        item = ItemPage()
+        item.get(content=self._text)
+        stats = instrumentation.snapshot()
+        self.assertEqual(stats['json.loads']['count'], 1)
+        references = sum(len(claim.sources) for claims
+                         in item.claims.values() for claim in claims)
+        self.assertEqual(stats['Claim.referenceFromJSON']['count'],
+                         references)
+        self.assertGreater(stats['Claim.fromJSON']['count'], 56)
+        self.assertGreater(stats['converter.wikibase-item']['count'], 0)
+        self.assertGreater(stats['converter.time']['count'], 0)
+        self.assertGreaterEqual(stats['Claim.fromJSON']['time'],
+                                stats['converter.time']['time'])
+
+        old = item.toJSON()
+        item.toJSON(diffto=old)
+        stats = instrumentation.snapshot(reset=True)
+        self.assertEqual(stats['WikibasePage.toJSON']['count'], 2)
+        self.assertEqual(stats['WikibasePage.toJSON.diff_claims']['count'],
+                         1)
+        self.assertGreater(stats['Claim.toJSON']['count'],
+                           stats['Claim.toJSON.uncached']['count'])
+        self.assertEqual(instrumentation.snapshot(), {})
+
+    def test_hook(self):
+        events = []
+
+        def hook(name, seconds):
+            events.append(name)
+        instrumentation.add_hook(hook)
+        try:
+            instrumentation.enable()
+            jsonbackend.loads('{}')
+        finally:
+            instrumentation.remove_hook(hook)
+        jsonbackend.loads('{}')
+        self.assertEqual(events, ['json.loads'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -45,12 +45,105 @@ class TestItemPage(unittest.TestCase):
         self.assertNotEqual(self.item_page.claims, old_claims)
         self.assertNotIn('P31', self.item_page.claims)
 
+    def test_remove_claims(self):
+        claims = self.item_page.claims['P106']
+        other = ItemPage()
+        other.get(content=self._content)
+        count = len(claims)
+        self.item_page.removeClaims(other.claims['P106'][:2] +
+                                    other.claims['P31'])
+        self.assertEqual(len(claims), count - 2)
+        self.assertEqual(claims, other.claims['P106'][2:])
+        self.assertNotIn('P31', self.item_page.claims)
+
+    def test_journal(self):
+        item = self.item_page
+        self.assertRaises(ValueError, item.changesToJSON)
+        old = item.toJSON()
+        item.startJournal()
+        self.assertEqual(item.changesToJSON(), {})
+
+        item.editLabels({'en': 'Turing', 'fr': ''})
+        item.editDescriptions({'de': 'Mathematiker'})
+        item.editAliases({'en': ['Turing']})
+        item.setSitelink('enwiki', 'Turing')
+        item.removeSitelink('fawiki')
+        item.claims['P106'][0].setRank('preferred')
+        item.claims['P106'][3].sources[0]['P143'][0].setTarget(
+            ItemPage('Q8447'))
+        item.removeClaims(item.claims['P31'])
+        claim = Claim('P17', datatype='wikibase-item')
+        claim.setTarget(ItemPage('Q91'))
+        item.addClaim(claim)
+        claim.setRank('deprecated')
+
+        data = item.changesToJSON()
+        self.assertEqual(data['labels'],
+                         {'en': {'language': 'en', 'value': 'Turing'},
+                          'fr': {'language': 'fr', 'value': ''}})
+        self.assertEqual(data['descriptions'], {
+            'de': {'language': 'de', 'value': 'Mathematiker'}})
+        self.assertEqual(data['aliases']['en'][0],
+                         {'language': 'en', 'value': 'Turing'})
+        self.assertEqual(len(data['aliases']['en']),
+                         len(old['aliases']['en']))
+        self.assertEqual(data['sitelinks'],
+                         {'enwiki': {'site': 'enwiki', 'title': 'Turing'},
+                          'fawiki': {'site': 'fawiki', 'title': ''}})
+        diff = item.toJSON(diffto=old)
+        self.assertEqual(sorted(data['claims']), sorted(diff['claims']))
+        for pid in data['claims']:
+            self.assertEqual(sorted(data['claims'][pid], key=repr),
+                             sorted(diff['claims'][pid], key=repr))
+        self.assertEqual(data['claims']['P31'][0]['remove'], '')
+
+        item.startJournal()
+        self.assertEqual(item.changesToJSON(), {})
+        item.stopJournal()
+        self.assertRaises(ValueError, item.changesToJSON)
+
     def test_badges(self):
         self.assertEqual(len(self.item_page.badges), 4)
         self.assertEqual(self.item_page.badges['enwiki'], ['Q17437798'])
         self.assertIn('enwiki', self.item_page.badges)
         self.assertNotIn('fawiki', self.item_page.badges)
 
+    def test_release_content(self):
+        for lazy in (False, True):
+            item = ItemPage()
+            item.get(content=self._content, lazy=lazy, keep_content=False)
+            self.assertFalse(hasattr(item, '_content'))
+            self.assertEqual(item.sitelinks, self.item_page.sitelinks)
+            self.assertEqual(item.badges, self.item_page.badges)
+            self.assertEqual(item.toJSON(), self.item_page.toJSON())
+            self.assertEqual(item.toJSON(diffto=self._content), {})
+            item.editLabels({'en': 'Turing'})
+            self.assertEqual(list(item.toJSON(diffto=self._content)),
+                             ['labels'])
+            self.assertRaises(ValueError, item.get)
+        self.assertIs(self.item_page._content, self._content)
+
+    def test_from_numeric_id(self):
+        item = ItemPage.fromNumericID(5)
+        self.assertIsInstance(item, ItemPage)
+        self.assertEqual(item.getID(), 'Q5')
+        self.assertIsNot(item, ItemPage.fromNumericID(5))
+        self.assertEqual(ItemPage.fromNumericID('5').getID(), 'Q5')
+        self.assertRaises(RuntimeError, ItemPage.fromNumericID, 0)
+
+    def test_interning(self):
+        ItemPage.setInterning()
+        try:
+            item = ItemPage.fromNumericID(5)
+            self.assertIs(item, ItemPage.fromNumericID(5))
+            page = ItemPage()
+            page.get(content=self._content)
+            self.assertIs(page.claims['P31'][0].target, item)
+        finally:
+            ItemPage.setInterning(False)
+        self.assertIsNot(item, ItemPage.fromNumericID(5))
+        self.assertEqual(ItemPage.fromNumericID('5').getID(), 'Q5')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8  -*-
+import unittest
+import json
+import os
+
+from pywikibase import ItemPage, WbTime, jsonbackend
+
+
+class TestJSONBackend(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.split(__file__)[0],
+                               'data', 'Q7251.wd'), 'rb') as f:
+            self._raw = f.read()
+        self._content = json.loads(self._raw.decode('utf-8'))
+        self._backend = jsonbackend.get_backend()
+
+    def tearDown(self):
+        jsonbackend.set_backend(self._backend)
+
+    def test_available(self):
+        available = jsonbackend.available()
+        self.assertEqual(available[-1], 'json')
+        self.assertEqual(jsonbackend.get_backend(), available[0])
+        self.assertRaises(ValueError, jsonbackend.set_backend, 'yaml')
+
+    def test_backends(self):
+        data = {'b': [1, 2.5, None, True], 'a': u'Alan Mathison Turing –',
+                'c': 'http://www.wikidata.org/entity/Q2'}
+        for name in jsonbackend.available():
+            self.assertEqual(jsonbackend.loads(self._raw, name),
+                             self._content)
+            self.assertEqual(jsonbackend.loads(self._raw.decode('utf-8'),
+                                               name), self._content)
+            self.assertEqual(jsonbackend.dumps(data, sort_keys=True,
+                                               backend=name),
+                             u'{"a":"Alan Mathison Turing –",'
+                             '"b":[1,2.5,null,true],'
+                             '"c":"http://www.wikidata.org/entity/Q2"}')
+            jsonbackend.set_backend(name)
+            self.assertEqual(jsonbackend.get_backend(), name)
+            self.assertEqual(jsonbackend.loads(self._raw), self._content)
+
+    def test_pretty(self):
+        time = WbTime(year=2010, precision=9)
+        self.assertEqual(str(time), json.dumps(
+            time.toWikibase(), indent=4, sort_keys=True,
+            separators=(',', ': ')))
+
+    def test_get_bytes(self):
+        content = json.dumps(self._content['entities']['Q7251'])
+        for name in jsonbackend.available():
+            item = ItemPage()
+            item.get(content=content.encode('utf-8'), json_backend=name)
+            self.assertEqual(item.getID(), 'Q7251')
+            self.assertEqual(len(item.claims), 56)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,6 +22,18 @@ class TestPropertyPage(unittest.TestCase):
         self.assertIsInstance(claim, Claim)
         self.assertEqual(claim.id, self.property_page.getID())
 
+    def test_release_content(self):
+        prop = PropertyPage('P31', 'wikibase-item')
+        prop.get(content={'type': 'property', 'id': 'P31',
+                          'labels': {'en': {'language': 'en',
+                                            'value': 'instance of'}}},
+                 keep_content=False)
+        self.assertFalse(hasattr(prop, '_content'))
+        self.assertEqual(prop.labels, {'en': 'instance of'})
+        # already loaded
+        prop.get()
+        self.assertEqual(prop.labels, {'en': 'instance of'})
+
 
 if __name__ == '__main__':
     unittest.main()
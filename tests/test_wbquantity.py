@@ -0,0 +1,65 @@
+import unittest
+from decimal import Decimal
+
+from pywikibase import WbQuantity
+
+
+class TestWbQuantity(unittest.TestCase):
+
+    """Test WbQuantity."""
+
+    def setUp(self):
+        self.params = {'amount': '+1234', 'upperBound': '+1235',
+                       'lowerBound': '+1233', 'unit': '1'}
+        self.quantity = WbQuantity.fromWikibase(self.params)
+
+    def test_wikibase(self):
+        """Test Wikibase-related methods."""
+        self.assertEqual(self.quantity.amount, Decimal('1234'))
+        self.assertEqual(self.quantity.upperBound, Decimal('1235'))
+        self.assertEqual(self.params, self.quantity.toWikibase())
+
+    def test_eq(self):
+        """Test comparison."""
+        self.assertEqual(self.quantity, WbQuantity(1234, error=1))
+        self.assertNotEqual(self.quantity, WbQuantity(1234))
+        self.assertNotEqual(self.quantity, 1234)
+
+    def test_hash(self):
+        """Test hashing consistent with comparison."""
+        self.assertEqual(hash(self.quantity),
+                         hash(WbQuantity(1234, error=1)))
+
+    def test_lazy(self):
+        """Test lazy conversion of the raw strings."""
+        params = {'amount': '+1.50', 'upperBound': '+2.000',
+                  'lowerBound': '+0', 'unit': '1'}
+        quantity = WbQuantity.fromWikibase(params, lazy=True)
+        self.assertEqual(float(quantity), 1.5)
+        self.assertEqual(quantity.toWikibase(), params)
+        self.assertEqual(quantity.lowerBound, Decimal(0))
+        self.assertEqual(quantity.toWikibase(), params)
+        self.assertEqual(quantity, WbQuantity.fromWikibase(params))
+
+        quantity.amount = Decimal('1.75')
+        self.assertEqual(quantity.toWikibase()['amount'], '+1.75')
+
+        WbQuantity.lazy = True
+        try:
+            quantity = WbQuantity.fromWikibase(self.params)
+        finally:
+            WbQuantity.lazy = False
+        self.assertEqual(quantity._amount, '+1234')
+        self.assertEqual(quantity, self.quantity)
+
+    def test_slots(self):
+        """Test that WbQuantity has no instance dict."""
+        self.assertFalse(hasattr(self.quantity, '__dict__'))
+        self.assertEqual(
+            repr(self.quantity),
+            'WbQuantity(amount=1234, upperBound=1235, lowerBound=1233, '
+            'unit=1)')
+
+
+if __name__ == '__main__':
+    unittest.main()
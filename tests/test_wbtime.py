@@ -49,6 +49,49 @@ class TestWbTime(unittest.TestCase):
         # Consistency
         self.assertEqual(WbTime.fromTimestr(t.toTimestr()), t)
 
+    def test_hash(self):
+        same = WbTime.fromWikibase(self.time1.toWikibase())
+        self.assertEqual(hash(same), hash(self.time1))
+        self.assertEqual(len(set([self.time1, same, self.time2])), 2)
+
+    def test_from_wikibase(self):
+        data = {'time': '-0044-03-15T00:00:00Z', 'precision': 11,
+                'before': 0, 'after': 0, 'timezone': 0,
+                'calendarmodel': 'http://www.wikidata.org/entity/Q1985786'}
+        t = WbTime.fromWikibase(data)
+        self.assertEqual(t, WbTime(-44, 3, 15, precision=11, calendarmodel=(
+            'http://www.wikidata.org/entity/Q1985786')))
+        self.assertEqual(WbTime.fromWikibase(self.time1.toWikibase()),
+                         self.time1)
+        data['time'] = '1912'
+        self.assertRaises(ValueError, WbTime.fromWikibase, data)
+
+    def test_decode_bulk(self):
+        values = [{'value': self.time1.toWikibase(), 'type': 'time'},
+                  self.time2.toWikibase(),
+                  {'time': '-13798000000-00-00T00:00:00Z', 'precision': 3,
+                   'before': 0, 'after': 0, 'timezone': 0,
+                   'calendarmodel': 'http://example.org/calendar'}]
+        arrays = WbTime.decodeBulk(values)
+        self.assertEqual(list(arrays['year']), [1912, 1954, -13798000000])
+        self.assertEqual(list(arrays['month']), [6, 6, 0])
+        self.assertEqual(list(arrays['day']), [23, 7, 0])
+        self.assertEqual(list(arrays['precision']), [11, 11, 3])
+        self.assertEqual(list(arrays['calendarmodel']), [1, 1, 0])
+        self.assertEqual(arrays['year'].itemsize, 8)
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.time1, '__dict__'))
+        self.assertEqual(self.time1, WbTime.fromWikibase(
+            self.time1.toWikibase()))
+        self.assertNotEqual(self.time1, self.time2)
+        self.assertNotEqual(self.time1, 1912)
+        self.assertEqual(
+            repr(WbTime(year=2010, precision=9)),
+            "WbTime(year=2010, month=1, day=1, hour=0, minute=0, second=0, "
+            "precision=9, before=0, after=0, timezone=0, "
+            "calendarmodel='None')")
+
 
 if __name__ == '__main__':
     unittest.main()
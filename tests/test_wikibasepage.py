@@ -2,7 +2,7 @@ import unittest
 import json
 import os
 
-from pywikibase import WikibasePage, Claim, ItemPage
+from pywikibase import WikibasePage, Claim, ItemPage, ClaimCollection
 
 try:
     unicode = unicode
@@ -76,6 +76,78 @@ class TestWikibasePage(unittest.TestCase):
         snak_json = res['claims']['P31'][0]['mainsnak']
         self.assertEqual(snak_json['datavalue']['value']['numeric-id'], 6)
 
+    def test_diff_claims(self):
+        wb_page = self.wb_page
+        content = wb_page.toJSON()
+        self.assertNotIn('claims', wb_page.toJSON(diffto=content))
+
+        wb_page.claims['P106'][1].setRank('preferred')
+        removed = wb_page.claims['P106'].pop(2)
+        new = Claim('P106', datatype='wikibase-item')
+        new.setTarget(ItemPage('Q82594'))
+        wb_page.claims['P106'].append(new)
+        res = wb_page.toJSON(diffto=content)['claims']
+        self.assertEqual(list(res), ['P106'])
+        self.assertEqual(res['P106'], [wb_page.claims['P106'][1].toJSON(),
+                                       new.toJSON(),
+                                       {'id': removed.snak, 'remove': ''}])
+
+    def test_lazy_claims(self):
+        wb_page = WikibasePage()
+        wb_page.get(content=self._content, lazy=True)
+        self.assertIsInstance(wb_page.claims, ClaimCollection)
+        self.assertEqual(len(wb_page.claims), 56)
+        self.assertIn('P31', wb_page.claims)
+        self.assertFalse(wb_page.claims.isMaterialized('P31'))
+        claim = wb_page.claims['P31'][0]
+        self.assertIsInstance(claim, Claim)
+        self.assertIs(claim.on_item, wb_page)
+        self.assertTrue(wb_page.claims.isMaterialized('P31'))
+        self.assertFalse(wb_page.claims.isMaterialized('P18'))
+        self.assertEqual(wb_page.toJSON(), self.wb_page.toJSON())
+
+    def test_lazy_raw_form(self):
+        content = json.loads(json.dumps(self._content))
+        # the API adds the hash of the main snak and the id of entities
+        for claims in content['claims'].values():
+            for claim in claims:
+                claim['mainsnak']['hash'] = 'abc'
+                value = claim['mainsnak'].get('datavalue', {})
+                if value.get('type') == 'wikibase-entityid':
+                    value['value']['id'] = 'Q%d' % value['value'][
+                        'numeric-id']
+        wb_page = WikibasePage()
+        wb_page.get(content=content, lazy=True)
+        data = wb_page.toJSON()
+        self.assertEqual(data, self.wb_page.toJSON())
+        data['claims']['P31'][0]['rank'] = 'deprecated'
+        self.assertEqual(content['claims']['P31'][0]['rank'], 'normal')
+
+    def test_lazy_cached(self):
+        wb_page = WikibasePage()
+        wb_page.get(content=self._content, lazy=True)
+        data = wb_page.toJSON(shared=True)
+        self.assertTrue(wb_page.claims.isMaterialized('P31'))
+        # the claim JSON is not built again
+        self.assertIs(wb_page.toJSON(shared=True)['claims']['P31'][0],
+                      data['claims']['P31'][0])
+        # but copied unless shared
+        copy = wb_page.toJSON()
+        self.assertIsNot(copy['claims']['P31'][0], data['claims']['P31'][0])
+        copy['claims']['P31'][0]['rank'] = 'deprecated'
+        self.assertEqual(wb_page.toJSON(diffto=data), {})
+
+    def test_lazy_diffto(self):
+        wb_page = WikibasePage()
+        wb_page.get(content=self._content, lazy=True)
+        content = wb_page.toJSON()
+        self.assertNotIn('claims', wb_page.toJSON(diffto=content))
+        wb_page.claims['P31'][0].target = ItemPage('Q6')
+        res = wb_page.toJSON(diffto=content)
+        self.assertEqual(list(res['claims']), ['P31'])
+        snak_json = res['claims']['P31'][0]['mainsnak']
+        self.assertEqual(snak_json['datavalue']['value']['numeric-id'], 6)
+
 
 if __name__ == '__main__':
     unittest.main()